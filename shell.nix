@@ -9,6 +9,7 @@ pkgs.mkShell {
       # Pinning versions using overrideAttrs or specific nixpkgs versions
       # is complex, so we'll use the standard package set which
       # currently aligns closely with these stable versions.
+      ps.numpy
       ps.pygame
       ps.setuptools
       ps.wheel
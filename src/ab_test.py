@@ -0,0 +1,224 @@
+# ab_test.py
+
+'''
+python src/ab_test.py --a bots/stevermicelli_2.py --b bots/stevermicelli.py --maps maps/*.txt --elo0 0 --elo1 20
+python src/ab_test.py --a bots/new.py --b bots/old.py --maps maps/map1.txt --margin --m0 0 --m1 25
+
+Is A better than B? Plays colour-swapped pairs (A red then B red, same map and seed)
+and runs a sequential probability ratio test after every finished pair, stopping as
+soon as either hypothesis is accepted:
+
+    score mode (default): H0 "A is elo0 better than B" vs H1 "A is elo1 better"
+    margin mode (--margin): H0 "A's money margin per pair is m0" vs H1 "it is m1"
+
+Each pair is one sample (its mean score, or summed margin), which cancels most of the
+colour and map advantage. The log-likelihood ratio uses the normal approximation of the
+generalised SPRT: LLR = n (h1 - h0) (2 mean - h0 - h1) / (2 var), with var regularised by
+PRIOR_PAIRS pseudo-pairs of the variance the hypotheses imply, so that a run of identical
+pairs (deterministic bots) cannot make it ~0 and decide the test on its own.
+
+A bot that fails to initialise would forfeit every game; the test stops instead.
+'''
+
+import math
+import os
+import sys
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from game_constants import GameConstants
+from results_store import ResultsStore
+from tournament import MatchResult, MatchSpec, Schedule, bot_name, run_schedule
+
+
+Z95 = 1.96
+
+#weight of the prior variance, in pairs
+PRIOR_PAIRS = 10
+
+
+def elo_to_score(elo: float) -> float:
+    return 1.0 / (1.0 + 10 ** (-elo / 400))
+
+
+def score_to_elo(score: float) -> float:
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+def gsprt_llr(n: int, mean: float, var: float, h0: float, h1: float) -> float:
+    '''log-likelihood ratio of H1 (mean h1) over H0 (mean h0) from n samples with this mean and variance'''
+    if n == 0:
+        return 0.0
+    return n * (h1 - h0) * (2 * mean - h0 - h1) / (2 * var)
+
+
+@dataclass
+class SprtStatus:
+    pairs: int
+    llr: float
+    lower: float          # accept H0 at or below
+    upper: float          # accept H1 at or above
+    mean: float           # per pair: score in [0, 1] or money margin
+    ci: Tuple[float, float]  # 95% interval of mean
+    decision: Optional[str]  # "H0", "H1" or None while undecided
+
+
+class ABTest(Schedule):
+    '''
+    Schedules colour-swapped pairs of A vs B until the SPRT decides or max_pairs were
+    started. Pair k is played on maps[k % len(maps)] with seed base_seed + k for both games.
+    '''
+    def __init__(self, bot_a: str, bot_b: str, maps: List[str], *, margin: bool = False, h0: float = 0.0, h1: float = 20.0,
+                 alpha: float = 0.05, beta: float = 0.05, min_pairs: int = 10, max_pairs: Optional[int] = None, base_seed: int = 0):
+        self.a = bot_a
+        self.b = bot_b
+        self.maps = list(maps)
+        self.margin = margin
+        #score mode tests in expected score, the bounds are given in elo
+        self.h0 = h0 if margin else elo_to_score(h0)
+        self.h1 = h1 if margin else elo_to_score(h1)
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.min_pairs = min_pairs
+        self.max_pairs = max_pairs
+        self.base_seed = base_seed
+
+        #score: the mean of two independent games between the hypotheses; margin has no
+        #model, so assume a pair cannot tell the hypotheses apart better than their distance
+        mid = (self.h0 + self.h1) / 2
+        self.prior_var = (self.h1 - self.h0) ** 2 if margin else mid * (1 - mid) / 2
+
+        self._next_key = 0
+        self._halves: Dict[int, MatchResult] = {}  # pair -> first finished game
+        self.samples: List[float] = []
+        self.decision: Optional[str] = None
+        self.failed_init: Optional[str] = None  # the bot that could not be constructed
+
+    def next_match(self) -> Optional[MatchSpec]:
+        if self.decision is not None or self.failed_init is not None:
+            return None
+        pair = self._next_key // 2
+        if self.max_pairs is not None and pair >= self.max_pairs:
+            return None
+
+        map_path = self.maps[pair % len(self.maps)]
+        red, blue = (self.a, self.b) if self._next_key % 2 == 0 else (self.b, self.a)
+        spec = MatchSpec(self._next_key, red, blue, map_path, seed=self.base_seed + pair)
+        self._next_key += 1
+        return spec
+
+    def _sample(self, game: MatchResult) -> float:
+        '''A's share of one game: score in [0, 1], or money margin'''
+        a_is_red = game.red == self.a
+        if self.margin:
+            diff = game.red_money - game.blue_money
+            return diff if a_is_red else -diff
+        if game.winner is None:
+            return 0.5
+        return 1.0 if (game.winner == "RED") == a_is_red else 0.0
+
+    def report(self, result: MatchResult) -> None:
+        if result.failed_init is not None:
+            #it will fail every time, and its forfeits say nothing about its play
+            sides = ("RED", "BLUE") if result.failed_init == "BOTH" else (result.failed_init,)
+            self.failed_init = ", ".join(result.red if side == "RED" else result.blue for side in sides)
+            return
+
+        pair = result.key // 2
+        other = self._halves.pop(pair, None)
+        if other is None:
+            self._halves[pair] = result
+            return
+        if result.error or other.error:
+            #a crashed half spoils the pairing, drop both
+            return
+
+        both = self._sample(result) + self._sample(other)
+        self.samples.append(both if self.margin else both / 2)
+
+        if self.decision is None and len(self.samples) >= self.min_pairs:
+            llr = self.status().llr
+            if llr >= self.upper:
+                self.decision = "H1"
+            elif llr <= self.lower:
+                self.decision = "H0"
+
+    def status(self) -> SprtStatus:
+        n = len(self.samples)
+        mean = sum(self.samples) / n if n else 0.0
+        ss = sum((x - mean) ** 2 for x in self.samples)
+        var = (ss + PRIOR_PAIRS * self.prior_var) / (max(n - 1, 0) + PRIOR_PAIRS)
+        half = Z95 * math.sqrt(var / n) if n else float("inf")
+        return SprtStatus(
+            pairs=n,
+            llr=gsprt_llr(n, mean, var, self.h0, self.h1),
+            lower=self.lower,
+            upper=self.upper,
+            mean=mean,
+            ci=(mean - half, mean + half),
+            decision=self.decision,
+        )
+
+
+def main():
+    import argparse
+
+    ap = argparse.ArgumentParser(description="sequential A/B test of two bots on colour-swapped pairs")
+    ap.add_argument("--a", required=True, help="candidate bot file")
+    ap.add_argument("--b", required=True, help="baseline bot file")
+    ap.add_argument("--maps", nargs="+", required=True, help="map files, cycled per pair")
+    ap.add_argument("--elo0", type=float, default=0.0, help="score mode H0: A is this many elo better")
+    ap.add_argument("--elo1", type=float, default=20.0, help="score mode H1: A is this many elo better")
+    ap.add_argument("--margin", action="store_true", help="test the money margin per pair instead of win/draw/loss")
+    ap.add_argument("--m0", type=float, default=0.0, help="margin mode H0: mean margin per pair")
+    ap.add_argument("--m1", type=float, default=20.0, help="margin mode H1: mean margin per pair")
+    ap.add_argument("--alpha", type=float, default=0.05, help="false positive rate")
+    ap.add_argument("--beta", type=float, default=0.05, help="false negative rate")
+    ap.add_argument("--min-pairs", type=int, default=10, help="never decide before this many pairs")
+    ap.add_argument("--max-pairs", type=int, default=None, help="give up undecided after this many pairs")
+    ap.add_argument("--seed", type=int, default=0, help="seed of the first pair")
+    ap.add_argument("--turns", type=int, default=GameConstants.TOTAL_TURNS, help="turn limit")
+    ap.add_argument("--timeout", type=float, default=0.5, help="per-turn timeout seconds per bot")
+    ap.add_argument("--workers", type=int, default=None, help="concurrent matches (default: cpu count)")
+    ap.add_argument("--db", default=None, help="record every match in this sqlite results database")
+    args = ap.parse_args()
+
+    h0, h1 = (args.m0, args.m1) if args.margin else (args.elo0, args.elo1)
+    if h1 <= h0:
+        ap.error("H1 must be above H0")
+    for path in [args.a, args.b] + args.maps:
+        if not os.path.isfile(path):
+            ap.error(f"no such file: {path}")
+
+    test = ABTest(
+        args.a, args.b, args.maps, margin=args.margin, h0=h0, h1=h1, alpha=args.alpha, beta=args.beta,
+        min_pairs=args.min_pairs, max_pairs=args.max_pairs, base_seed=args.seed,
+    )
+    unit = "margin" if args.margin else "elo"
+    print(f"[AB] {bot_name(args.a)} vs {bot_name(args.b)}: H0 {unit}={h0:g}, H1 {unit}={h1:g}")
+
+    store = ResultsStore(args.db) if args.db else None
+    try:
+        run_schedule(test, turns=args.turns, timeout=args.timeout, workers=args.workers or os.cpu_count(), store=store)
+    finally:
+        if store is not None:
+            store.close()
+
+    if test.failed_init is not None:
+        print(f"[AB] {test.failed_init} failed to initialise, no decision")
+        sys.exit(1)
+
+    st = test.status()
+    if args.margin:
+        estimate = f"margin per pair {st.mean:+.1f} (95% CI {st.ci[0]:+.1f} .. {st.ci[1]:+.1f})"
+    else:
+        estimate = (f"score {st.mean:.3f}, elo {score_to_elo(st.mean):+.1f} "
+                    f"(95% CI {score_to_elo(st.ci[0]):+.1f} .. {score_to_elo(st.ci[1]):+.1f})")
+    verdict = {"H1": "accept H1, A is better", "H0": "accept H0, A is not better"}.get(st.decision, "undecided")
+    print(f"[AB] {st.pairs} pairs, LLR {st.llr:.2f} in ({st.lower:.2f}, {st.upper:.2f}): {verdict}")
+    print(f"[AB] {estimate}")
+
+
+if __name__ == "__main__":
+    main()
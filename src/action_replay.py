@@ -0,0 +1,166 @@
+# action_replay.py
+
+'''
+python src/action_replay.py replay.json --verify
+python src/action_replay.py replay.json --turn 120 --out state.json
+python src/action_replay.py replay.json --expand full_replay.json
+
+Event-sourced replays (game.py --replay-format actions) store no states, only the map,
+the accepted controller calls of every turn and a state hash every few turns. The
+engine is deterministic, so any turn is rebuilt by starting from the map's initial
+state and playing start_turn() plus the logged calls (regress.apply_logged) up to it.
+
+ActionReplay keeps a pickled snapshot every keyframe_interval turns it has played, so
+seeking is at most that many turns of re-simulation. verify() plays the whole match
+and checks every recorded checksum. replay.load_replay() expands these files into
+ordinary replays, so the viewer and export tools read them too.
+'''
+
+import json
+import os
+import pickle
+import sys
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional
+
+from game import StateTemplate
+from game_constants import Team
+from game_state import GameState
+from regress import Divergence, apply_logged
+from robot_controller import RobotController
+
+
+class ActionReplay:
+    '''rebuilds the states of an actions replay; turn t is the state after turn t was played, 0 the initial one'''
+
+    def __init__(self, payload: Dict[str, Any], keyframe_interval: int = 64):
+        if payload.get("format") != "actions":
+            raise ValueError("not an actions replay (game.py --replay-format actions)")
+        self.payload = payload
+        self.actions: List[List[List[Any]]] = payload["actions"]
+        self.turns = len(self.actions)
+        self.checksums: Dict[int, str] = {turn: h for turn, h in payload.get("checksums", ())}
+        self.keyframe_interval = max(1, keyframe_interval)
+
+        #the map as recorded, whatever the file says now
+        with tempfile.TemporaryDirectory() as tmp:
+            map_path = os.path.join(tmp, os.path.basename(payload["map"]["path"]))
+            with open(map_path, "w", encoding="utf-8") as f:
+                f.write(payload["map"]["text"])
+            self.template = StateTemplate(map_path)
+
+        self._keyframes: Dict[int, bytes] = {}
+
+    @classmethod
+    def from_file(cls, path: str, keyframe_interval: int = 64) -> "ActionReplay":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), keyframe_interval=keyframe_interval)
+
+    # ----------------------------
+    # Re-simulation
+    # ----------------------------
+
+    def _play(self, state: GameState, controllers: Dict[Team, RobotController]) -> Optional[List[Any]]:
+        '''the next turn; returns the first logged call the engine rejected, if any'''
+        state.start_turn()
+        rejected = None
+        for entry in self.actions[state.turn - 1]:
+            if not apply_logged(controllers, state, entry) and rejected is None:
+                rejected = entry
+        if state.turn % self.keyframe_interval == 0 and state.turn not in self._keyframes:
+            self._keyframes[state.turn] = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        return rejected
+
+    def _start(self, turn: int) -> GameState:
+        '''closest snapshot at or before turn'''
+        k = turn - turn % self.keyframe_interval
+        while k > 0 and k not in self._keyframes:
+            k -= self.keyframe_interval
+        return pickle.loads(self._keyframes[k]) if k > 0 else self.template.new_state()
+
+    @staticmethod
+    def _controllers(state: GameState) -> Dict[Team, RobotController]:
+        return {team: RobotController(team, state, quiet=True) for team in (Team.RED, Team.BLUE)}
+
+    def state_at(self, turn: int) -> GameState:
+        '''a fresh GameState as it was after the given turn'''
+        if not 0 <= turn <= self.turns:
+            raise IndexError(f"turn {turn} not in 0..{self.turns}")
+        state = self._start(turn)
+        controllers = self._controllers(state)
+        while state.turn < turn:
+            self._play(state, controllers)
+        return state
+
+    def states(self) -> Iterator[GameState]:
+        '''the state after each turn in order; the same object every time, changed in place'''
+        state = self.template.new_state()
+        controllers = self._controllers(state)
+        while state.turn < self.turns:
+            self._play(state, controllers)
+            yield state
+
+    def verify(self) -> Optional[Divergence]:
+        '''
+        play the whole match and check it against the recorded checksums; returns the
+        first rejected call or mismatching checksum, None if the rebuild matches
+        '''
+        state = self.template.new_state()
+        controllers = self._controllers(state)
+        while state.turn < self.turns:
+            rejected = self._play(state, controllers)
+            if rejected is not None:
+                return Divergence(state.turn, "actions", rejected, "rejected")
+            recorded = self.checksums.get(state.turn)
+            if recorded is not None and f"{state.state_hash():016x}" != recorded:
+                return Divergence(state.turn, "hash", recorded, f"{state.state_hash():016x}")
+        return None
+
+    # ----------------------------
+    # Conversion
+    # ----------------------------
+
+    def to_payload(self) -> Dict[str, Any]:
+        '''the same match as an ordinary (states) replay payload, for replay.py and the tools on it'''
+        payload = {k: v for k, v in self.payload.items() if k not in ("format", "checksums")}
+        payload["replay"] = [state.to_dict() for state in self.states()]
+        return payload
+
+
+def main():
+    import argparse
+
+    ap = argparse.ArgumentParser(description="rebuild, verify or expand an actions replay")
+    ap.add_argument("replay", help="replay json written by game.py --replay-format actions")
+    ap.add_argument("--verify", action="store_true", help="rebuild every turn and check the recorded checksums")
+    ap.add_argument("--turn", type=int, default=None, help="print (or --out) the state after this turn")
+    ap.add_argument("--expand", default=None, help="write the match as an ordinary replay with every state")
+    ap.add_argument("--out", default=None, help="output file for --turn")
+    args = ap.parse_args()
+
+    replay = ActionReplay.from_file(args.replay)
+
+    if args.turn is not None:
+        text = json.dumps(replay.state_at(args.turn).to_dict(), indent=2)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(text)
+        else:
+            print(text)
+
+    if args.expand:
+        with open(args.expand, "w", encoding="utf-8") as f:
+            json.dump(replay.to_payload(), f, indent=2)
+        print(f"[REPLAY] wrote {args.expand}")
+
+    if args.verify or (args.turn is None and not args.expand):
+        d = replay.verify()
+        if d is None:
+            print(f"[REPLAY] {replay.turns} turns rebuilt, {len(replay.checksums)} checksums match")
+        else:
+            print(f"[REPLAY] DIVERGED at turn {d.turn}, {d.field}: recorded {json.dumps(d.recorded)}, now {json.dumps(d.now)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
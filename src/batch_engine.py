@@ -0,0 +1,739 @@
+# batch_engine.py
+
+'''
+python src/batch_engine.py --check maps/*.txt --games 16 --turns 300
+python src/batch_engine.py --bench maps/orbit.txt --games 1024
+
+K independent games of one map stepped in lockstep for batched self-play. The state
+of all K games lives in NumPy struct-of-arrays form (bot positions and holdings, tile
+items, box counts, cook progress, sinks, money, order status), and every step applies
+one batch of actions, in the same (action, target, move) format as env.CookingEnv:
+
+    actions: int array [K, n_bots, 3] of indices into env.ACTIONS, env.TARGETS, env.MOVES
+             for the bots in bot_ids order (red's, then blue's)
+
+Each rule of RobotController and GameState.start_turn is a masked array update over
+the games where it applies. Bots are processed in the engine's order (blue's bots,
+then red's, each acting before it moves), so results match the reference engine
+exactly. --check plays random games in both and compares the whole state every turn;
+now and then it hands a bot a raw food by a cooker or a finished order by a submit
+station, since random play alone hardly ever cooks or submits.
+
+Not modelled: the midgame map switch (bots stay on their home map), and plates only
+remember their first plate_max foods (PLATE_MAX, or the longest order of the map if
+that is longer). A plate with more can never match an order, but two such plates may
+count as the same item when stacked in a box.
+
+An item is five fields: kind (NONE, FOOD, PLATE, PAN), food (the food's code, or the
+pan's food), dirty, plate (food codes in the order they were added) and n (foods on
+the plate). A food code is food_id * 6 + chopped * 3 + cooked_stage.
+'''
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from env import ACTIONS, MOVES, TARGETS
+from game import StateTemplate
+from game_constants import FoodType, GameConstants, ShopCosts, Team, TileType
+from game_state import GameState
+from item import Food, Pan, Plate
+from tiles import Box, Cooker, Shop, Sink, SinkTable, Submit
+
+
+NONE, FOOD, PLATE, PAN = 0, 1, 2, 3
+PLATE_MAX = 8  # foods a plate remembers, at least
+NO_FOOD = -1
+#sorts after every food code, so sorted plates keep their foods first
+PAD = 127
+
+FOOD_TYPES = sorted(FoodType, key=lambda f: f.food_id)
+BUYABLES = list(FoodType) + list(ShopCosts)
+CAN_CHOP = np.array([f.can_chop for f in FOOD_TYPES])
+CAN_COOK = np.array([f.can_cook for f in FOOD_TYPES])
+BUY_COST = np.array([b.buy_cost for b in BUYABLES])
+STAGE_PROGRESS = np.array([0, GameConstants.COOK_PROGRESS, GameConstants.BURN_PROGRESS])
+
+TDX = np.array([d[0] for d in TARGETS])
+TDY = np.array([d[1] for d in TARGETS])
+MDX = np.array([d[0] for d in MOVES])
+MDY = np.array([d[1] for d in MOVES])
+
+ACTION_NAMES = [a if isinstance(a, str) else "buy" for a in ACTIONS]
+BUY_ITEM = {i: BUYABLES.index(a[1]) for i, a in enumerate(ACTIONS) if not isinstance(a, str)}
+
+SHOP = TileType.SHOP.tile_id
+COUNTER = TileType.COUNTER.tile_id
+BOX = TileType.BOX.tile_id
+SINK = TileType.SINK.tile_id
+SINKTABLE = TileType.SINKTABLE.tile_id
+COOKER = TileType.COOKER.tile_id
+TRASH = TileType.TRASH.tile_id
+SUBMIT = TileType.SUBMIT.tile_id
+
+
+def food_code(f: Food) -> int:
+    return f.food_id * 6 + int(bool(f.chopped)) * 3 + int(f.cooked_stage)
+
+
+# ----------------------------
+# Items
+# ----------------------------
+
+class Items:
+    '''struct-of-arrays items of some leading shape, e.g. [K, bots] or [K, 2, W, H]'''
+    FIELDS = ("kind", "food", "dirty", "plate", "n")
+
+    def __init__(self, shape: Tuple[int, ...], plate_max: int = PLATE_MAX):
+        self.plate_max = plate_max
+        self.kind = np.zeros(shape, np.int8)
+        self.food = np.full(shape, NO_FOOD, np.int8)
+        self.dirty = np.zeros(shape, bool)
+        self.plate = np.full(shape + (plate_max,), NO_FOOD, np.int8)
+        self.n = np.zeros(shape, np.int16)
+
+    def get(self, idx) -> Tuple[np.ndarray, ...]:
+        '''copies of the fields at idx'''
+        return tuple(getattr(self, f)[idx] for f in self.FIELDS)
+
+    def put(self, idx, item: Tuple[np.ndarray, ...]) -> None:
+        for f, v in zip(self.FIELDS, item):
+            getattr(self, f)[idx] = v
+
+    def clear(self, idx) -> None:
+        self.kind[idx] = NONE
+        self.food[idx] = NO_FOOD
+        self.dirty[idx] = False
+        self.plate[idx] = NO_FOOD
+        self.n[idx] = 0
+
+    def new(self, idx, kind: int, food=NO_FOOD) -> None:
+        '''a fresh item: raw food, clean empty plate or empty pan'''
+        self.clear(idx)
+        self.kind[idx] = kind
+        self.food[idx] = food
+
+    def add_to_plate(self, idx: Tuple[np.ndarray, ...], food: np.ndarray) -> None:
+        '''append food codes to the plates at idx, a tuple of index arrays picking distinct plates'''
+        n = self.n[idx]
+        room = n < self.plate_max
+        self.plate[tuple(a[room] for a in idx) + (n[room],)] = food[room]
+        self.n[idx] = n + 1
+
+    def encode(self, idx, it) -> None:
+        '''one reference engine item into idx'''
+        self.clear(idx)
+        if isinstance(it, Food):
+            self.kind[idx], self.food[idx] = FOOD, food_code(it)
+        elif isinstance(it, Plate):
+            self.kind[idx], self.dirty[idx], self.n[idx] = PLATE, bool(it.dirty), len(it.food)
+            for j, f in enumerate(it.food[:self.plate_max]):
+                self.plate[idx + (j,)] = food_code(f)
+        elif isinstance(it, Pan):
+            self.kind[idx] = PAN
+            self.food[idx] = NO_FOOD if it.food is None else food_code(it.food)
+
+
+def same_item(a: Tuple[np.ndarray, ...], b: Tuple[np.ndarray, ...]) -> np.ndarray:
+    '''per element, would the reference engine stack these in one box'''
+    return ((a[0] == b[0]) & (a[1] == b[1]) & (a[2] == b[2]) & (a[4] == b[4])
+            & (a[3] == b[3]).all(axis=-1))
+
+
+# ----------------------------
+# Engine
+# ----------------------------
+
+class BatchEngine:
+    '''
+    K games of one map. Per game: turn[k], money[k, team]; per bot slot i: bot_x/bot_y[k, i],
+    hold (Items [K, bots]); per tile of each team's map [k, team, x, y]: tile (Items),
+    box_count, cook_progress, sink_dirty, sink_progress, sink_using, clean_plates and
+    occupancy (bot slot or -1); per order [k, team, o]: completed_turn (-1 if not) and penalized.
+    '''
+    def __init__(self, map_path: str, games: int, turn_limit: int = GameConstants.TOTAL_TURNS):
+        self.template = StateTemplate(map_path)
+        self.K = games
+        self.turn_limit = turn_limit
+
+        gs = self.template.new_state()
+        self.W, self.H = gs.red_map.width, gs.red_map.height
+        self.bot_ids: List[int] = (
+            sorted(b for b, s in gs.bots.items() if s.team == Team.RED)
+            + sorted(b for b, s in gs.bots.items() if s.team == Team.BLUE)
+        )
+        self.slot = {bot_id: i for i, bot_id in enumerate(self.bot_ids)}
+        self.bot_team = np.array([gs.bots[b].team.value for b in self.bot_ids])
+        #reference engine order: blue's bots, then red's
+        self.order = [i for i in range(len(self.bot_ids)) if self.bot_team[i] == Team.BLUE.value] + \
+                     [i for i in range(len(self.bot_ids)) if self.bot_team[i] == Team.RED.value]
+
+        self._static(gs)
+
+        #the initial state as one game, copied into every game on reset
+        self.K = 1
+        self._alloc()
+        self.load(0, gs)
+        self._initial = {name: arr[0].copy() for name, arr in self.arrays().items()}
+
+        self.K = games
+        self._alloc()
+        self.reset()
+
+    # ----------------------------
+    # Setup
+    # ----------------------------
+
+    def _static(self, gs: GameState) -> None:
+        '''map layout, shop menus, where plates go, orders'''
+        W, H = self.W, self.H
+        self.tile_type = np.zeros((2, W, H), np.int16)
+        self.walkable = np.zeros((2, W, H), bool)
+        self.menu = np.zeros((2, W, H, len(BUYABLES)), bool)
+        #clean plates from a sink go to a sink table, dirty plates from a submit to a sink; -1 if none
+        self.plate_to = np.full((2, W, H, 2), -1, np.int16)
+
+        for team in (Team.RED, Team.BLUE):
+            t, m = team.value, gs.get_map(team)
+            first: Dict[type, Tuple[int, int]] = {}
+            for x in range(W):
+                for y in range(H):
+                    tile = m.tiles[x][y]
+                    self.tile_type[t, x, y] = tile.tile_id
+                    self.walkable[t, x, y] = tile.is_walkable
+                    if isinstance(tile, Shop):
+                        for j, b in enumerate(BUYABLES):
+                            self.menu[t, x, y, j] = b in tile.shop_items
+                    for cls in (Sink, SinkTable):
+                        if isinstance(tile, cls) and cls not in first:
+                            first[cls] = (x, y)
+
+            #as GameState.add_clean_plate_to_sinktable_near / add_dirty_plate_to_sink_near
+            for x in range(W):
+                for y in range(H):
+                    want = {SINK: SinkTable, SUBMIT: Sink}.get(int(self.tile_type[t, x, y]))
+                    if want is None:
+                        continue
+                    dest = None
+                    for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+                        nx, ny = x + dx, y + dy
+                        if m.in_bounds(nx, ny) and isinstance(m.tiles[nx][ny], want):
+                            dest = (nx, ny)
+                            break
+                    dest = dest or first.get(want)
+                    if dest is not None:
+                        self.plate_to[t, x, y] = dest
+
+        orders = {team: gs.orders[team] for team in (Team.RED, Team.BLUE)}
+        O = max(1, max(len(o) for o in orders.values()))
+        self.n_orders = O
+        #unused order slots are never active and never expire
+        self.o_created = np.full((2, O), 1 << 30, np.int32)
+        self.o_expires = np.full((2, O), 1 << 30, np.int32)
+        self.o_reward = np.zeros((2, O), np.int32)
+        self.o_penalty = np.zeros((2, O), np.int32)
+        self.plate_max = max([PLATE_MAX] + [len(o.required) for lst in orders.values() for o in lst])
+        self.o_req = np.full((2, O, self.plate_max), PAD, np.int16)
+        self.o_len = np.full((2, O), self.plate_max + 1, np.int16)
+        for team, lst in orders.items():
+            t = team.value
+            for j, o in enumerate(lst):
+                self.o_created[t, j], self.o_expires[t, j] = o.created_turn, o.expires_turn
+                self.o_reward[t, j], self.o_penalty[t, j] = o.reward, o.penalty
+                #order_signature(): forced chopped and cooked where the food can be
+                req = sorted(f.food_id * 6 + int(f.can_chop) * 3 + int(f.can_cook) for f in o.required)
+                self.o_req[t, j, :len(req)] = req
+                self.o_len[t, j] = len(req)
+
+    def _alloc(self) -> None:
+        K, W, H, B, O = self.K, self.W, self.H, len(self.bot_ids), self.n_orders
+        self.turn = np.zeros(K, np.int32)
+        self.money = np.zeros((K, 2), np.int32)
+        self.bot_x = np.zeros((K, B), np.int16)
+        self.bot_y = np.zeros((K, B), np.int16)
+        self.hold = Items((K, B), self.plate_max)
+        self.tile = Items((K, 2, W, H), self.plate_max)
+        self.box_count = np.zeros((K, 2, W, H), np.int16)
+        self.cook_progress = np.zeros((K, 2, W, H), np.int16)
+        self.sink_dirty = np.zeros((K, 2, W, H), np.int16)
+        self.sink_progress = np.zeros((K, 2, W, H), np.int16)
+        self.sink_using = np.zeros((K, 2, W, H), bool)
+        self.clean_plates = np.zeros((K, 2, W, H), np.int16)
+        self.occupancy = np.full((K, 2, W, H), -1, np.int16)
+        self.completed_turn = np.full((K, 2, O), -1, np.int32)
+        self.penalized = np.zeros((K, 2, O), bool)
+
+    STATE = ("turn", "money", "bot_x", "bot_y", "box_count", "cook_progress", "sink_dirty", "sink_progress",
+             "sink_using", "clean_plates", "occupancy", "completed_turn", "penalized")
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        '''every per-game state array by name, items as hold.<field> / tile.<field>'''
+        out = {name: getattr(self, name) for name in self.STATE}
+        for f in Items.FIELDS:
+            out[f"hold.{f}"] = getattr(self.hold, f)
+            out[f"tile.{f}"] = getattr(self.tile, f)
+        return out
+
+    def load(self, k: int, gs: GameState) -> None:
+        '''copy a reference GameState into game k'''
+        self.turn[k] = gs.turn
+        for team in (Team.RED, Team.BLUE):
+            t = team.value
+            self.money[k, t] = gs.get_team_money(team)
+            m = gs.get_map(team)
+            for x in range(self.W):
+                for y in range(self.H):
+                    tile = m.tiles[x][y]
+                    self.tile.encode((k, t, x, y), tile.item)
+                    self.box_count[k, t, x, y] = getattr(tile, "count", 0) if isinstance(tile, Box) else 0
+                    self.cook_progress[k, t, x, y] = tile.cook_progress if isinstance(tile, Cooker) else 0
+                    is_sink = isinstance(tile, Sink)
+                    self.sink_dirty[k, t, x, y] = tile.num_dirty_plates if is_sink else 0
+                    self.sink_progress[k, t, x, y] = tile.curr_dirty_plate_progress if is_sink else 0
+                    self.sink_using[k, t, x, y] = bool(tile.using) if is_sink else False
+                    self.clean_plates[k, t, x, y] = tile.num_clean_plates if isinstance(tile, SinkTable) else 0
+                    occ = gs.occupancy[team][x][y]
+                    self.occupancy[k, t, x, y] = -1 if occ is None else self.slot[occ]
+            self.completed_turn[k, t] = -1
+            self.penalized[k, t] = False
+            for j, o in enumerate(gs.orders[team]):
+                self.completed_turn[k, t, j] = -1 if o.completed_turn is None else o.completed_turn
+                self.penalized[k, t, j] = o.penalized
+        for bot_id, i in self.slot.items():
+            b = gs.bots[bot_id]
+            self.bot_x[k, i], self.bot_y[k, i] = b.x, b.y
+            self.hold.encode((k, i), b.holding)
+
+    def reset(self, games: Optional[np.ndarray] = None) -> None:
+        '''restart the given games (default: all) at turn 1'''
+        ks = np.arange(self.K) if games is None else np.asarray(games)
+        for name, arr in self.arrays().items():
+            arr[ks] = self._initial[name]
+        self.start_turn(ks)
+
+    # ----------------------------
+    # Turn start
+    # ----------------------------
+
+    def start_turn(self, ks: Optional[np.ndarray] = None) -> None:
+        '''GameState.start_turn for games ks: turn, passive money, cooking, washing, expired orders'''
+        ks = np.arange(self.K) if ks is None else ks
+        self.turn[ks] += 1
+        self.money[ks] += GameConstants.MONEY_PER_TURN
+
+        for t in (Team.RED.value, Team.BLUE.value):
+            #cookers with a pan with food
+            kind = self.tile.kind[ks, t]
+            food = self.tile.food[ks, t]
+            k, x, y = np.nonzero((self.tile_type[t] == COOKER) & (kind == PAN) & (food != NO_FOOD))
+            if len(k):
+                k = ks[k]
+                prog = self.cook_progress[k, t, x, y] + 1
+                self.cook_progress[k, t, x, y] = prog
+                f = self.tile.food[k, t, x, y]
+                stage = f % 3
+                f = np.where((prog == GameConstants.COOK_PROGRESS) & (stage == 0), f + 1,
+                             np.where(prog >= GameConstants.BURN_PROGRESS, f - stage + 2, f))
+                self.tile.food[k, t, x, y] = f
+
+            #sinks being washed
+            k, x, y = np.nonzero((self.tile_type[t] == SINK) & self.sink_using[ks, t] & (self.sink_dirty[ks, t] > 0))
+            if len(k):
+                k = ks[k]
+                prog = self.sink_progress[k, t, x, y] + 1
+                done = prog >= GameConstants.PLATE_WASH_PROGRESS
+                self.sink_progress[k, t, x, y] = np.where(done, 0, prog)
+                self.sink_dirty[k, t, x, y] -= done
+                dest = self.plate_to[t, x, y]
+                put = done & (dest[:, 0] >= 0)
+                np.add.at(self.clean_plates, (k[put], t, dest[put, 0], dest[put, 1]), 1)
+            self.sink_using[ks, t] = False
+
+        #orders that just expired
+        turn = self.turn[ks, None, None]
+        expired = (self.completed_turn[ks] < 0) & (turn > self.o_expires[None]) & ~self.penalized[ks]
+        self.money[ks] -= (expired * self.o_penalty[None]).sum(axis=2)
+        self.penalized[ks] |= expired
+
+    # ----------------------------
+    # Bot actions
+    # ----------------------------
+
+    def step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        one turn of every game: actions [K, bots, 3]. Returns (reward [K, 2] money change
+        per team, done [K]); games that are done must be reset() before stepping on.
+        '''
+        actions = np.asarray(actions)
+        before = self.money.copy()
+        for i in self.order:
+            self._bot_action(i, actions[:, i, 0], actions[:, i, 1])
+            self._bot_move(i, actions[:, i, 2])
+
+        done = self.turn >= self.turn_limit
+        live = np.nonzero(~done)[0]
+        if len(live):
+            self.start_turn(live)
+        return self.money - before, done
+
+    def _bot_move(self, i: int, move: np.ndarray) -> None:
+        k = np.nonzero(move > 0)[0]
+        if not len(k):
+            return
+        t = self.bot_team[i]
+        x, y = self.bot_x[k, i], self.bot_y[k, i]
+        nx, ny = x + MDX[move[k]], y + MDY[move[k]]
+        ok = (nx >= 0) & (nx < self.W) & (ny >= 0) & (ny < self.H)
+        k, x, y, nx, ny = k[ok], x[ok], y[ok], nx[ok], ny[ok]
+        ok = self.walkable[t, nx, ny] & (self.occupancy[k, t, nx, ny] < 0)
+        k, x, y, nx, ny = k[ok], x[ok], y[ok], nx[ok], ny[ok]
+        self.occupancy[k, t, x, y] = -1
+        self.occupancy[k, t, nx, ny] = i
+        self.bot_x[k, i], self.bot_y[k, i] = nx, ny
+
+    def _bot_action(self, i: int, act: np.ndarray, target: np.ndarray) -> None:
+        t = self.bot_team[i]
+        for a in np.unique(act):
+            if a == 0:
+                continue
+            k = np.nonzero(act == a)[0]
+            x = self.bot_x[k, i] + TDX[target[k]]
+            y = self.bot_y[k, i] + TDY[target[k]]
+            ok = (x >= 0) & (x < self.W) & (y >= 0) & (y < self.H)
+            k, x, y = k[ok], x[ok], y[ok]
+            if len(k):
+                getattr(self, "_" + ACTION_NAMES[a])(i, t, k, x, y, a)
+
+    #each handler gets the games k where bot slot i of team t does this action on tile (x, y)
+
+    def _pickup(self, i, t, k, x, y, a) -> None:
+        k, x, y = self._keep(k, x, y, self.hold.kind[k, i] == NONE)
+        box = self.tile_type[t, x, y] == BOX
+
+        #box: hand out a copy, the last one empties it
+        bk, bx, by = k[box], x[box], y[box]
+        full = (self.box_count[bk, t, bx, by] > 0) & (self.tile.kind[bk, t, bx, by] != NONE)
+        gk, gx, gy = bk[full], bx[full], by[full]
+        self.hold.put((gk, i), self.tile.get((gk, t, gx, gy)))
+        self.box_count[gk, t, gx, gy] -= 1
+        empty = self.box_count[bk, t, bx, by] <= 0
+        self.box_count[bk[empty], t, bx[empty], by[empty]] = 0
+        self.tile.clear((bk[empty], t, bx[empty], by[empty]))
+
+        #anything else: take the item
+        k, x, y = k[~box], x[~box], y[~box]
+        k, x, y = self._keep(k, x, y, self.tile.kind[k, t, x, y] != NONE)
+        self.hold.put((k, i), self.tile.get((k, t, x, y)))
+        self.tile.clear((k, t, x, y))
+
+    def _place(self, i, t, k, x, y, a) -> None:
+        k, x, y = self._keep(k, x, y, self.hold.kind[k, i] != NONE)
+        tt = self.tile_type[t, x, y]
+        hk = self.hold.kind[k, i]
+
+        #cooker, holding a pan: swap pans unless the cooker's pan has food
+        c = (tt == COOKER) & (hk == PAN)
+        ck, cx, cy = k[c], x[c], y[c]
+        old_pan = self.tile.kind[ck, t, cx, cy] == PAN
+        busy = old_pan & (self.tile.food[ck, t, cx, cy] != NO_FOOD)
+        ck, cx, cy, old_pan = ck[~busy], cx[~busy], cy[~busy], old_pan[~busy]
+        old = self.tile.get((ck, t, cx, cy))
+        self.tile.put((ck, t, cx, cy), self.hold.get((ck, i)))
+        self.hold.put((ck, i), old)
+        self.hold.clear((ck[~old_pan], i))
+        self._cook_from_stage(t, ck, cx, cy)
+
+        #cooker, holding food: into an empty pan if the food cooks
+        c = (tt == COOKER) & (hk == FOOD)
+        ck, cx, cy = k[c], x[c], y[c]
+        ck, cx, cy = self._into_pan(i, t, ck, cx, cy)
+
+        #box: stack the same kind of item, or fill an empty box
+        b = tt == BOX
+        bk, bx, by = k[b], x[b], y[b]
+        self.box_count[bk, t, bx, by] = np.maximum(self.box_count[bk, t, bx, by], 0)
+        cnt = self.box_count[bk, t, bx, by]
+        self.tile.clear((bk[cnt == 0], t, bx[cnt == 0], by[cnt == 0]))
+        fresh = (cnt == 0) | (self.tile.kind[bk, t, bx, by] == NONE)
+        same = ~fresh & same_item(self.tile.get((bk, t, bx, by)), self.hold.get((bk, i)))
+        fk, fx, fy = bk[fresh], bx[fresh], by[fresh]
+        self.tile.put((fk, t, fx, fy), self.hold.get((fk, i)))
+        self.box_count[fk, t, fx, fy] = 1
+        self.box_count[bk[same], t, bx[same], by[same]] += 1
+        self.hold.clear((bk[fresh | same], i))
+
+        #anything else: onto a free tile
+        o = (tt != COOKER) & (tt != BOX)
+        ok, ox, oy = k[o], x[o], y[o]
+        ok, ox, oy = self._keep(ok, ox, oy, self.tile.kind[ok, t, ox, oy] == NONE)
+        self.tile.put((ok, t, ox, oy), self.hold.get((ok, i)))
+        self.hold.clear((ok, i))
+
+    def _trash(self, i, t, k, x, y, a) -> None:
+        k, x, y = self._keep(k, x, y, (self.hold.kind[k, i] != NONE) & (self.tile_type[t, x, y] == TRASH))
+        hk = self.hold.kind[k, i]
+        self.hold.clear((k, i))
+        self.hold.kind[k, i] = np.where((hk == PLATE) | (hk == PAN), hk, NONE)
+
+    def _chop(self, i, t, k, x, y, a) -> None:
+        f = self.tile.food[k, t, x, y]
+        ok = ((self.tile_type[t, x, y] == COUNTER) & (self.hold.kind[k, i] == NONE)
+              & (self.tile.kind[k, t, x, y] == FOOD) & CAN_CHOP[np.maximum(f, 0) // 6])
+        k, x, y, f = k[ok], x[ok], y[ok], f[ok]
+        self.tile.food[k, t, x, y] = np.where((f // 3) % 2 == 1, f, f + 3)
+
+    def _start_cook(self, i, t, k, x, y, a) -> None:
+        k, x, y = self._keep(k, x, y, (self.tile_type[t, x, y] == COOKER) & (self.hold.kind[k, i] == FOOD))
+        self._into_pan(i, t, k, x, y)
+
+    def _take_from_pan(self, i, t, k, x, y, a) -> None:
+        ok = ((self.hold.kind[k, i] == NONE) & (self.tile_type[t, x, y] == COOKER)
+              & (self.tile.kind[k, t, x, y] == PAN) & (self.tile.food[k, t, x, y] != NO_FOOD))
+        k, x, y = k[ok], x[ok], y[ok]
+        self.hold.new((k, i), FOOD, self.tile.food[k, t, x, y])
+        self.tile.food[k, t, x, y] = NO_FOOD
+        self.cook_progress[k, t, x, y] = 0
+
+    def _take_clean_plate(self, i, t, k, x, y, a) -> None:
+        ok = ((self.hold.kind[k, i] == NONE) & (self.tile_type[t, x, y] == SINKTABLE)
+              & (self.clean_plates[k, t, x, y] > 0))
+        k, x, y = k[ok], x[ok], y[ok]
+        self.clean_plates[k, t, x, y] -= 1
+        self.hold.new((k, i), PLATE)
+
+    def _put_dirty_plate_in_sink(self, i, t, k, x, y, a) -> None:
+        ok = (self.hold.kind[k, i] == PLATE) & self.hold.dirty[k, i] & (self.tile_type[t, x, y] == SINK)
+        k, x, y = k[ok], x[ok], y[ok]
+        self.sink_dirty[k, t, x, y] += 1
+        self.hold.clear((k, i))
+
+    def _wash_sink(self, i, t, k, x, y, a) -> None:
+        ok = (self.tile_type[t, x, y] == SINK) & (self.sink_dirty[k, t, x, y] > 0)
+        self.sink_using[k[ok], t, x[ok], y[ok]] = True
+
+    def _add_food_to_plate(self, i, t, k, x, y, a) -> None:
+        hk, tk = self.hold.kind[k, i], self.tile.kind[k, t, x, y]
+
+        #holding a clean plate, food on the tile
+        p = (hk == PLATE) & ~self.hold.dirty[k, i] & (tk == FOOD)
+        pk, px, py = k[p], x[p], y[p]
+        self.hold.add_to_plate((pk, np.full(len(pk), i)), self.tile.food[pk, t, px, py])
+        self.tile.clear((pk, t, px, py))
+
+        #holding food, clean plate on the tile
+        f = (hk == FOOD) & (tk == PLATE) & ~self.tile.dirty[k, t, x, y]
+        fk, fx, fy = k[f], x[f], y[f]
+        self.tile.add_to_plate((fk, np.full(len(fk), t), fx, fy), self.hold.food[fk, i])
+        self.hold.clear((fk, i))
+
+    def _submit(self, i, t, k, x, y, a) -> None:
+        ok = (self.tile_type[t, x, y] == SUBMIT) & (self.hold.kind[k, i] == PLATE) & ~self.hold.dirty[k, i]
+        k, x, y = k[ok], x[ok], y[ok]
+        if not len(k):
+            return
+
+        #sorted plate against every order, first active match wins
+        plate = np.where(self.hold.plate[k, i] == NO_FOOD, PAD, self.hold.plate[k, i]).astype(np.int16)
+        plate.sort(axis=1)
+        n = self.hold.n[k, i]
+        match = (plate[:, None, :] == self.o_req[t][None]).all(axis=2) & (n[:, None] == self.o_len[t][None])
+        turn = self.turn[k, None]
+        active = (self.o_created[t][None] <= turn) & (turn <= self.o_expires[t][None]) & (self.completed_turn[k, t] < 0)
+        hit = match & active
+        found = hit.any(axis=1)
+        k, x, y, j = k[found], x[found], y[found], hit[found].argmax(axis=1)
+
+        self.completed_turn[k, t, j] = self.turn[k]
+        self.money[k, t] += self.o_reward[t, j]
+        dest = self.plate_to[t, x, y]
+        put = dest[:, 0] >= 0
+        self.sink_dirty[k[put], t, dest[put, 0], dest[put, 1]] += 1
+        self.hold.clear((k, i))
+
+    def _buy(self, i, t, k, x, y, a) -> None:
+        j = BUY_ITEM[a]
+        cost = int(BUY_COST[j])
+        ok = ((self.tile_type[t, x, y] == SHOP) & (self.hold.kind[k, i] == NONE)
+              & self.menu[t, x, y, j] & (self.money[k, t] >= cost))
+        k = k[ok]
+        self.money[k, t] -= cost
+        item = BUYABLES[j]
+        if isinstance(item, FoodType):
+            self.hold.new((k, i), FOOD, item.food_id * 6)
+        else:
+            self.hold.new((k, i), PLATE if item == ShopCosts.PLATE else PAN)
+
+    # ----------------------------
+    # Helpers
+    # ----------------------------
+
+    @staticmethod
+    def _keep(k, x, y, ok):
+        return k[ok], x[ok], y[ok]
+
+    def _cook_from_stage(self, t, k, x, y) -> None:
+        '''cook progress of a cooker whose pan just changed: from the food's stage, 0 without cookable food'''
+        f = self.tile.food[k, t, x, y]
+        cooks = (self.tile.kind[k, t, x, y] == PAN) & (f != NO_FOOD) & CAN_COOK[np.maximum(f, 0) // 6]
+        self.cook_progress[k, t, x, y] = np.where(cooks, STAGE_PROGRESS[np.maximum(f, 0) % 3], 0)
+
+    def _into_pan(self, i, t, k, x, y):
+        '''held cookable food into the empty pan on a cooker; returns where it worked'''
+        f = self.hold.food[k, i]
+        ok = ((self.tile.kind[k, t, x, y] == PAN) & (self.tile.food[k, t, x, y] == NO_FOOD)
+              & CAN_COOK[np.maximum(f, 0) // 6])
+        k, x, y, f = k[ok], x[ok], y[ok], f[ok]
+        self.tile.food[k, t, x, y] = f
+        self.hold.clear((k, i))
+        self.cook_progress[k, t, x, y] = STAGE_PROGRESS[f % 3]
+        return k, x, y
+
+
+# ----------------------------
+# Equivalence check and benchmark
+# ----------------------------
+
+def _plant(gs: GameState, rng: np.random.Generator) -> bool:
+    '''
+    set a random empty-handed bot up for a rule random play rarely reaches: either a
+    raw cookable food next to a cooker, or a plate finished for an open order next to
+    a submit station (which in turn feeds the sink and plate table rules)
+    '''
+    bot_ids = [bid for bid, b in gs.bots.items() if b.holding is None]
+    if not bot_ids:
+        return False
+    b = gs.bots[bot_ids[rng.integers(len(bot_ids))]]
+    m = gs.get_map(b.map_team)
+    occupancy = gs.occupancy[b.map_team]
+
+    def _food(ft: FoodType, done: bool) -> Food:
+        food = Food(ft)
+        food.chopped = done and ft.can_chop
+        food.cooked_stage = 1 if done and ft.can_cook else 0
+        return food
+
+    if rng.random() < 0.5:
+        station = Cooker
+        cookable = [ft for ft in FoodType if ft.can_cook]
+        holding = _food(cookable[rng.integers(len(cookable))], done=False)
+    else:
+        station = Submit
+        orders = [o for o in gs.orders[b.map_team] if o.is_active(gs.turn)]
+        if not orders:
+            return False
+        holding = Plate([_food(ft, done=True) for ft in orders[rng.integers(len(orders))].required])
+
+    spots = [(x + dx, y + dy) for x in range(m.width) for y in range(m.height) if isinstance(m.tiles[x][y], station)
+             for dx, dy in MOVES[1:] if m.in_bounds(x + dx, y + dy) and m.tiles[x + dx][y + dy].is_walkable
+             and occupancy[x + dx][y + dy] is None]
+    if not spots:
+        return False
+
+    occupancy[b.x][b.y] = None
+    b.x, b.y = spots[rng.integers(len(spots))]
+    occupancy[b.x][b.y] = b.bot_id
+    b.holding = holding
+    return True
+
+
+def check(map_path: str, games: int, turns: int, seed: int = 0) -> int:
+    '''
+    play `games` random games in the batch engine and in env.CookingEnv with the same
+    actions (mostly ones the masks allow, so the rules are exercised), comparing every
+    state array after every turn; returns the number of mismatching turns
+    '''
+    from env import CookingEnv
+
+    rng = np.random.default_rng(seed)
+    engine = BatchEngine(map_path, games, turn_limit=turns)
+    expect = BatchEngine(map_path, games, turn_limit=turns)
+    refs = [CookingEnv(map_path, turn_limit=turns) for _ in range(games)]
+    for env in refs:
+        env.reset()
+
+    bad = 0
+    done_ok = np.zeros(len(ACTIONS), np.int64)
+    for turn in range(1, turns + 1):
+        for k, env in enumerate(refs):
+            if rng.random() < 0.05 and _plant(env.state, rng):
+                engine.load(k, env.state)
+
+        actions = np.zeros((games, len(engine.bot_ids), 3), np.int64)
+        for k, env in enumerate(refs):
+            for i, bot_id in enumerate(engine.bot_ids):
+                mask = np.array(env.action_mask(bot_id))
+                #pick the action kind first, so rare ones (chop, submit) get their turn
+                kinds = np.nonzero(mask[1:].any(axis=1))[0] + 1
+                if len(kinds) and rng.random() < 0.8:
+                    act = kinds[rng.integers(len(kinds))]
+                    targets = np.nonzero(mask[act])[0]
+                    actions[k, i, :2] = act, targets[rng.integers(len(targets))]
+                else:
+                    actions[k, i, :2] = rng.integers(len(ACTIONS)), rng.integers(len(TARGETS))
+                actions[k, i, 2] = rng.integers(len(MOVES))
+
+        engine.step(actions)
+        for k, env in enumerate(refs):
+            team_actions = {team: [] for team in (Team.RED, Team.BLUE)}
+            for i, bot_id in enumerate(engine.bot_ids):
+                team_actions[env.state.bots[bot_id].team].append(tuple(int(v) for v in actions[k, i]))
+            _, _, _, info = env.step(team_actions)
+            for team, res in info["results"].items():
+                for (acted, _), action in zip(res, team_actions[team]):
+                    done_ok[action[0]] += acted
+
+        for k, env in enumerate(refs):
+            expect.load(k, env.state)
+        got, want = engine.arrays(), expect.arrays()
+        diff = [name for name in got if not np.array_equal(got[name], want[name])]
+        if diff:
+            bad += 1
+            games_off = sorted({int(k) for name in diff for k in np.nonzero(
+                (got[name] != want[name]).reshape(games, -1).any(axis=1))[0]})
+            print(f"[CHECK] {map_path} turn {turn}: {', '.join(diff)} differ in games {games_off}")
+            #carry on from the reference state
+            for name, arr in got.items():
+                arr[...] = want[name]
+
+    #which rules the random play actually got through
+    counts = {}
+    for act, n in zip(ACTIONS, done_ok):
+        name = "buy" if isinstance(act, tuple) else act
+        counts[name] = counts.get(name, 0) + int(n)
+    print(f"[CHECK] {map_path}: " + ", ".join(f"{name} {n}" for name, n in counts.items() if name != "noop"))
+    return bad
+
+
+def main():
+    import argparse
+    import time
+
+    ap = argparse.ArgumentParser(description="batched numpy engine: equivalence check against the reference engine, or benchmark")
+    ap.add_argument("--check", nargs="+", default=None, help="maps to check against the reference engine")
+    ap.add_argument("--bench", default=None, help="map to benchmark")
+    ap.add_argument("--games", type=int, default=16, help="games stepped together")
+    ap.add_argument("--turns", type=int, default=300, help="turns per game")
+    ap.add_argument("--seed", type=int, default=0, help="seed of the random actions")
+    args = ap.parse_args()
+
+    if args.check:
+        total = 0
+        for map_path in args.check:
+            bad = check(map_path, args.games, args.turns, args.seed)
+            print(f"[CHECK] {map_path}: {args.games} games x {args.turns} turns, {bad} mismatching turns")
+            total += bad
+        raise SystemExit(1 if total else 0)
+
+    if args.bench:
+        engine = BatchEngine(args.bench, args.games, turn_limit=args.turns)
+        rng = np.random.default_rng(args.seed)
+        high = (len(ACTIONS), len(TARGETS), len(MOVES))
+        t0 = time.perf_counter()
+        for _ in range(args.turns):
+            engine.step(rng.integers(0, high, size=(args.games, len(engine.bot_ids), 3)))
+        dt = time.perf_counter() - t0
+        print(f"[BENCH] {args.games} games x {args.turns} turns: {args.games * args.turns / dt:,.0f} game turns/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# bench_startup.py
+
+'''python src/bench_startup.py --red bots/duo_noodle_bot.py --blue bots/duo_noodle_bot.py --map maps/map1.txt'''
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+#modules that must never be pulled in by a headless run
+HEADLESS_FORBIDDEN = ("pygame", "render")
+
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    '''parses `python -X importtime` output into {module: (self_us, cumulative_us)}'''
+    res: Dict[str, Tuple[int, int]] = {}
+    for ln in stderr.splitlines():
+        if not ln.startswith("import time:"):
+            continue
+        parts = ln[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue #header line
+        name = parts[2].strip()
+        res[name] = (int(parts[0]), int(parts[1]))
+    return res
+
+
+def time_import(module: str) -> Dict[str, Tuple[int, int]]:
+    '''import a module in a fresh interpreter with -X importtime'''
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(proc.stderr)
+
+
+def time_startup(red: str, blue: str, map_path: str) -> float:
+    '''wall time of a fresh interpreter that imports the engine and sets up a headless Game'''
+    code = (
+        "import game\n"
+        f"game.Game({red!r}, {blue!r}, {map_path!r})\n"
+    )
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=SRC_DIR, capture_output=True, check=True)
+    return time.perf_counter() - t0
+
+
+def time_bare_interpreter() -> float:
+    '''wall time of `python -c pass`, the floor we cannot go below'''
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], capture_output=True, check=True)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="headless startup benchmark")
+    ap.add_argument("--red", required=True, help="path to red bot python file")
+    ap.add_argument("--blue", required=True, help="path to blue bot python file")
+    ap.add_argument("--map", required=True, help="path to map text file")
+    ap.add_argument("--runs", type=int, default=10, help="number of fresh interpreters to time")
+    ap.add_argument("--top", type=int, default=10, help="how many of the slowest imports to list")
+    ap.add_argument("--budget-ms", type=float, default=None, help="fail if median startup overhead exceeds this")
+    args = ap.parse_args()
+
+    red, blue, map_path = (os.path.abspath(p) for p in (args.red, args.blue, args.map))
+
+    #import graph of the engine
+    imports = time_import("game")
+    bad = [m for m in HEADLESS_FORBIDDEN if m in imports]
+    total_us = imports.get("game", (0, 0))[1]
+    print(f"[IMPORT] game: {total_us / 1000:.1f}ms cumulative")
+    slowest: List[Tuple[str, Tuple[int, int]]] = sorted(imports.items(), key=lambda kv: kv[1][0], reverse=True)
+    for name, (self_us, cum_us) in slowest[: args.top]:
+        print(f"  {name:<32} self={self_us / 1000:6.1f}ms  cumulative={cum_us / 1000:6.1f}ms")
+
+    #full startup, minus the bare interpreter
+    bare = statistics.median(time_bare_interpreter() for _ in range(args.runs))
+    runs = [time_startup(red, blue, map_path) for _ in range(args.runs)]
+    med = statistics.median(runs)
+    overhead_ms = (med - bare) * 1000
+    print(f"[STARTUP] interpreter={bare * 1000:.1f}ms  headless game={med * 1000:.1f}ms  overhead={overhead_ms:.1f}ms  (median of {args.runs})")
+
+    failed = False
+    if bad:
+        print(f"[FAIL] headless import pulled in: {', '.join(bad)}")
+        failed = True
+    if args.budget_ms is not None and overhead_ms > args.budget_ms:
+        print(f"[FAIL] startup overhead {overhead_ms:.1f}ms > budget {args.budget_ms:.1f}ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# env.py
+
+'''
+from env import CookingEnv
+from game_constants import Team
+
+env = CookingEnv("maps/map1.txt", turn_limit=500)
+state = env.reset(seed=0)
+done = False
+while not done:
+    actions = {team: [policy(state, bot_id, env.action_mask(bot_id)) for bot_id in env.bot_ids[team]] for team in Team}
+    state, reward, done, info = env.step(actions)
+
+A gym-style environment over GameState and RobotController for training agents:
+no bot files, threads, timeouts, replays or rendering. The map is parsed once and
+reset() restores the initial state from a pickled snapshot.
+
+Every bot does one (action, target, move) triple of indices per turn:
+
+    action: ACTIONS[i], a RobotController action or ("buy", item); ACTIONS[0] does nothing
+    target: TARGETS[j], offset (dx, dy) of the target tile from the bot
+    move:   MOVES[k], a step (dx, dy); MOVES[0] stays put
+
+The action comes before the move, so both are checked against the same state and
+action_mask() (RobotController.legal_action_mask) is exact for a bot on its own (a
+teammate acting first can still change its tile or block its step). Blue's bots go
+before red's, as in Game.run_game, and a team switches maps, before its bots act, by
+being in step(..., switch=...).
+
+The state returned is the live GameState, so treat it as read-only. The reward is
+each team's money change since the last state.
+'''
+
+import random
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from game import StateTemplate, derive_seed
+from game_constants import GameConstants, Team
+from game_state import GameState
+#the action vocabulary is RobotController's (legal_action_mask), re-exported here
+from robot_controller import ACTIONS, TARGETS, RobotController
+
+
+MOVES: List[Tuple[int, int]] = TARGETS
+
+BotAction = Tuple[int, int, int]  # (action, target, move) indices
+NOOP: BotAction = (0, 0, 0)
+
+
+class CookingEnv:
+    '''
+    Both teams of one map, stepped together. Bot ids, in the order step() takes their
+    actions, are in bot_ids[team].
+    '''
+    def __init__(self, map_path: str, turn_limit: int = GameConstants.TOTAL_TURNS):
+        self.template = StateTemplate(map_path)
+        self.turn_limit = turn_limit
+
+        state = self.template.new_state()
+        self.bot_ids: Dict[Team, List[int]] = {
+            team: sorted(bid for bid, b in state.bots.items() if b.team == team) for team in (Team.RED, Team.BLUE)
+        }
+
+        self.state: GameState = state
+        self.controllers: Dict[Team, RobotController] = {}
+        self.rng = random.Random()
+        self._money: Dict[Team, int] = {}
+
+    def reset(self, seed: Optional[int] = None) -> GameState:
+        '''
+        back to turn 1 of a fresh game. The engine itself is deterministic; a seed
+        reseeds the global random stream like Game(seed=...) and env.rng, for policies
+        '''
+        if seed is not None:
+            random.seed(derive_seed(seed, "engine"))
+            self.rng.seed(derive_seed(seed, "env"))
+
+        self.state = self.template.new_state()
+        self.controllers = {team: RobotController(team, self.state, quiet=True) for team in (Team.RED, Team.BLUE)}
+
+        #first turn starts right away, like Game.run_game
+        self.state.start_turn()
+        self._money = {team: self.state.get_team_money(team) for team in (Team.RED, Team.BLUE)}
+        return self.state
+
+    # ----------------------------
+    # Stepping
+    # ----------------------------
+
+    def _act(self, controller: RobotController, bot_id: int, action: BotAction) -> Tuple[bool, bool]:
+        act, target, move = action
+        b = self.state.bots[bot_id]
+        acted = moved = False
+
+        if act:
+            name = ACTIONS[act]
+            dx, dy = TARGETS[target]
+            tx, ty = b.x + dx, b.y + dy
+            if isinstance(name, tuple):
+                acted = controller.buy(bot_id, name[1], tx, ty)
+            else:
+                acted = getattr(controller, name)(bot_id, tx, ty)
+
+        if move:
+            dx, dy = MOVES[move]
+            moved = controller.move(bot_id, dx, dy)
+
+        return acted, moved
+
+    def step(self, actions: Dict[Team, List[BotAction]], switch: Iterable[Team] = ()):
+        '''
+        one turn: every bot's (action, target, move), per team in bot_ids order (missing
+        bots do nothing). Returns (state, reward, done, info); reward and info["results"]
+        are per team, results holding (acted, moved) for each bot.
+        '''
+        switch = set(switch)
+        results: Dict[Team, List[Tuple[bool, bool]]] = {}
+
+        for team in (Team.BLUE, Team.RED):
+            controller = self.controllers[team]
+            if team in switch:
+                controller.switch_maps()
+
+            team_actions = actions.get(team, ())
+            res = []
+            for i, bot_id in enumerate(self.bot_ids[team]):
+                res.append(self._act(controller, bot_id, team_actions[i]) if i < len(team_actions) else (False, False))
+            results[team] = res
+
+        done = self.state.turn >= self.turn_limit
+        if not done:
+            self.state.start_turn()
+
+        reward = {}
+        for team in (Team.RED, Team.BLUE):
+            money = self.state.get_team_money(team)
+            reward[team] = money - self._money[team]
+            self._money[team] = money
+
+        info = {"turn": self.state.turn, "results": results}
+        if done:
+            red, blue = self._money[Team.RED], self._money[Team.BLUE]
+            info["winner"] = Team.RED if red > blue else Team.BLUE if blue > red else None
+        return self.state, reward, done, info
+
+    # ----------------------------
+    # Masks
+    # ----------------------------
+
+    def move_mask(self, bot_id: int) -> List[bool]:
+        '''which MOVES the bot can make now'''
+        return self.controllers[self.state.bots[bot_id].team].legal_move_mask(bot_id)
+
+    def action_mask(self, bot_id: int) -> List[List[bool]]:
+        '''mask[i][j]: would ACTIONS[i] on TARGETS[j] succeed now; noop always does'''
+        return self.controllers[self.state.bots[bot_id].team].legal_action_mask(bot_id)
+
+    def can_switch(self, team: Team) -> bool:
+        return self.controllers[team].can_switch_maps()
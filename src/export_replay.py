@@ -0,0 +1,149 @@
+# export_replay.py
+
+'''
+python src/export_replay.py replay_path.json --out frames/
+python src/export_replay.py replay_path.json --out match.mp4 --start 100 --end 200 --scale 0.5
+python src/export_replay.py --red bots/duo_noodle_bot.py --blue bots/duo_noodle_bot.py --map maps/map1.txt --out match.gif
+'''
+
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+#no window anywhere in this tool, including the worker processes
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+from frames import MapLayout, RenderFrame
+from replay import ReplayIndex
+
+
+VIDEO_EXTS = (".mp4", ".webm", ".mkv", ".gif")
+
+
+def _render_chunk(layout: MapLayout, frames: List[Tuple[int, RenderFrame]], out_dir: str, scale: float) -> int:
+    '''worker: draw each (output index, frame) and save it as a PNG; returns frames written'''
+    from render import Renderer  # before pygame, render hides the support banner
+    import pygame
+
+    renderer = Renderer(None, layout=layout)
+    renderer.init()
+    size = (max(1, round(renderer.win_w * scale)), max(1, round(renderer.win_h * scale)))
+
+    try:
+        for out_idx, frame in frames:
+            #the renderer keeps screen up to date incrementally, so it always holds the full image
+            renderer.draw_frame(frame)
+            surf = renderer.screen if scale == 1.0 else pygame.transform.smoothscale(renderer.screen, size)
+            pygame.image.save(surf, os.path.join(out_dir, f"frame_{out_idx:05d}.png"))
+    finally:
+        renderer.close()
+    return len(frames)
+
+
+def export_frames(index: ReplayIndex, out_dir: str, *, start_turn: Optional[int] = None, end_turn: Optional[int] = None,
+                  scale: float = 1.0, workers: Optional[int] = None) -> int:
+    '''render turns [start_turn, end_turn] of a replay to out_dir/frame_%05d.png in parallel; returns frame count'''
+    first = 0 if start_turn is None else index.index_of_turn(start_turn)
+    last = len(index) - 1 if end_turn is None else index.index_of_turn(end_turn)
+    if last < first:
+        return 0
+
+    os.makedirs(out_dir, exist_ok=True)
+    indices = list(range(first, last + 1))
+    workers = max(1, min(workers or os.cpu_count() or 1, len(indices)))
+
+    #contiguous turn ranges, so each worker's incremental redraws stay small
+    per = (len(indices) + workers - 1) // workers
+    chunks = [indices[i:i + per] for i in range(0, len(indices), per)]
+
+    ctx = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=len(chunks), mp_context=ctx) as pool:
+        futures = [
+            pool.submit(_render_chunk, index.layout, [(i - first, index.frame(i)) for i in chunk], out_dir, scale)
+            for chunk in chunks
+        ]
+        return sum(f.result() for f in futures)
+
+
+def encode_video(frames_dir: str, out_path: str, fps: int) -> None:
+    '''stitch frame_%05d.png into a video or gif with ffmpeg'''
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg not found on PATH; export PNG frames instead (--out a directory)")
+
+    cmd = [ffmpeg, "-y", "-loglevel", "error", "-framerate", str(fps), "-i", os.path.join(frames_dir, "frame_%05d.png")]
+    if out_path.lower().endswith(".gif"):
+        cmd += ["-vf", "split[a][b];[a]palettegen[p];[b][p]paletteuse"]
+    else:
+        #yuv420p needs even dimensions
+        cmd += ["-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-pix_fmt", "yuv420p"]
+    cmd.append(out_path)
+    subprocess.run(cmd, check=True)
+
+
+def record_live_match(red: str, blue: str, map_path: str, turns: int, timeout: float, replay_path: str) -> None:
+    '''play a headless match and write its replay'''
+    from game import Game
+
+    g = Game(red, blue, map_path, replay_path=replay_path, turn_limit=turns, per_turn_timeout_s=timeout)
+    try:
+        g.run_game()
+    finally:
+        g.close()
+
+
+def main():
+    from game_constants import GameConstants
+
+    ap = argparse.ArgumentParser(description="headless export of a replay (or a live match) to PNG frames or a video")
+    ap.add_argument("replay", nargs="?", default=None, help="replay json written by game.py --replay")
+    ap.add_argument("--red", default=None, help="play a live match instead: red bot file")
+    ap.add_argument("--blue", default=None, help="play a live match instead: blue bot file")
+    ap.add_argument("--map", default=None, help="play a live match instead: map file")
+    ap.add_argument("--turns", type=int, default=GameConstants.TOTAL_TURNS, help="turn limit for a live match")
+    ap.add_argument("--timeout", type=float, default=0.5, help="per-turn timeout for a live match")
+    ap.add_argument("--out", required=True, help="output directory for PNGs, or a .mp4/.webm/.mkv/.gif file")
+    ap.add_argument("--start", type=int, default=None, help="first turn to export")
+    ap.add_argument("--end", type=int, default=None, help="last turn to export")
+    ap.add_argument("--scale", type=float, default=1.0, help="downscale factor, e.g. 0.5")
+    ap.add_argument("--fps", type=int, default=10, help="frames per second of the video")
+    ap.add_argument("--workers", type=int, default=None, help="encoder processes (default: cpu count)")
+    args = ap.parse_args()
+
+    live = args.red or args.blue or args.map
+    if live and not (args.red and args.blue and args.map):
+        ap.error("a live match needs --red, --blue and --map")
+    if not live and args.replay is None:
+        ap.error("give a replay file or --red/--blue/--map")
+    if not 0.0 < args.scale <= 1.0:
+        ap.error("--scale must be in (0, 1]")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        replay_path = args.replay
+        if live:
+            replay_path = os.path.join(tmp, "replay.json")
+            record_live_match(args.red, args.blue, args.map, args.turns, args.timeout, replay_path)
+
+        index = ReplayIndex.from_file(replay_path)
+
+        video = args.out.lower().endswith(VIDEO_EXTS)
+        frames_dir = os.path.join(tmp, "frames") if video else args.out
+        n = export_frames(index, frames_dir, start_turn=args.start, end_turn=args.end, scale=args.scale, workers=args.workers)
+        if n == 0:
+            print("[EXPORT] no turns in range")
+            sys.exit(1)
+
+        if video:
+            os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+            encode_video(frames_dir, args.out, args.fps)
+        print(f"[EXPORT] wrote {n} frames to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+# frames.py
+'''
+Render frames: the plain-data snapshot of everything a viewer draws for one turn.
+
+Frames only hold labels and positions (no tiles, no item objects), so they are cheap
+to diff between turns and do not need pygame to build.
+'''
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from game_constants import Team
+from game_state import GameState, Order
+from map import Map
+from tiles import Box
+from item import Food, Plate, Pan
+
+
+# ----------------------------
+# Labels
+# ----------------------------
+
+def item_label(it) -> str:
+    if it is None:
+        return ""
+    if isinstance(it, Food):
+        # e.g. "MEAT" -> "M"
+        return it.food_name[:1]
+    if isinstance(it, Plate):
+        if it.dirty:
+            return "Pd"
+        # show up to 3 foods: "P(MTL)"
+        letters = "".join([(f.food_name[:1] if isinstance(f, Food) else "?") for f in it.food[:3]])
+        return f"P({letters})" if letters else "P"
+    if isinstance(it, Pan):
+        if it.food is None:
+            return "Pan"
+        if isinstance(it.food, Food):
+            return f"Pan({it.food.food_name[:1]})"
+        return "Pan(?)"
+    return type(it).__name__[:6]
+
+
+def item_dict_label(d: Optional[Dict[str, Any]]) -> str:
+    '''item_label for the serialized items found in replays'''
+    if d is None:
+        return ""
+    kind = d.get("type")
+    if kind == "Food":
+        return d["food_name"][:1]
+    if kind == "Plate":
+        if d.get("dirty"):
+            return "Pd"
+        letters = "".join([(f.get("food_name") or "?")[:1] for f in d.get("food", [])[:3]])
+        return f"P({letters})" if letters else "P"
+    if kind == "Pan":
+        food = d.get("food")
+        if food is None:
+            return "Pan"
+        return f"Pan({food['food_name'][:1]})"
+    return str(kind)[:6]
+
+
+def _order_text(order_id: int, required: List[str], created: int, expires: int, reward: int, penalty: int, turn: int) -> str:
+    req = ",".join(required)
+    remaining = expires - turn
+    return f"#{order_id} [{req}]  t={created}->{expires}  rem={remaining}  R={reward} P={penalty}"
+
+
+def order_label(o: Order, turn: int) -> str:
+    return _order_text(o.order_id, [ft.food_name for ft in o.required], o.created_turn, o.expires_turn, o.reward, o.penalty, turn)
+
+
+# ----------------------------
+# Layout (what never changes)
+# ----------------------------
+
+@dataclass
+class MapLayout:
+    '''tile names of both maps, indexed [x][y] like Map.tiles'''
+    width: int
+    height: int
+    tile_names: Dict[Team, List[List[str]]]
+
+
+def layout_from_maps(red_map: Map, blue_map: Map) -> MapLayout:
+    names = {
+        team: [[getattr(t, "tile_name", "FLOOR") for t in col] for col in m.tiles]
+        for team, m in ((Team.RED, red_map), (Team.BLUE, blue_map))
+    }
+    # assume both maps same dimensions
+    return MapLayout(width=red_map.width, height=red_map.height, tile_names=names)
+
+
+def layout_from_state(gs: GameState) -> MapLayout:
+    return layout_from_maps(gs.red_map, gs.blue_map)
+
+
+def layout_from_dict(state: Dict[str, Any]) -> MapLayout:
+    '''layout from one GameState.to_dict() entry of a replay'''
+    names = {
+        team: [[cell.get("tile_name", "FLOOR") for cell in col] for col in state[key]]
+        for team, key in ((Team.RED, "red_map"), (Team.BLUE, "blue_map"))
+    }
+    red = state["red_map"]
+    return MapLayout(width=len(red), height=len(red[0]) if red else 0, tile_names=names)
+
+
+# ----------------------------
+# Frame
+# ----------------------------
+
+class BotView(NamedTuple):
+    bot_id: int
+    team: Team
+    map_team: Team
+    x: int
+    y: int
+    holding: str  # item label, "" if empty-handed
+
+
+@dataclass
+class RenderFrame:
+    '''everything a renderer draws for one turn'''
+    turn: int
+    money: Dict[Team, int]
+    cells: Dict[Team, Dict[Tuple[int, int], str]]  # map team -> {(x, y): item label}, empty labels omitted
+    bots: List[BotView]  # sorted by bot_id
+    orders: Dict[Team, List[str]] = field(default_factory=dict)  # team -> active order labels
+
+
+def frame_from_state(gs: GameState) -> RenderFrame:
+    '''snapshot a live GameState into a frame'''
+    cells: Dict[Team, Dict[Tuple[int, int], str]] = {}
+    for team in (Team.RED, Team.BLUE):
+        m = gs.get_map(team)
+        labels: Dict[Tuple[int, int], str] = {}
+        for x in range(m.width):
+            col = m.tiles[x]
+            for y in range(m.height):
+                t = col[y]
+
+                if isinstance(t, Box) and getattr(t, "count", 0) > 0:
+                    label = item_label(getattr(t, "item", None))
+                    labels[(x, y)] = f"{label}x{t.count}" if label else f"x{t.count}"
+                    continue
+
+                it = getattr(t, "item", None)
+                if it is None:
+                    continue
+                label = item_label(it)
+                if label:
+                    labels[(x, y)] = label
+        cells[team] = labels
+
+    bots = [
+        BotView(bot_id, b.team, getattr(b, "map_team", b.team), b.x, b.y, item_label(b.holding))
+        for bot_id, b in sorted(gs.bots.items(), key=lambda kv: kv[0])
+    ]
+
+    orders = {
+        team: [order_label(o, gs.turn) for o in gs.orders.get(team, []) if o.is_active(gs.turn)]
+        for team in (Team.RED, Team.BLUE)
+    }
+
+    return RenderFrame(
+        turn=gs.turn,
+        money={Team.RED: gs.get_team_money(Team.RED), Team.BLUE: gs.get_team_money(Team.BLUE)},
+        cells=cells,
+        bots=bots,
+        orders=orders,
+    )
+
+
+def frame_from_dict(state: Dict[str, Any]) -> RenderFrame:
+    '''snapshot one GameState.to_dict() entry of a replay into a frame'''
+    turn = state["turn"]
+
+    cells: Dict[Team, Dict[Tuple[int, int], str]] = {}
+    for team, key in ((Team.RED, "red_map"), (Team.BLUE, "blue_map")):
+        labels: Dict[Tuple[int, int], str] = {}
+        for x, col in enumerate(state[key]):
+            for y, cell in enumerate(col):
+                count = cell.get("count", 0)
+                if cell.get("tile_name") == "BOX" and count > 0:
+                    label = item_dict_label(cell.get("item"))
+                    labels[(x, y)] = f"{label}x{count}" if label else f"x{count}"
+                    continue
+
+                label = item_dict_label(cell.get("item"))
+                if label:
+                    labels[(x, y)] = label
+        cells[team] = labels
+
+    bots = [
+        BotView(b["bot_id"], Team[b["team"]], Team[b.get("map_team", b["team"])], b["x"], b["y"], item_dict_label(b.get("holding")))
+        for b in sorted(state["bots"], key=lambda b: b["bot_id"])
+    ]
+
+    orders: Dict[Team, List[str]] = {}
+    for team in (Team.RED, Team.BLUE):
+        labels_o: List[str] = []
+        for o in state["orders"].get(team.name, []):
+            if o["created_turn"] <= turn <= o["expires_turn"] and o["completed_turn"] is None:
+                labels_o.append(_order_text(o["order_id"], o["required"], o["created_turn"], o["expires_turn"], o["reward"], o["penalty"], turn))
+        orders[team] = labels_o
+
+    return RenderFrame(
+        turn=turn,
+        money={team: state["team_money"][team.name] for team in (Team.RED, Team.BLUE)},
+        cells=cells,
+        bots=bots,
+        orders=orders,
+    )
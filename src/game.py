@@ -2,11 +2,13 @@
 
 '''python src/game.py --red bots/sample_bot.py --blue bots/sample_bot.py --map maps/tiny_map.txt --render'''
 
-import argparse
-import copy
+import functools
+import hashlib
 import importlib.util
 import json
 import os
+import pickle
+import random
 import sys
 import time
 import traceback
@@ -15,10 +17,9 @@ from typing import Optional, Any, Dict, List, Tuple
 
 from game_constants import Team, GameConstants
 from game_state import GameState
-from robot_controller import RobotController
+from robot_controller import ACTION_LOG_FORMAT, RobotController
 
 from map_processor import load_two_team_maps_and_orders
-from render import Renderer
 
 
 def import_file(module_name: str, file_path: str):
@@ -51,94 +52,269 @@ def find_default_floor_spawn(m, prefer_center=True) -> Tuple[int, int]:
     return (0, 0)
 
 
-class Game:
-    def __init__(
-        self,
-        red_bot_path: str,
-        blue_bot_path: str,
-        map_path: str,
-        replay_path: Optional[str] = None,
-        render: bool = False,
-        turn_limit: int = GameConstants.TOTAL_TURNS,
-        per_turn_timeout_s: float = 0.5,
-        fps_cap: int = 30,
-    ):
-        self.render_enabled = render
-        self.turn_limit = turn_limit
-        self.per_turn_timeout_s = per_turn_timeout_s
-        self.fps_cap = fps_cap
-
-        self.replay_path = replay_path
-        if replay_path is not None:
-            os.makedirs(os.path.dirname(replay_path) or ".", exist_ok=True)
+# ----------------------------
+# Seeding and engine identity
+# ----------------------------
+
+#the files whose behaviour decides a match result; bots and maps are hashed separately
+ENGINE_FILES = (
+    "game.py", "game_state.py", "robot_controller.py", "map.py", "map_processor.py",
+    "tiles.py", "item.py", "game_constants.py",
+)
+
+
+@functools.lru_cache(maxsize=None)
+def engine_version() -> str:
+    '''content hash of the engine sources, changes whenever match results could'''
+    h = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in ENGINE_FILES:
+        with open(os.path.join(here, name), "rb") as f:
+            h.update(name.encode() + b"\0" + f.read())
+    return h.hexdigest()[:16]
+
+
+def derive_seed(seed: int, stream: str) -> int:
+    '''independent, reproducible seed per stream (unlike hash(), stable across processes)'''
+    return int.from_bytes(hashlib.sha256(f"{seed}:{stream}".encode()).digest()[:8], "big")
+
+
+def seed_match(seed: int, template: "MatchTemplate") -> None:
+    '''
+    Seed everything random in a match: the global random module (engine, and bots that
+    did `from random import ...`) and a private random.Random per bot in place of the
+    `random` module a bot file imported, so one bot's draws never shift the other's.
+    '''
+    random.seed(derive_seed(seed, "engine"))
+    for team, module in ((Team.RED, template.red_module), (Team.BLUE, template.blue_module)):
+        if module is None:
+            continue
+        bound = getattr(module, "random", None)
+        if bound is random or isinstance(bound, random.Random):
+            module.random = random.Random(derive_seed(seed, team.name))
+
+
+class StateTemplate:
+    '''
+    The parsed map of a match and its initial game state, with the bots spawned.
+    Stamps out fresh states and map copies without re-parsing the map file.
+    '''
+    def __init__(self, map_path: str):
+        self.map_path = map_path
 
         #load the maps
         map_red, map_blue, orders_red, orders_blue, parsed = load_two_team_maps_and_orders(map_path)
 
-        #create game state
-        self.game_state = GameState(red_map=map_red, blue_map=map_blue)
-
+        #create the initial game state once
+        game_state = GameState(red_map=map_red, blue_map=map_blue)
 
         #get midgame switch window from map
-        self.game_state.switch_turn = getattr(parsed, "switch_turn", GameConstants.MIDGAME_SWITCH_TURN)
-        self.game_state.switch_duration = getattr(parsed, "switch_duration", GameConstants.MIDGAME_SWITCH_DURATION)
-
+        game_state.switch_turn = getattr(parsed, "switch_turn", GameConstants.MIDGAME_SWITCH_TURN)
+        game_state.switch_duration = getattr(parsed, "switch_duration", GameConstants.MIDGAME_SWITCH_DURATION)
 
         #load orders into the game state
-        self.game_state.orders[Team.RED] = orders_red
-        self.game_state.orders[Team.BLUE] = orders_blue
+        game_state.orders[Team.RED] = orders_red
+        game_state.orders[Team.BLUE] = orders_blue
 
         #make next_order_id to avoid collisions if spawn_order() is useed later
         max_id = 0
         for o in orders_red:
             max_id = max(max_id, o.order_id)
-        self.game_state.next_order_id = max_id + 1
+        game_state.next_order_id = max_id + 1
+
+        #resolve the spawn list from the parsed map
+        if parsed.spawns_red:
+            self.spawns_red = list(parsed.spawns_red)
+        else:
+            self.spawns_red = [find_default_floor_spawn(game_state.red_map)]
+
+        if parsed.spawns_blue:
+            self.spawns_blue = list(parsed.spawns_blue)
+        else:
+            self.spawns_blue = [find_default_floor_spawn(game_state.blue_map)]
+
+        #bots get a pristine copy of their map, so snapshot the maps before the bots are placed
+        self._red_map_blob = pickle.dumps(game_state.red_map, protocol=pickle.HIGHEST_PROTOCOL)
+        self._blue_map_blob = pickle.dumps(game_state.blue_map, protocol=pickle.HIGHEST_PROTOCOL)
+
+        #put the bots in the parsed map
+        for (x, y) in self.spawns_red:
+            game_state.add_bot(Team.RED, x, y)
+        for (x, y) in self.spawns_blue:
+            game_state.add_bot(Team.BLUE, x, y)
+
+        #pickle round trips are much cheaper than deepcopy for the tile grids
+        self._state_blob = pickle.dumps(game_state, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def new_state(self) -> GameState:
+        '''fresh initial game state with the bots already spawned'''
+        return pickle.loads(self._state_blob)
+
+    def new_map_copy(self, team: Team):
+        '''fresh copy of the initial map for a BotPlayer constructor'''
+        return pickle.loads(self._red_map_blob if team == Team.RED else self._blue_map_blob)
+
+
+class MatchTemplate(StateTemplate):
+    '''
+    Everything about a match that does not change between runs: the parsed map,
+    the imported bot classes and the spawn list. Stamps out fresh states and
+    players so repeated matches skip re-importing and re-parsing.
+
+    Note that bot modules are imported once, so module level globals in a bot
+    file persist across matches stamped from the same template.
+    '''
+    def __init__(self, red_bot_path: str, blue_bot_path: str, map_path: str):
+        super().__init__(map_path)
+        self.red_bot_path = red_bot_path
+        self.blue_bot_path = blue_bot_path
 
         #import bots, need the play turn mechanic
-        self.red_failed_init = False
-        self.blue_failed_init = False
+        self.red_player_cls = None
+        self.blue_player_cls = None
+        self.red_module = None
+        self.blue_module = None
 
         #try to import
         try:
             red_name = os.path.basename(red_bot_path).rsplit(".", 1)[0]
-            self.red_player = import_file(red_name, red_bot_path).BotPlayer(copy.deepcopy(self.game_state.red_map))
+            self.red_module = import_file(red_name, red_bot_path)
+            self.red_player_cls = self.red_module.BotPlayer
         except Exception as e:
-            self.red_failed_init = True
             print(f"[INIT] Red bot failed: {e}")
             traceback.print_exc()
 
         try:
             blue_name = os.path.basename(blue_bot_path).rsplit(".", 1)[0]
-            self.blue_player = import_file(blue_name, blue_bot_path).BotPlayer(copy.deepcopy(self.game_state.blue_map))
+            self.blue_module = import_file(blue_name, blue_bot_path)
+            self.blue_player_cls = self.blue_module.BotPlayer
         except Exception as e:
-            self.blue_failed_init = True
             print(f"[INIT] Blue bot failed: {e}")
             traceback.print_exc()
 
-        #generate the controllers
-        self.red_controller = RobotController(Team.RED, self.game_state)
-        self.blue_controller = RobotController(Team.BLUE, self.game_state)
+    def new_game(self, **kwargs) -> "Game":
+        '''new Game sharing this template; kwargs are the Game settings'''
+        return Game(self.red_bot_path, self.blue_bot_path, self.map_path, template=self, **kwargs)
 
-        #put the bots in the parsed map
-        if parsed.spawns_red:
-            for (x, y) in parsed.spawns_red:
-                self.game_state.add_bot(Team.RED, x, y)
-        else:
-            x, y = find_default_floor_spawn(self.game_state.red_map)
-            self.game_state.add_bot(Team.RED, x, y)
 
-        if parsed.spawns_blue:
-            for (x, y) in parsed.spawns_blue:
-                self.game_state.add_bot(Team.BLUE, x, y)
+class Game:
+    def __init__(
+        self,
+        red_bot_path: str,
+        blue_bot_path: str,
+        map_path: str,
+        replay_path: Optional[str] = None,
+        render: bool = False,
+        turn_limit: int = GameConstants.TOTAL_TURNS,
+        per_turn_timeout_s: float = 0.5,
+        fps_cap: int = 30,
+        template: Optional[MatchTemplate] = None,
+        render_process: bool = False,
+        render_text: bool = False,
+        renderer=None,
+        seed: Optional[int] = None,
+        early_stop: bool = False,
+        replay_hashes: bool = False,
+        record_actions: bool = False,
+        replay_format: str = "states",
+        checksum_every: int = 50,
+    ):
+        self.render_enabled = render or render_process or render_text or renderer is not None
+        self.render_process = render_process
+        self.render_text = render_text
+        self.turn_limit = turn_limit
+        self.per_turn_timeout_s = per_turn_timeout_s
+        self.fps_cap = fps_cap
+        self.seed = seed
+        self.early_stop = early_stop
+        self.replay_hashes = replay_hashes
+        #"actions" replays are event sourced: only the map and the action log, plus a state hash every checksum_every turns
+        if replay_format not in ("states", "actions"):
+            raise ValueError(f"unknown replay format {replay_format!r}")
+        self.replay_format = replay_format
+        self.checksum_every = max(1, checksum_every)
+        self.record_actions = record_actions or replay_format == "actions"
+
+        self.replay_path = replay_path
+        if replay_path is not None:
+            os.makedirs(os.path.dirname(replay_path) or ".", exist_ok=True)
+
+        #parse the map and import the bots unless a template already did
+        self.template = template if template is not None else MatchTemplate(red_bot_path, blue_bot_path, map_path)
+
+        self.renderer = None
+        self.reset()
+
+        #renderer if available, imported lazily so headless runs never load pygame
+        if renderer is not None:
+            #caller supplied, anything with gs, render_once() and close() (e.g. render_process.FrameSender)
+            self.renderer = renderer
+            self.renderer.gs = self.game_state
+        elif self.render_process:
+            #draws in its own process at its own pace, the turn loop runs at full speed
+            from render_process import RenderProcess
+            self.renderer = RenderProcess(self.game_state, fps_cap=self.fps_cap)
+        elif self.render_text:
+            #ansi terminal output, no pygame at all
+            from render_text import TextRenderer
+            self.renderer = TextRenderer(self.game_state)
+        elif self.render_enabled:
+            from render import Renderer
+            self.renderer = Renderer(self.game_state)
+
+    def reset(self) -> None:
+        '''start over from the template: new game state, new players, new controllers'''
+        template = self.template
+
+        #same seed, same match: reseed before the players are constructed
+        if self.seed is not None:
+            seed_match(self.seed, template)
+
+        #create game state
+        self.game_state = template.new_state()
+        self.decided_turn: Optional[int] = None
+
+        #construct the players from the already imported classes
+        self.red_failed_init = False
+        self.blue_failed_init = False
+
+        if template.red_player_cls is None:
+            self.red_failed_init = True
         else:
-            x, y = find_default_floor_spawn(self.game_state.blue_map)
-            self.game_state.add_bot(Team.BLUE, x, y)
+            try:
+                self.red_player = template.red_player_cls(template.new_map_copy(Team.RED))
+            except Exception as e:
+                self.red_failed_init = True
+                print(f"[INIT] Red bot failed: {e}")
+                traceback.print_exc()
 
-        #replay
+        if template.blue_player_cls is None:
+            self.blue_failed_init = True
+        else:
+            try:
+                self.blue_player = template.blue_player_cls(template.new_map_copy(Team.BLUE))
+            except Exception as e:
+                self.blue_failed_init = True
+                print(f"[INIT] Blue bot failed: {e}")
+                traceback.print_exc()
+
+        #generate the controllers, sharing one log of accepted calls so its order is the play order
+        self.action_log: Optional[List[List[Any]]] = [] if self.record_actions else None
+        self.red_controller = RobotController(Team.RED, self.game_state, action_log=self.action_log)
+        self.blue_controller = RobotController(Team.BLUE, self.game_state, action_log=self.action_log)
+
+        #replay, and the accepted calls of each of its turns
         self.replay: List[Dict[str, Any]] = []
+        self.actions: List[List[List[Any]]] = []
+        self.checksums: List[Tuple[int, str]] = []
+
+        #time spent in play_turn per team, for the results store
+        self.bot_time_s = {Team.RED: 0.0, Team.BLUE: 0.0}
+        self.bot_max_turn_s = {Team.RED: 0.0, Team.BLUE: 0.0}
+        self.bot_timeouts = {Team.RED: 0, Team.BLUE: 0}
 
-        #renderer if available
-        self.renderer = Renderer(self.game_state) if self.render_enabled else None
+        if self.renderer is not None:
+            self.renderer.gs = self.game_state
 
     def call_player(self, team: Team) -> bool:
         '''calls the player run code'''
@@ -153,6 +329,17 @@ class Game:
             player = self.blue_player
             controller = self.blue_controller
 
+        #plans run in the engine; the bot code only when one of its bots needs it
+        try:
+            call = controller.run_plans()
+        except Exception as e:
+            #a plan must not take the engine down, it counts against its team like a crash
+            print(f"[TURN RUNNER] {team.name} plans crashed: {e}")
+            traceback.print_exc()
+            return False
+        if not call:
+            return True
+
         ok = True
         exc: Optional[BaseException] = None
 
@@ -165,13 +352,17 @@ class Game:
                 ok = False
                 exc = e
 
-        t0 = time.time()
+        t0 = time.perf_counter()
         th = Thread(target=runner, daemon=True) #run in a separate thread
         th.start()
         th.join(self.per_turn_timeout_s)
-        dt = time.time() - t0
+        dt = time.perf_counter() - t0
+
+        self.bot_time_s[team] += dt
+        self.bot_max_turn_s[team] = max(self.bot_max_turn_s[team], dt)
 
         if th.is_alive():
+            self.bot_timeouts[team] += 1
             print(f"[TURN RUNNER] {team.name} timed out ({dt:.3f}s > {self.per_turn_timeout_s:.3f}s)")
             return False
         if not ok:
@@ -181,7 +372,21 @@ class Game:
         return True
 
     def record_turn(self):
-        self.replay.append(self.game_state.to_dict()) #for the replay rile
+        if self.action_log is not None:
+            self.actions.append(self.action_log[:])
+            self.action_log.clear()
+
+        if self.replay_format == "actions":
+            #no states, action_replay.py rebuilds them from the actions
+            if self.game_state.turn % self.checksum_every == 0:
+                self.checksums.append((self.game_state.turn, f"{self.game_state.state_hash():016x}"))
+            return
+
+        state = self.game_state.to_dict() #for the replay rile
+        if self.replay_hashes:
+            #hex, json numbers are not 64-bit safe everywhere
+            state["hash"] = f"{self.game_state.state_hash():016x}"
+        self.replay.append(state)
 
     def render(self) -> bool:
         '''render ONLY IF we want to render'''
@@ -230,6 +435,13 @@ class Game:
                 self.export_replay(None)
                 return None
 
+            #stop once no play can change the winner (a later crash or timeout still could)
+            if (self.early_stop and self.game_state.turn < self.turn_limit
+                    and self.game_state.decided_winner(self.turn_limit) is not None):
+                self.decided_turn = self.game_state.turn
+                print(f"[GAME] winner decided at turn {self.decided_turn} of {self.turn_limit}")
+                break
+
         red_money = self.game_state.get_team_money(Team.RED)
         blue_money = self.game_state.get_team_money(Team.BLUE)
         
@@ -246,7 +458,7 @@ class Game:
             winner = None
 
         self.export_replay(winner)
-        return None
+        return winner
 
     def export_replay(self, winner: Optional[Team]):
         '''json dump'''
@@ -254,13 +466,35 @@ class Game:
             return
         payload = {
             "winner": None if winner is None else winner.name,
-            "turns": len(self.replay),
+            "turns": len(self.actions) if self.replay_format == "actions" else len(self.replay),
             "switch_turn_start": self.game_state.switch_turn,
             "switch_turn_end": self.game_state.switch_turn + self.game_state.switch_duration, 
-            "replay": self.replay,
+            "decided_turn": self.decided_turn,
         }
+        if self.replay_format == "actions":
+            #the last turn is always checked
+            checksums = list(self.checksums)
+            if not checksums or checksums[-1][0] != self.game_state.turn:
+                checksums.append((self.game_state.turn, f"{self.game_state.state_hash():016x}"))
+            payload["format"] = "actions"
+            payload["seed"] = self.seed
+            payload["checksums"] = checksums
+        else:
+            payload["replay"] = self.replay
+        if self.record_actions:
+            #enough to play the match again without the bots (regress.py, action_replay.py)
+            with open(self.template.map_path, encoding="utf-8") as f:
+                map_text = f.read()
+            payload["engine_version"] = engine_version()
+            payload["turn_limit"] = self.turn_limit
+            payload["map"] = {"path": self.template.map_path, "text": map_text}
+            payload["action_log_format"] = ACTION_LOG_FORMAT
+            payload["actions"] = self.actions
         with open(self.replay_path, "w", encoding="utf-8") as f:
-            json.dump(payload, f, indent=2)
+            if self.replay_format == "actions":
+                json.dump(payload, f, separators=(",", ":"))
+            else:
+                json.dump(payload, f, indent=2)
         print(f"[REPLAY] wrote {self.replay_path}")
 
     def close(self):
@@ -270,15 +504,27 @@ class Game:
 
 def main():
     '''parse and run'''
+    import argparse
+
     ap = argparse.ArgumentParser()
     ap.add_argument("--red", required=True, help="path to red bot python file (defines BotPlayer)")
     ap.add_argument("--blue", required=True, help="path to blue bot python file (defines BotPlayer)")
     ap.add_argument("--map", required=True, help="path to map text file (layout + optional ORDERS:)")
     ap.add_argument("--replay", default=None, help="optional output replay json path")
     ap.add_argument("--render", action="store_true", help="enable pygame rendering")
+    ap.add_argument("--render-process", action="store_true", help="pygame rendering in a separate process; the match runs at full speed")
+    ap.add_argument("--render-text", action="store_true", help="draw the match in the terminal (works over ssh, no pygame)")
     ap.add_argument("--turns", type=int, default=GameConstants.TOTAL_TURNS, help="turn limit")
     ap.add_argument("--timeout", type=float, default=0.5, help="per-turn timeout seconds per bot")
     ap.add_argument("--fps", type=int, default=30, help="fps cap when rendering")
+    ap.add_argument("--db", default=None, help="record the result in this sqlite results database")
+    ap.add_argument("--seed", type=int, default=None, help="seed for the engine and both bots' random, for reproducible matches")
+    ap.add_argument("--early-stop", action="store_true", help="end the match once no play can change the winner; a bot that would crash or time out later could still have, so the winner is not guaranteed to be that of the full match")
+    ap.add_argument("--replay-hashes", action="store_true", help="store each turn's state hash in the replay")
+    ap.add_argument("--record-actions", action="store_true", help="store each turn's accepted actions and the map in the replay")
+    ap.add_argument("--replay-format", choices=("states", "actions"), default="states",
+                    help="actions: only the map, the action log and periodic checksums (see action_replay.py)")
+    ap.add_argument("--checksum-every", type=int, default=50, help="turns between state hashes in an actions replay")
     args = ap.parse_args()
 
     g = Game(
@@ -287,15 +533,28 @@ def main():
         map_path=args.map,
         replay_path=args.replay,
         render=args.render,
+        render_process=args.render_process,
+        render_text=args.render_text,
         turn_limit=args.turns,
         per_turn_timeout_s=args.timeout,
         fps_cap=args.fps,
+        seed=args.seed,
+        early_stop=args.early_stop,
+        replay_hashes=args.replay_hashes,
+        record_actions=args.record_actions,
+        replay_format=args.replay_format,
+        checksum_every=args.checksum_every,
     )
     try:
-        g.run_game()
+        winner = g.run_game()
     finally:
         g.close()
 
+    if args.db:
+        from results_store import ResultsStore, record_from_game
+        with ResultsStore(args.db) as store:
+            store.add(record_from_game(g, winner, seed=args.seed))
+
 
 if __name__ == "__main__":
     main()
@@ -4,8 +4,10 @@ Game state that keeps track of teams, bots, maps, team money, bot items, and ord
 
 from __future__ import annotations
 
+from collections import deque
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple, Any
+from enum import Enum
+from typing import Deque, Dict, List, Optional, Tuple, Any
 
 from game_constants import Team, TileType, FoodType, GameConstants
 from map import Map
@@ -45,6 +47,52 @@ class Order:
         return self.created_turn <= turn <= self.expires_turn and self.completed_turn is None
 
 
+# -----------------------
+# Events
+# -----------------------
+
+#events kept for RobotController.get_events_since(); older ones are dropped
+EVENT_BUFFER_SIZE = 4096
+
+
+class EventType(Enum):
+    '''what happened; the value is the name bots see'''
+    ORDER_CREATED = "order_created"
+    ORDER_COMPLETED = "order_completed"
+    ORDER_EXPIRED = "order_expired"
+    FOOD_COOKED = "food_cooked"
+    FOOD_BURNT = "food_burnt"
+    PLATE_WASHED = "plate_washed"
+    TEAM_SWITCHED = "team_switched"
+
+
+@dataclass
+class GameEvent:
+    '''one event, on the map of team (for TEAM_SWITCHED, the map switched onto)'''
+    seq: int #increases by one per event
+    turn: int
+    type: EventType
+    team: Team
+    x: Optional[int] = None #tile, for cookers, sinks and submit stations
+    y: Optional[int] = None
+    order_id: Optional[int] = None
+    bot_id: Optional[int] = None #bot that submitted
+    by: Optional[Team] = None #team that submitted or switched
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "seq": self.seq,
+            "turn": self.turn,
+            "type": self.type.value,
+            "team": self.team.name,
+            "x": self.x,
+            "y": self.y,
+            "order_id": self.order_id,
+            "bot_id": self.bot_id,
+            "by": None if self.by is None else self.by.name,
+        }
+
+
 def plate_food_signature(plate: Plate) -> List[Tuple[int, bool, int]]:
     '''Helper that basically creates a unique signature for each user plated food'''
 
@@ -141,6 +189,45 @@ def normalize_map_tiles(m: Map) -> None:
         raise GameStateException(f"cannot recognize map tile type: {type(sample)}")
 
 
+# -----------------------
+# State hashing
+# -----------------------
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(*values: int) -> int:
+    '''
+    splitmix64 over the values: the Zobrist key of one state component, derived on
+    demand instead of drawn from a table so it is the same in every process and run
+    '''
+    h = 0x9E3779B97F4A7C15
+    for v in values:
+        z = ((h ^ (v & _MASK64)) + 0x9E3779B97F4A7C15) & _MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+        h = z ^ (z >> 31)
+    return h
+
+
+def _item_code(it: Any) -> Tuple[int, ...]:
+    '''item as ints: kind, then what tells two items of that kind apart'''
+    if it is None:
+        return (0,)
+    if isinstance(it, Food):
+        return (1, it.food_id, int(bool(it.chopped)), int(it.cooked_stage))
+    if isinstance(it, FoodType):
+        return (1, it.food_id, 0, 0)
+    if isinstance(it, Plate):
+        code = [2, int(bool(it.dirty)), len(it.food)]
+        for f in it.food:
+            code.extend(_item_code(f)[1:])
+        return tuple(code)
+    if isinstance(it, Pan):
+        return (3,) + _item_code(it.food)
+    return (4,)
+
+
 # -----------------------
 # GameState
 # -----------------------
@@ -163,6 +250,9 @@ class GameState:
         
         self.next_order_id = 1
 
+        #most a single buy() can cost, found on first use by money_bounds()
+        self.max_buy_cost: Optional[int] = None
+
         #switching states
         self.switch_turn = GameConstants.MIDGAME_SWITCH_TURN
         self.switch_duration = GameConstants.MIDGAME_SWITCH_DURATION
@@ -172,6 +262,28 @@ class GameState:
         normalize_map_tiles(self.red_map)
         normalize_map_tiles(self.blue_map)
 
+        #tiles never change type, so the environment tick only has to visit cookers and sinks
+        self.ticking_tiles: Dict[Team, List[Tuple[int, int, Tile]]] = {
+            team: [
+                (x, y, t)
+                for x, column in enumerate(self.get_map(team).tiles)
+                for y, t in enumerate(column)
+                if isinstance(t, (Cooker, Sink))
+            ]
+            for team in (Team.RED, Team.BLUE)
+        }
+
+        #incremental state hash: hash of every bot / tile / order component, XORed into
+        #hash_value; mutations mark their components in hash_dirty (see state_hash())
+        self.hash_parts: Optional[Dict[Tuple, int]] = None #None until the first state_hash()
+        self.hash_dirty: set = set()
+        self.hash_value = 0
+
+        #ring buffer of what happened, newest last
+        self.events: Deque[GameEvent] = deque(maxlen=EVENT_BUFFER_SIZE)
+        self.event_seq = 0
+        self.order_openings: Optional[Dict[int, List[Tuple[Team, int]]]] = None #turn -> (team, order_id), built by start_turn()
+
         #occ maps
         self.occupancy = {
             Team.RED: [[None for _ in range(self.red_map.height)] for _ in range(self.red_map.width)],
@@ -227,6 +339,7 @@ class GameState:
         #start off at the beginning with current map team
         self.bots[bot_id] = BotState(bot_id=bot_id, team=team, x=x, y=y, holding=None, map_team=team)
         self.occupancy[team][x][y] = bot_id
+        self.touch_bot(bot_id)
         return bot_id
 
     def get_bot(self, bot_id: int) -> BotState:
@@ -239,9 +352,23 @@ class GameState:
     # Turn mechanics
     # -------------
 
+    def emit_event(self, type: EventType, team: Team, **fields) -> None:
+        '''append an event of this turn to the ring buffer'''
+        self.event_seq += 1
+        self.events.append(GameEvent(self.event_seq, self.turn, type, team, **fields))
+
     def start_turn(self) -> None:
         '''Run this at the start of each turn for environmental and passive'''
         self.turn += 1
+
+        #orders from the map file that open now (the first turn is 1), indexed by turn once
+        if self.order_openings is None:
+            self.order_openings = {}
+            for team in (Team.RED, Team.BLUE):
+                for o in self.orders.get(team, []):
+                    self.order_openings.setdefault(max(o.created_turn, 1), []).append((team, o.order_id))
+        for team, order_id in self.order_openings.get(self.turn, ()):
+            self.emit_event(EventType.ORDER_CREATED, team, order_id=order_id)
         
         #passive money
         self.add_team_money(Team.RED, GameConstants.MONEY_PER_TURN)
@@ -271,6 +398,7 @@ class GameState:
             t = m.tiles[nx][ny]
             if isinstance(t, SinkTable):
                 t.num_clean_plates += 1
+                self.touch_tile(team, nx, ny)
                 return
 
         #if there is no sink table near us in the common cas , we put the clean plates in the first sink table we see location
@@ -279,41 +407,43 @@ class GameState:
                 t = m.tiles[ix][iy]
                 if isinstance(t, SinkTable):
                     t.num_clean_plates += 1
+                    self.touch_tile(team, ix, iy)
                     return
 
     def tick_environment(self, team: Team) -> None:
         '''cooking ticks helper that basically cooks if pan is in the food or wash if the dishes are washing'''
-        m = self.get_map(team)
-
-        for x in range(m.width):
-            for y in range(m.height):
-
-                #get the tile
-                tile = m.tiles[x][y]
-
-                #if the tile is a cooker, then we auto cook it through ticking
-                if isinstance(tile, Cooker):
-                    pan = tile.item
-                    if isinstance(pan, Pan) and isinstance(pan.food, Food):
-                        tile.cook_progress += 1
-                        if tile.cook_progress == GameConstants.COOK_PROGRESS and pan.food.cooked_stage == 0:
-                            pan.food.cooked_stage = 1
-                        elif tile.cook_progress >= GameConstants.BURN_PROGRESS:
-                            pan.food.cooked_stage = 2
-
-                #if the tile is a sink, then if we are washing, then we clean it
-                if isinstance(tile, Sink):
-
-                    if tile.using and tile.num_dirty_plates > 0:
-                        tile.curr_dirty_plate_progress += 1
-
-                        if tile.curr_dirty_plate_progress >= GameConstants.PLATE_WASH_PROGRESS:
-                            tile.curr_dirty_plate_progress = 0
-                            tile.num_dirty_plates -= 1
-                            self.add_clean_plate_to_sinktable_near(team, x, y)
-
-                    # reset the tile each turn so the user needs ot keep washing
-                    tile.using = False
+        for x, y, tile in self.ticking_tiles[team]:
+
+            #if the tile is a cooker, then we auto cook it through ticking
+            if isinstance(tile, Cooker):
+                pan = tile.item
+                if isinstance(pan, Pan) and isinstance(pan.food, Food):
+                    self.touch_tile(team, x, y)
+                    tile.cook_progress += 1
+                    if tile.cook_progress == GameConstants.COOK_PROGRESS and pan.food.cooked_stage == 0:
+                        pan.food.cooked_stage = 1
+                        self.emit_event(EventType.FOOD_COOKED, team, x=x, y=y)
+                    elif tile.cook_progress >= GameConstants.BURN_PROGRESS:
+                        if pan.food.cooked_stage != 2:
+                            self.emit_event(EventType.FOOD_BURNT, team, x=x, y=y)
+                        pan.food.cooked_stage = 2
+
+            #if the tile is a sink, then if we are washing, then we clean it
+            if isinstance(tile, Sink):
+                if tile.using:
+                    self.touch_tile(team, x, y)
+
+                if tile.using and tile.num_dirty_plates > 0:
+                    tile.curr_dirty_plate_progress += 1
+
+                    if tile.curr_dirty_plate_progress >= GameConstants.PLATE_WASH_PROGRESS:
+                        tile.curr_dirty_plate_progress = 0
+                        tile.num_dirty_plates -= 1
+                        self.add_clean_plate_to_sinktable_near(team, x, y)
+                        self.emit_event(EventType.PLATE_WASHED, team, x=x, y=y)
+
+                # reset the tile each turn so the user needs ot keep washing
+                tile.using = False
 
     def expire_orders(self) -> None:
         '''
@@ -323,13 +453,15 @@ class GameState:
         for team in [Team.RED, Team.BLUE]:
             
             # We iterate through the existing list without creating a filtered copy
-            for o in self.orders.get(team, []):
+            for i, o in enumerate(self.orders.get(team, [])):
 
                 # Check if order is expired, not completed, and hasn't been penalized yet
                 if o.completed_turn is None and o.is_expired(self.turn):
                     if not o.penalized:
                         self.add_team_money(team, -o.penalty)
                         o.penalized = True
+                        self.touch_order(team, i)
+                        self.emit_event(EventType.ORDER_EXPIRED, team, order_id=o.order_id)
             
 
     # -------------
@@ -358,6 +490,14 @@ class GameState:
 
         self.orders[Team.RED].append(make_order())
         self.orders[Team.BLUE].append(make_order())
+        self.touch_order(Team.RED, len(self.orders[Team.RED]) - 1)
+        self.touch_order(Team.BLUE, len(self.orders[Team.BLUE]) - 1)
+
+        #orders in place before the game starts are announced by the first start_turn()
+        self.order_openings = None
+        if self.turn > 0:
+            self.emit_event(EventType.ORDER_CREATED, Team.RED, order_id=order_id)
+            self.emit_event(EventType.ORDER_CREATED, Team.BLUE, order_id=order_id)
 
         return order_id
 
@@ -374,6 +514,7 @@ class GameState:
             t = m.tiles[nx][ny]
             if isinstance(t, Sink):
                 t.num_dirty_plates += 1
+                self.touch_tile(team, nx, ny)
                 return
 
         # the first sink anywhere
@@ -382,6 +523,7 @@ class GameState:
                 t = m.tiles[ix][iy]
                 if isinstance(t, Sink):
                     t.num_dirty_plates += 1
+                    self.touch_tile(team, ix, iy)
                     return
 
     def submit_plate(self, bot_id: int, target_x: int, target_y: int) -> bool:
@@ -396,16 +538,20 @@ class GameState:
             return False
 
         order_team = bot.map_team #MAP OWNER, not the submission team
-        for o in self.orders.get(order_team, []):
+        for i, o in enumerate(self.orders.get(order_team, [])):
             if o.is_active(self.turn) and plate_matches_order(bot.holding, o):
                 o.claimed_by = bot_id
                 o.completed_turn = self.turn
+                self.touch_order(order_team, i)
+                self.touch_bot(bot_id)
 
                 #reward map owner
                 self.add_team_money(order_team, o.reward)
 
                 #dirty plate goes into sink on that map specifically
                 self.add_dirty_plate_to_sink_near(order_team, target_x, target_y)
+                self.emit_event(EventType.ORDER_COMPLETED, order_team, x=target_x, y=target_y,
+                                order_id=o.order_id, bot_id=bot_id, by=bot.team)
 
                 bot.holding = None #lets go of jitem
                 return True
@@ -435,6 +581,7 @@ class GameState:
         self.occupancy[bot.map_team][new_x][new_y] = bot_id
 
         bot.x, bot.y = new_x, new_y
+        self.touch_bot(bot_id)
         return True
 
     
@@ -532,9 +679,11 @@ class GameState:
             b.map_team = dest_map
             b.x, b.y = spawn_x, spawn_y
             self.occupancy[dest_map][spawn_x][spawn_y] = bid
+            self.touch_bot(bid)
 
         #set state
         self.switched[team] = True
+        self.emit_event(EventType.TEAM_SWITCHED, dest_map, by=team)
         return True
 
     def return_team_home_if_switched(self, team: Team) -> None:
@@ -557,10 +706,151 @@ class GameState:
             b.map_team = team
             b.x, b.y = spawn_x, spawn_y
             self.occupancy[team][spawn_x][spawn_y] = bid
+            self.touch_bot(bid)
 
         self.switched[team] = False
 
 
+    # -----------------------
+    # State hash
+    # -----------------------
+
+    def touch_bot(self, bot_id: int) -> None:
+        '''the bot's position, map or holding (or what it holds) may have changed'''
+        if self.hash_parts is not None:
+            self.hash_dirty.add(("bot", bot_id))
+
+    def touch_tile(self, team: Team, x: int, y: int) -> None:
+        '''the tile's item, count, cook progress or plates may have changed'''
+        if self.hash_parts is not None:
+            self.hash_dirty.add(("tile", team, x, y))
+
+    def touch_order(self, team: Team, index: int) -> None:
+        '''the status of orders[team][index] may have changed'''
+        if self.hash_parts is not None:
+            self.hash_dirty.add(("order", team, index))
+
+    def _hash_part(self, key: Tuple) -> int:
+        kind = key[0]
+        if kind == "bot":
+            b = self.bots[key[1]]
+            return _mix64(1, b.bot_id, b.map_team.value, b.x, b.y, *_item_code(b.holding))
+        if kind == "tile":
+            _, team, x, y = key
+            t = self.get_map(team).tiles[x][y]
+            return _mix64(
+                2, team.value, x, y, *_item_code(getattr(t, "item", None)),
+                getattr(t, "count", 0), getattr(t, "cook_progress", 0),
+                getattr(t, "num_dirty_plates", 0), getattr(t, "curr_dirty_plate_progress", 0),
+                int(bool(getattr(t, "using", False))), getattr(t, "num_clean_plates", 0),
+            )
+        _, team, i = key
+        o = self.orders[team][i]
+        return _mix64(
+            3, team.value, i, o.order_id, -1 if o.completed_turn is None else o.completed_turn,
+            -1 if o.claimed_by is None else o.claimed_by, int(bool(o.penalized)),
+        )
+
+    def rehash(self) -> None:
+        '''hash every component from scratch, e.g. after changing the state by hand'''
+        keys: List[Tuple] = [("bot", bot_id) for bot_id in self.bots]
+        for team in (Team.RED, Team.BLUE):
+            m = self.get_map(team)
+            keys.extend(("tile", team, x, y) for x in range(m.width) for y in range(m.height))
+            keys.extend(("order", team, i) for i in range(len(self.orders.get(team, []))))
+
+        self.hash_parts = {key: self._hash_part(key) for key in keys}
+        self.hash_dirty = set()
+        self.hash_value = 0
+        for h in self.hash_parts.values():
+            self.hash_value ^= h
+
+    def state_hash(self) -> int:
+        '''
+        64-bit Zobrist hash of the state: the XOR of one key per bot, tile and order,
+        kept up to date by rehashing only the components touched since the last call,
+        plus the turn, both teams' money and the switch flags
+        '''
+        if self.hash_parts is None:
+            self.rehash()
+        elif self.hash_dirty:
+            parts = self.hash_parts
+            for key in self.hash_dirty:
+                h = self._hash_part(key)
+                self.hash_value ^= parts.get(key, 0) ^ h
+                parts[key] = h
+            self.hash_dirty.clear()
+
+        return self.hash_value ^ _mix64(
+            4, self.turn, self.team_money[Team.RED], self.team_money[Team.BLUE],
+            int(bool(self.switched[Team.RED])), int(bool(self.switched[Team.BLUE])),
+        )
+
+    # -----------------------
+    # Score bounds
+    # -----------------------
+
+    def _max_buy_cost(self) -> int:
+        '''most expensive item on any shop menu of either map, 0 without shops'''
+        if self.max_buy_cost is None:
+            best = 0
+            for m in (self.red_map, self.blue_map):
+                for column in m.tiles:
+                    for t in column:
+                        if isinstance(t, Shop):
+                            for item in t.shop_items:
+                                best = max(best, int(item.buy_cost))
+            self.max_buy_cost = best
+        return self.max_buy_cost
+
+    def money_bounds(self, last_turn: int) -> Dict[Team, Tuple[int, int]]:
+        '''
+        (lowest, highest) money each team can end with if the game runs until last_turn,
+        whatever the bots do from the next turn on. Exact bounds, not estimates:
+
+        - highest: passive money plus the reward of every order that can still be completed
+        - lowest: the penalty of every order that can still expire, plus the most the team
+          can spend; buy() needs an empty hand and filling a hand costs the bot's one action,
+          so each bot buys at most every other turn, and never more than the team will have
+        '''
+        turns_left = max(0, last_turn - self.turn)
+        max_cost = self._max_buy_cost()
+
+        bounds: Dict[Team, Tuple[int, int]] = {}
+        for team in (Team.RED, Team.BLUE):
+            money = self.get_team_money(team)
+            gain = turns_left * GameConstants.MONEY_PER_TURN
+            penalties = 0
+            for o in self.orders.get(team, []):
+                if o.completed_turn is not None or o.penalized:
+                    continue
+                #active on some turn in (self.turn, last_turn]
+                if max(o.created_turn, self.turn + 1) <= min(o.expires_turn, last_turn):
+                    gain += o.reward
+                #expires on some turn in (self.turn, last_turn]
+                if self.turn <= o.expires_turn < last_turn:
+                    penalties += o.penalty
+
+            buys = 0
+            for b in self.bots.values():
+                if b.team == team:
+                    buys += (turns_left + 1) // 2 if b.holding is None else turns_left // 2
+            spend = min(buys * max_cost, max(0, money + gain))
+
+            bounds[team] = (money - penalties - spend, money + gain)
+        return bounds
+
+    def decided_winner(self, last_turn: int) -> Optional[Team]:
+        '''the team that wins at last_turn however both teams play until then, if there is one (crashes and timeouts aside)'''
+        bounds = self.money_bounds(last_turn)
+        (red_low, red_high), (blue_low, blue_high) = bounds[Team.RED], bounds[Team.BLUE]
+        if red_low > blue_high:
+            return Team.RED
+        if blue_low > red_high:
+            return Team.BLUE
+        return None
+
+
     # -----------------------
     # Serialization
     # -----------------------
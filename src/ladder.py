@@ -0,0 +1,133 @@
+# ladder.py
+
+'''
+python src/tournament.py --ladder --bots bots/*.py --maps maps/*.txt --target-ci 100 --workers 8
+
+Adaptive rating ladder: instead of a full round robin, keep Glicko ratings (Elo
+with a rating deviation RD per bot) and always play the pairing that is expected
+to shrink the total rating variance the most. That is the pairing between uncertain
+bots whose result is hardest to predict (expected score near 1/2). Stops once every
+bot's 95% interval is within +-target_ci rating points.
+'''
+
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from tournament import MatchResult, MatchSpec, Schedule, bot_name
+
+
+Q = math.log(10) / 400
+INITIAL_RATING = 1500.0
+INITIAL_RD = 350.0
+Z95 = 1.96
+
+
+@dataclass
+class Rating:
+    r: float = INITIAL_RATING
+    rd: float = INITIAL_RD
+    games: int = 0
+
+
+def _g(rd: float) -> float:
+    return 1.0 / math.sqrt(1.0 + 3.0 * Q * Q * rd * rd / (math.pi * math.pi))
+
+
+def expected_score(a: Rating, b: Rating) -> float:
+    '''Glicko expected score of a against b'''
+    return 1.0 / (1.0 + 10 ** (-_g(b.rd) * (a.r - b.r) / 400))
+
+
+def game_information(a: Rating, b: Rating) -> float:
+    '''1/d^2: how much one game against b adds to the precision (1/RD^2) of a's rating'''
+    e = expected_score(a, b)
+    return Q * Q * _g(b.rd) ** 2 * e * (1.0 - e)
+
+
+def update(a: Rating, b: Rating, score_a: float) -> Tuple[Rating, Rating]:
+    '''both ratings after one game, score_a = 1 win, 0.5 draw, 0 loss (Glicko-1, one game per period)'''
+    def one(p: Rating, o: Rating, s: float) -> Rating:
+        info = game_information(p, o)
+        var = 1.0 / (1.0 / (p.rd * p.rd) + info)
+        r = p.r + Q * var * _g(o.rd) * (s - expected_score(p, o))
+        return Rating(r, math.sqrt(var), p.games + 1)
+
+    return one(a, b, score_a), one(b, a, 1.0 - score_a)
+
+
+class Ladder(Schedule):
+    '''
+    Chooses matches by expected information gain until every rating is known to
+    +-target_ci (95%), or max_games were started. Maps are cycled per pairing, and
+    colours alternate, so neither skews a pairing.
+    '''
+    def __init__(self, bots: List[str], maps: List[str], *, target_ci: float = 100.0, max_games: Optional[int] = None):
+        self.bots = list(bots)
+        self.maps = list(maps)
+        self.target_rd = target_ci / Z95
+        self.max_games = max_games
+
+        self.ratings: Dict[str, Rating] = {b: Rating() for b in self.bots}
+        self._played: Dict[Tuple[str, str], int] = {}  # unordered pair -> games started
+        self._in_flight: Dict[int, MatchSpec] = {}
+        self._started = 0
+
+    def converged(self) -> bool:
+        return all(r.rd <= self.target_rd for r in self.ratings.values())
+
+    def _effective(self) -> Dict[str, Rating]:
+        '''ratings with the precision of in-flight games already counted, so parallel picks spread out'''
+        precision = {b: 1.0 / (r.rd * r.rd) for b, r in self.ratings.items()}
+        for spec in self._in_flight.values():
+            a, b = self.ratings[spec.red], self.ratings[spec.blue]
+            precision[spec.red] += game_information(a, b)
+            precision[spec.blue] += game_information(b, a)
+        return {b: Rating(r.r, 1.0 / math.sqrt(precision[b]), r.games) for b, r in self.ratings.items()}
+
+    def _gain(self, a: Rating, b: Rating) -> float:
+        '''expected drop in rating variance of both bots from one more game between them'''
+        va, vb = a.rd * a.rd, b.rd * b.rd
+        return (va - 1.0 / (1.0 / va + game_information(a, b))) + (vb - 1.0 / (1.0 / vb + game_information(b, a)))
+
+    def next_match(self) -> Optional[MatchSpec]:
+        if self.converged() or (self.max_games is not None and self._started >= self.max_games):
+            return None
+
+        eff = self._effective()
+        best: Optional[Tuple[float, int, str, str]] = None
+        for i, a in enumerate(self.bots):
+            for b in self.bots[i + 1:]:
+                pair = (a, b)
+                #prefer the pair with fewer games on equal gain, e.g. at the very start
+                cand = (self._gain(eff[a], eff[b]), -self._played.get(pair, 0), a, b)
+                if best is None or cand[:2] > best[:2]:
+                    best = cand
+        if best is None:
+            return None
+
+        _, _, a, b = best
+        n = self._played.get((a, b), 0)
+        self._played[(a, b)] = n + 1
+        map_path = self.maps[(n // 2) % len(self.maps)]
+        red, blue = (a, b) if n % 2 == 0 else (b, a)
+
+        spec = MatchSpec(self._started, red, blue, map_path)
+        self._started += 1
+        self._in_flight[spec.key] = spec
+        return spec
+
+    def report(self, result: MatchResult) -> None:
+        self._in_flight.pop(result.key, None)
+        if result.error:
+            return
+        score_red = 0.5 if result.winner is None else (1.0 if result.winner == "RED" else 0.0)
+        self.ratings[result.red], self.ratings[result.blue] = update(
+            self.ratings[result.red], self.ratings[result.blue], score_red,
+        )
+
+    def table(self) -> List[Tuple[str, float, float, int]]:
+        '''(bot, rating, 95% half-width, games) best first'''
+        rows = [(bot_name(b), r.r, Z95 * r.rd, r.games) for b, r in self.ratings.items()]
+        rows.sort(key=lambda row: -row[1])
+        return rows
@@ -0,0 +1,425 @@
+# match_server.py
+
+'''
+python src/match_server.py serve --workers 8
+python src/match_server.py match --red bots/a.py --blue bots/b.py --map maps/map1.txt --replay out/replay.json
+python src/match_server.py stats
+python src/match_server.py cancel 12
+
+A long-lived daemon that plays matches for scripts over a local unix socket, so
+each match skips interpreter startup and imports. The protocol is JSON lines:
+
+    -> {"op": "match", "red": ..., "blue": ..., "map": ..., "turns": 1000, "timeout": 0.5, "seed": null,
+        "early_stop": false, "replay": null}
+    <- {"event": "queued", "id": 12}
+    <- {"event": "result", "id": 12, "winner": "RED", "red_money": .., "blue_money": .., "turns": .., "replay": ..,
+        "elapsed_s": .., "red_time_s": .., "blue_time_s": .., "red_timeouts": .., "blue_timeouts": ..}
+
+    -> {"op": "stats"}                 <- {"event": "stats", "queued": .., "in_flight": .., "done": .., "workers": ..}
+    -> {"op": "cancel", "id": 12}      <- {"event": "cancelled", "id": 12} (the submitter gets one too; if the
+                                          match had started, with the partial money and turns but no winner,
+                                          and only that one when it cancels its own match)
+    -> {"op": "shutdown"}              <- {"event": "shutdown"}
+
+Results are sent on the connection that submitted the match, as each one finishes.
+Errors come back as {"event": "error", "id": .., "error": ..}.
+'''
+
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing as mp
+import os
+import signal
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from game_constants import GameConstants
+from results_store import MatchRecord, ResultsStore, record_from_game
+
+
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), "awap_match_server.sock")
+
+#a bot that timed out leaves its thread running in the worker, so workers are replaced
+#after this many matches; the bot/map templates each worker keeps are bounded too
+MATCHES_PER_WORKER = 50
+TEMPLATE_CACHE_SIZE = 16
+
+
+# ----------------------------
+# Worker side
+# ----------------------------
+
+#set once per worker process by _init_worker
+_cancelled = None
+_templates: "OrderedDict[Tuple, object]" = OrderedDict()
+
+
+def _init_worker(cancelled) -> None:
+    global _cancelled
+    _cancelled = cancelled
+    #ctrl-c goes to the server, which cancels the matches itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _template(red: str, blue: str, map_path: str, fresh: bool = False):
+    '''
+    cached per worker, least recently used first out past TEMPLATE_CACHE_SIZE; editing a
+    bot or map file picks up the new version. fresh=True imports the bots again, so the
+    match cannot see bot module globals left by earlier ones
+    '''
+    from game import MatchTemplate
+
+    if fresh:
+        return MatchTemplate(red, blue, map_path)
+    key = tuple((p, os.stat(p).st_mtime_ns) for p in (red, blue, map_path))
+    tpl = _templates.get(key)
+    if tpl is None:
+        tpl = _templates[key] = MatchTemplate(red, blue, map_path)
+        while len(_templates) > TEMPLATE_CACHE_SIZE:
+            _templates.popitem(last=False)
+    else:
+        _templates.move_to_end(key)
+    return tpl
+
+
+class CancelWatch:
+    '''
+    Stands in for a renderer so Game stops between turns once the match is cancelled
+    (render_once returning False ends run_game). The shared dict is checked at most
+    every check_s seconds.
+    '''
+    def __init__(self, cancelled, match_id: int, check_s: float = 0.1):
+        self.gs = None  # set by Game
+        self._cancelled = cancelled
+        self.match_id = match_id
+        self.check_s = check_s
+        self._next_check = 0.0
+
+    def render_once(self, *, fps_cap: int = 30) -> bool:
+        now = time.perf_counter()
+        if now < self._next_check:
+            return True
+        self._next_check = now + self.check_s
+        return not self._cancelled.get(self.match_id, False)
+
+    def close(self):
+        pass
+
+
+def run_match(match_id: int, req: Dict[str, Any]) -> Tuple[Dict[str, Any], MatchRecord]:
+    '''worker: play one requested match; returns the reply fields and the record for the results store'''
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        #seeded results may be reused from the results store, so they start from clean bots
+        g = _template(req["red"], req["blue"], req["map"], fresh=req.get("seed") is not None).new_game(
+            replay_path=req.get("replay"),
+            turn_limit=int(req.get("turns", GameConstants.TOTAL_TURNS)),
+            per_turn_timeout_s=float(req.get("timeout", 0.5)),
+            seed=req.get("seed"),
+            early_stop=bool(req.get("early_stop", False)),
+            renderer=CancelWatch(_cancelled, match_id),
+        )
+        try:
+            winner = g.run_game()
+        finally:
+            g.close()
+
+    record = record_from_game(g, winner)
+    reply = {
+        "winner": record.winner,
+        "red_money": record.red_money,
+        "blue_money": record.blue_money,
+        "turns": record.turns,
+        "replay": record.replay_path,
+        "elapsed_s": round(time.perf_counter() - t0, 3),
+        "red_time_s": round(record.red_time_s, 3),
+        "blue_time_s": round(record.blue_time_s, 3),
+        "red_timeouts": record.red_timeouts,
+        "blue_timeouts": record.blue_timeouts,
+    }
+    return reply, record
+
+
+# ----------------------------
+# Server
+# ----------------------------
+
+@dataclass
+class Job:
+    match_id: int
+    request: Dict[str, Any]
+    writer: asyncio.StreamWriter
+    cancelled: bool = False
+    started: bool = False
+
+
+class MatchServer:
+    '''
+    Accepts match requests on a unix socket and plays at most `workers` of them at a
+    time on a process pool; the rest wait in a FIFO queue.
+    '''
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, workers: Optional[int] = None, store: Optional[ResultsStore] = None,
+                 matches_per_worker: int = MATCHES_PER_WORKER):
+        self.socket_path = socket_path
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.matches_per_worker = max(1, matches_per_worker)  # then the worker process is replaced
+        self.store = store  # finished (not cancelled) matches are recorded here
+
+        self._next_id = 1
+        self._queue: Optional[asyncio.Queue] = None
+        self._cancelled = None  # manager dict of match ids the workers should stop
+        self._jobs: Dict[int, Job] = {}  # queued and in flight
+        self._queued = 0
+        self._in_flight = 0
+        self._done = 0
+        self._stopping: Optional[asyncio.Event] = None
+
+    # ----- protocol -----
+
+    @staticmethod
+    async def _send(writer: asyncio.StreamWriter, msg: Dict[str, Any]) -> None:
+        if writer.is_closing():
+            return
+        writer.write((json.dumps(msg) + "\n").encode())
+        with contextlib.suppress(ConnectionError):
+            await writer.drain()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"event": "stats", "queued": self._queued, "in_flight": self._in_flight, "done": self._done, "workers": self.workers}
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while not reader.at_eof():
+                line = await reader.readline()
+                if not line.strip():
+                    continue
+                try:
+                    req = json.loads(line)
+                except json.JSONDecodeError as e:
+                    await self._send(writer, {"event": "error", "id": None, "error": f"bad json: {e}"})
+                    continue
+                await self._dispatch(req, writer)
+        except (ConnectionError, asyncio.CancelledError):
+            #client went away, or the server is shutting down
+            pass
+        finally:
+            #matches of a client that went away still finish, their results are dropped
+            writer.close()
+
+    async def _dispatch(self, req: Dict[str, Any], writer: asyncio.StreamWriter) -> None:
+        op = req.get("op")
+        if op == "match":
+            missing = [k for k in ("red", "blue", "map") if not req.get(k)]
+            if missing:
+                await self._send(writer, {"event": "error", "id": None, "error": f"missing {', '.join(missing)}"})
+                return
+            job = Job(self._next_id, req, writer)
+            self._next_id += 1
+            self._jobs[job.match_id] = job
+            self._queued += 1
+            self._queue.put_nowait(job)
+            await self._send(writer, {"event": "queued", "id": job.match_id})
+        elif op == "stats":
+            await self._send(writer, self.stats())
+        elif op == "cancel":
+            reply = await self.cancel(req.get("id"), writer)
+            if reply is not None:
+                await self._send(writer, reply)
+        elif op == "shutdown":
+            await self._send(writer, {"event": "shutdown"})
+            self._stopping.set()
+        else:
+            await self._send(writer, {"event": "error", "id": None, "error": f"unknown op {op!r}"})
+
+    async def cancel(self, match_id, requester: Optional[asyncio.StreamWriter] = None) -> Optional[Dict[str, Any]]:
+        '''
+        the reply for the requester, or None when it is the submitter of a running match:
+        each connection gets one cancelled event per match, and the runner sends that one
+        '''
+        job = self._jobs.get(match_id)
+        if job is None:
+            return {"event": "error", "id": match_id, "error": "no such queued or running match"}
+        msg = {"event": "cancelled", "id": match_id}
+        if job.cancelled:
+            #the submitter has (or will get) its cancelled event already
+            return None if job.writer is requester else msg
+        job.cancelled = True
+        if job.started:
+            #the worker notices between turns and stops early, the runner reports it with the partial score
+            self._cancelled[match_id] = True
+            return None if job.writer is requester else msg
+        if job.writer is not requester:
+            await self._send(job.writer, msg)
+        return msg
+
+    # ----- workers -----
+
+    async def _runner(self, pool: ProcessPoolExecutor) -> None:
+        '''one of `workers` consumers: take the next job, play it, report back'''
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            self._queued -= 1
+            if job.cancelled:
+                self._jobs.pop(job.match_id, None)
+                continue
+
+            job.started = True
+            self._in_flight += 1
+            try:
+                reply, record = await loop.run_in_executor(pool, run_match, job.match_id, job.request)
+                if job.cancelled:
+                    #the partial score has no winner
+                    reply.pop("winner", None)
+                msg = {"event": "cancelled" if job.cancelled else "result", "id": job.match_id, **reply}
+                if self.store is not None and not job.cancelled:
+                    self.store.add(record)
+            except Exception as e:
+                msg = {"event": "error", "id": job.match_id, "error": f"{type(e).__name__}: {e}"}
+            finally:
+                self._in_flight -= 1
+                self._done += 1
+                self._jobs.pop(job.match_id, None)
+                self._cancelled.pop(job.match_id, None)
+            await self._send(job.writer, msg)
+
+    async def serve(self) -> None:
+        self._queue = asyncio.Queue()
+        self._stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stopping.set)
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        ctx = mp.get_context("spawn")
+        with ctx.Manager() as manager:
+            self._cancelled = manager.dict()
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx, max_tasks_per_child=self.matches_per_worker,
+                                     initializer=_init_worker, initargs=(self._cancelled,)) as pool:
+                runners = [asyncio.create_task(self._runner(pool)) for _ in range(self.workers)]
+                server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
+                print(f"[SERVER] listening on {self.socket_path} with {self.workers} workers")
+
+                try:
+                    await self._stopping.wait()
+                finally:
+                    print("[SERVER] shutting down")
+                    server.close()
+                    await server.wait_closed()
+
+                    #drop what is queued, stop what is running, and let the runners report it
+                    for match_id in list(self._jobs):
+                        await self.cancel(match_id)
+                    while self._in_flight:
+                        await asyncio.sleep(0.05)
+                    for task in runners:
+                        task.cancel()
+                    await asyncio.gather(*runners, return_exceptions=True)
+
+                    if os.path.exists(self.socket_path):
+                        os.unlink(self.socket_path)
+
+
+# ----------------------------
+# Client
+# ----------------------------
+
+async def request(socket_path: str, msg: Dict[str, Any], *, until: Tuple[str, ...] = ("result", "error", "cancelled", "stats", "shutdown")):
+    '''send one message and yield the replies until one whose event is in `until`'''
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    try:
+        writer.write((json.dumps(msg) + "\n").encode())
+        await writer.drain()
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            reply = json.loads(line)
+            yield reply
+            if reply.get("event") in until:
+                return
+    finally:
+        writer.close()
+
+
+async def _client_main(socket_path: str, msg: Dict[str, Any]) -> int:
+    status = 0
+    async for reply in request(socket_path, msg):
+        print(json.dumps(reply), flush=True)
+        if reply.get("event") == "error":
+            status = 1
+    return status
+
+
+def main():
+    import argparse
+
+    ap = argparse.ArgumentParser(description="local match server")
+    ap.add_argument("--socket", default=DEFAULT_SOCKET, help="unix socket path")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    sp = sub.add_parser("serve", help="run the server")
+    sp.add_argument("--workers", type=int, default=None, help="concurrent matches (default: cpu count)")
+    sp.add_argument("--db", default=None, help="record every finished match in this sqlite results database")
+    sp.add_argument("--matches-per-worker", type=int, default=MATCHES_PER_WORKER,
+                    help="replace a worker process after this many matches (timed-out bot threads die with it)")
+
+    sp = sub.add_parser("match", help="submit a match and wait for its result")
+    sp.add_argument("--red", required=True)
+    sp.add_argument("--blue", required=True)
+    sp.add_argument("--map", required=True)
+    sp.add_argument("--turns", type=int, default=GameConstants.TOTAL_TURNS)
+    sp.add_argument("--timeout", type=float, default=0.5)
+    sp.add_argument("--seed", type=int, default=None, help="seed for a reproducible match")
+    sp.add_argument("--early-stop", action="store_true", help="end the match once no play can change the winner; a bot that would crash or time out later could still have, so the winner is not guaranteed to be that of the full match")
+    sp.add_argument("--replay", default=None, help="replay json path written by the server")
+
+    sub.add_parser("stats", help="queue depth and in-flight count")
+    sp = sub.add_parser("cancel", help="cancel a queued or running match")
+    sp.add_argument("id", type=int)
+    sub.add_parser("shutdown", help="stop the server")
+
+    args = ap.parse_args()
+
+    if args.cmd == "serve":
+        store = ResultsStore(args.db) if args.db else None
+        try:
+            asyncio.run(MatchServer(args.socket, workers=args.workers, store=store,
+                                    matches_per_worker=args.matches_per_worker).serve())
+        finally:
+            if store is not None:
+                store.close()
+        return
+
+    if args.cmd == "match":
+        #the server may run elsewhere in the tree, so send absolute paths
+        msg = {
+            "op": "match",
+            "red": os.path.abspath(args.red),
+            "blue": os.path.abspath(args.blue),
+            "map": os.path.abspath(args.map),
+            "turns": args.turns,
+            "timeout": args.timeout,
+            "seed": args.seed,
+            "early_stop": args.early_stop,
+            "replay": os.path.abspath(args.replay) if args.replay else None,
+        }
+    elif args.cmd == "cancel":
+        msg = {"op": "cancel", "id": args.id}
+    else:
+        msg = {"op": args.cmd}
+
+    sys.exit(asyncio.run(_client_main(args.socket, msg)))
+
+
+if __name__ == "__main__":
+    main()
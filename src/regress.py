@@ -0,0 +1,277 @@
+# regress.py
+
+'''
+python src/regress.py record --bots bots/a.py bots/b.py --maps maps/*.txt --seeds 0 1 2 --out regress/
+python src/regress.py check regress/*.json --engine ../new_engine/src --workers 8
+
+Engine regression harness. `record` plays a corpus of matches (every ordered pair of
+bots, self-play included, on every map and seed) and writes each as a replay with the
+per-turn state hashes, the accepted controller actions of every turn and the map text
+(Game(replay_hashes=True, record_actions=True)).
+
+`check` plays every recorded match again on a process pool against the engine sources
+in --engine (default: this directory), without the bots: each turn is start_turn()
+followed by the logged actions through the public RobotController calls. The state
+after every turn is compared with the recorded one, by hash first and field by field
+(GameState.to_dict()) when the hashes differ, and the first divergent turn and field is
+reported per match. A logged action the new engine rejects is a divergence too.
+Actions replays (game.py --replay-format actions) are checked against their checksums.
+
+Nothing from the engine is imported at module level: check workers put --engine first
+on sys.path before they import it.
+'''
+
+import contextlib
+import glob
+import io
+import itertools
+import json
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+MISSING = "<missing>"
+
+
+@dataclass
+class Divergence:
+    turn: int
+    field: str #path into the replay state, e.g. "bots[1].holding.cooked_stage", or "actions"
+    recorded: Any
+    now: Any
+
+
+@dataclass
+class CaseResult:
+    path: str
+    turns: int #turns that matched
+    recorded_engine: Optional[str]
+    engine: Optional[str]
+    divergence: Optional[Divergence] = None
+    error: Optional[str] = None
+
+
+# ----------------------------
+# Recording
+# ----------------------------
+
+def case_name(red: str, blue: str, map_path: str, seed: int) -> str:
+    stem = lambda p: os.path.splitext(os.path.basename(p))[0]
+    return f"{stem(map_path)}__{stem(red)}__{stem(blue)}__s{seed}.json"
+
+
+def record_case(red: str, blue: str, map_path: str, seed: int, turns: int, timeout: float, out_path: str) -> Tuple[str, int]:
+    '''play one seeded match and write it as a regression case'''
+    from game import MatchTemplate
+
+    #bots and the engine print a lot, none of it matters here
+    with contextlib.redirect_stdout(io.StringIO()):
+        game = MatchTemplate(red, blue, map_path).new_game(
+            replay_path=out_path, turn_limit=turns, per_turn_timeout_s=timeout, seed=seed,
+            replay_hashes=True, record_actions=True,
+        )
+        game.run_game()
+    return out_path, len(game.replay)
+
+
+def record_corpus(bots: List[str], maps: List[str], seeds: List[int], turns: int, timeout: float, out_dir: str,
+                  workers: Optional[int] = None) -> List[Tuple[str, int]]:
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = [
+        (red, blue, map_path, seed, turns, timeout, os.path.join(out_dir, case_name(red, blue, map_path, seed)))
+        for map_path in maps for red, blue in itertools.product(bots, repeat=2) for seed in seeds
+    ]
+    ctx = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        return list(pool.map(record_case, *zip(*jobs)))
+
+
+# ----------------------------
+# Re-simulation
+# ----------------------------
+
+def _init_engine(engine_dir: str) -> None:
+    '''worker initializer: import the engine from engine_dir'''
+    sys.path.insert(0, os.path.abspath(engine_dir))
+
+
+def apply_logged(controllers: Dict[Any, Any], state: Any, entry: List[Any]) -> bool:
+    '''one action_log entry (robot_controller.ACTION_LOG_FORMAT) through the public calls'''
+    from game_constants import FoodType, ShopCosts, Team
+
+    if entry[1] == "switch_maps":
+        return controllers[Team[entry[0]]].switch_maps()
+
+    bot_id, name, *args = entry
+    b = state.bots.get(bot_id)
+    if b is None:
+        return False
+    controller = controllers[b.team]
+    if name == "move":
+        return controller.move(bot_id, *args)
+    if name == "buy":
+        item = args[0]
+        args[0] = FoodType[item] if item in FoodType.__members__ else ShopCosts[item]
+    return getattr(controller, name)(bot_id, *args)
+
+
+def first_difference(recorded: Any, now: Any, path: str = "") -> Optional[Tuple[str, Any, Any]]:
+    '''first (in document order) field where two json values differ, as (path, recorded, now)'''
+    if isinstance(recorded, dict) and isinstance(now, dict):
+        for key in list(recorded) + [k for k in now if k not in recorded]:
+            sub = f"{path}.{key}" if path else str(key)
+            if key not in recorded or key not in now:
+                return sub, recorded.get(key, MISSING), now.get(key, MISSING)
+            diff = first_difference(recorded[key], now[key], sub)
+            if diff is not None:
+                return diff
+        return None
+
+    if isinstance(recorded, list) and isinstance(now, list):
+        for i, (a, b) in enumerate(zip(recorded, now)):
+            diff = first_difference(a, b, f"{path}[{i}]")
+            if diff is not None:
+                return diff
+        if len(recorded) != len(now):
+            return f"{path}.length", len(recorded), len(now)
+        return None
+
+    return None if recorded == now else (path, recorded, now)
+
+
+def resimulate(payload: Dict[str, Any], use_hash: bool = True) -> Tuple[int, Optional[Divergence]]:
+    '''
+    play a recorded case again without its bots; returns the number of turns that
+    matched the recording and the first divergence, if any
+    '''
+    from game import StateTemplate
+    from game_constants import Team
+    from robot_controller import RobotController
+
+    #the map as it was when the case was recorded, not as it is now
+    with tempfile.TemporaryDirectory() as tmp:
+        map_path = os.path.join(tmp, os.path.basename(payload["map"]["path"]))
+        with open(map_path, "w", encoding="utf-8") as f:
+            f.write(payload["map"]["text"])
+        state = StateTemplate(map_path).new_state()
+    controllers = {team: RobotController(team, state, quiet=True) for team in (Team.RED, Team.BLUE)}
+
+    for i, (recorded, calls) in enumerate(zip(payload["replay"], payload["actions"])):
+        state.start_turn()
+        for entry in calls:
+            if not apply_logged(controllers, state, entry):
+                return i, Divergence(state.turn, "actions", entry, "rejected")
+
+        recorded_hash = recorded.get("hash") if use_hash else None
+        if recorded_hash is not None and f"{state.state_hash():016x}" == recorded_hash:
+            continue
+
+        now = json.loads(json.dumps(state.to_dict()))
+        diff = first_difference({k: v for k, v in recorded.items() if k != "hash"}, now)
+        if diff is None and recorded_hash is not None:
+            #the hash covers state to_dict() leaves out
+            diff = ("hash", recorded_hash, f"{state.state_hash():016x}")
+        if diff is not None:
+            return i, Divergence(state.turn, *diff)
+
+    return len(payload["replay"]), None
+
+
+def check_case(path: str, use_hash: bool = True) -> CaseResult:
+    from game import engine_version
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+        if "actions" not in payload:
+            return CaseResult(path, 0, None, engine_version(), error="no action log (record with --record-actions)")
+        if payload.get("format") == "actions":
+            #no states to diff, only the checksums every few turns
+            from action_replay import ActionReplay
+            replay = ActionReplay(payload)
+            divergence = replay.verify()
+            turns = replay.turns if divergence is None else divergence.turn - 1
+        else:
+            turns, divergence = resimulate(payload, use_hash)
+        return CaseResult(path, turns, payload.get("engine_version"), engine_version(), divergence)
+    except Exception as e:
+        return CaseResult(path, 0, None, None, error=f"{type(e).__name__}: {e}")
+
+
+def check_corpus(paths: List[str], engine_dir: str = HERE, use_hash: bool = True,
+                 workers: Optional[int] = None):
+    '''check every case on a process pool importing the engine from engine_dir; yields CaseResults in order'''
+    ctx = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_engine,
+                             initargs=(engine_dir,)) as pool:
+        yield from pool.map(check_case, paths, itertools.repeat(use_hash))
+
+
+# ----------------------------
+# CLI
+# ----------------------------
+
+def _short(value: Any, width: int = 80) -> str:
+    text = json.dumps(value)
+    return text if len(text) <= width else text[:width - 3] + "..."
+
+
+def main():
+    import argparse
+
+    ap = argparse.ArgumentParser(description="record matches and check that another engine plays them the same")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    sp = sub.add_parser("record", help="play and record a corpus of matches")
+    sp.add_argument("--bots", nargs="+", required=True, help="bot files; every ordered pair plays, self-play included")
+    sp.add_argument("--maps", nargs="+", required=True, help="map files")
+    sp.add_argument("--seeds", nargs="+", type=int, default=[0], help="match seeds")
+    sp.add_argument("--turns", type=int, default=None, help="turn limit (default: the game's)")
+    sp.add_argument("--timeout", type=float, default=0.5, help="per-turn timeout seconds per bot")
+    sp.add_argument("--out", required=True, help="directory for the recorded cases")
+    sp.add_argument("--workers", type=int, default=None, help="concurrent matches (default: cpu count)")
+
+    sp = sub.add_parser("check", help="re-simulate recorded cases and report the first divergence of each")
+    sp.add_argument("cases", nargs="+", help="case files, or directories of them")
+    sp.add_argument("--engine", default=HERE, help="directory with the engine sources to check (default: this one)")
+    sp.add_argument("--no-hash", action="store_true", help="compare every turn field by field, ignoring the hashes")
+    sp.add_argument("--workers", type=int, default=None, help="worker processes (default: cpu count)")
+
+    args = ap.parse_args()
+
+    if args.cmd == "record":
+        from game_constants import GameConstants
+        turns = args.turns if args.turns is not None else GameConstants.TOTAL_TURNS
+        for path, n in record_corpus(args.bots, args.maps, args.seeds, turns, args.timeout, args.out, args.workers):
+            print(f"{path}: {n} turns")
+        return
+
+    paths: List[str] = []
+    for p in args.cases:
+        paths.extend(sorted(glob.glob(os.path.join(p, "*.json"))) if os.path.isdir(p) else [p])
+
+    failed = 0
+    for r in check_corpus(paths, args.engine, not args.no_hash, args.workers):
+        if r.error is not None:
+            failed += 1
+            print(f"{r.path}: ERROR {r.error}")
+        elif r.divergence is not None:
+            failed += 1
+            d = r.divergence
+            print(f"{r.path}: DIVERGED at turn {d.turn}, {d.field}: recorded {_short(d.recorded)}, now {_short(d.now)}")
+        else:
+            print(f"{r.path}: ok ({r.turns} turns)")
+
+    print(f"[REGRESS] {len(paths) - failed}/{len(paths)} cases match")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,15 @@
 import os
 os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "hide"
 
+from collections import OrderedDict
 from dataclasses import dataclass
 from typing import Dict, Tuple, Optional, List
 
 import pygame
 
 from game_constants import Team
-from game_state import GameState, Order
-from tiles import Floor, Wall, Counter, Box, Sink, SinkTable, Cooker, Trash, Submit, Shop
-from item import Food, Plate, Pan
+from game_state import GameState
+from frames import MapLayout, RenderFrame, frame_from_state, layout_from_state
 
 
 # ----------------------------
@@ -24,6 +24,12 @@ class RenderConfig:
     hud_height: int = 220         # bottom HUD
     margin: int = 12
     grid_line: int = 1
+    glyph_cache_size: int = 1024  # rendered text surfaces kept around (LRU)
+    max_view_w: int = 640         # largest viewport per map, bigger maps get a camera
+    max_view_h: int = 640
+    min_tile_size: int = 4        # furthest zoom out
+    label_min_tile: int = 16      # item labels are skipped below this tile size
+    minimap_size: int = 160       # longest side of the overview shown when a map doesn't fit
 
 
 TILE_COLORS: Dict[str, Tuple[int, int, int]] = {
@@ -48,54 +54,66 @@ TEXT_COLOR = (15, 15, 15)
 HUD_BG = (250, 250, 250)
 GRID_COLOR = (200, 200, 200)
 ITEM_TEXT_COLOR = (20, 20, 20)
+MINIMAP_VIEW_COLOR = (20, 20, 20)
 
 
-def _item_label(it) -> str:
-    if it is None:
-        return ""
-    if isinstance(it, Food):
-        # e.g. "MEAT" -> "M"
-        return it.food_name[:1]
-    if isinstance(it, Plate):
-        if it.dirty:
-            return "Pd"
-        # show up to 3 foods: "P(MTL)"
-        letters = "".join([(f.food_name[:1] if isinstance(f, Food) else "?") for f in it.food[:3]])
-        return f"P({letters})" if letters else "P"
-    if isinstance(it, Pan):
-        if it.food is None:
-            return "Pan"
-        if isinstance(it.food, Food):
-            return f"Pan({it.food.food_name[:1]})"
-        return "Pan(?)"
-    return type(it).__name__[:6]
-
-
-def _order_label(o: Order, turn: int) -> str:
-    req = ",".join([ft.food_name for ft in o.required])
-    remaining = o.expires_turn - turn
-    return f"#{o.order_id} [{req}]  t={o.created_turn}->{o.expires_turn}  rem={remaining}  R={o.reward} P={o.penalty}"
+# one drawable thing on screen: (bbox, lane, kind, args)
+# kind is "text", "bot" or "dot"; lane clips the element the way the full-frame draw order would
+Element = Tuple[pygame.Rect, pygame.Rect, str, tuple]
 
 
 class Renderer:
-    def __init__(self, game_state: GameState, cfg: RenderConfig = RenderConfig()):
+    '''
+    Draws RenderFrames. With a live game_state, render_once() snapshots it each call;
+    without one (replays, other processes) pass a layout and feed frames to render_frame().
+    '''
+    def __init__(self, game_state: Optional[GameState], cfg: RenderConfig = RenderConfig(), layout: Optional[MapLayout] = None):
         self.gs = game_state
         self.cfg = cfg
+        self.layout = layout if layout is not None else layout_from_state(game_state)
 
-        # assume both maps same dimensions
-        self.w = self.gs.red_map.width
-        self.h = self.gs.red_map.height
+        self.w = self.layout.width
+        self.h = self.layout.height
 
-        self.map_px_w = self.w * cfg.tile_size
-        self.map_px_h = self.h * cfg.tile_size
+        # camera, shared by both maps: tile size in px and the top-left visible tile
+        # (column from the left, row from the top of the screen)
+        self.ts = cfg.tile_size
+        self.cam_col = 0
+        self.cam_row = 0
 
-        self.win_w = cfg.margin * 2 + self.map_px_w * 2 + cfg.gap
-        self.win_h = cfg.margin * 2 + self.map_px_h + cfg.hud_height
+        # viewport of each map in px; maps that fit are shown whole
+        self.view_w = min(self.w * cfg.tile_size, cfg.max_view_w)
+        self.view_h = min(self.h * cfg.tile_size, cfg.max_view_h)
+
+        # scaled overview of both maps in a sidebar, only when they don't fit
+        self.show_minimap = self.view_w < self.w * cfg.tile_size or self.view_h < self.h * cfg.tile_size
+        self.mm_scale = cfg.minimap_size / max(self.w, self.h, 1)
+        self.mm_w = max(1, round(self.w * self.mm_scale))
+        self.mm_h = max(1, round(self.h * self.mm_scale))
+
+        self.win_w = cfg.margin * 2 + self.view_w * 2 + cfg.gap
+        self.win_h = cfg.margin * 2 + self.view_h + cfg.hud_height
+        if self.show_minimap:
+            self.win_w += cfg.gap + self.mm_w
+            self.win_h = max(self.win_h, cfg.margin * 2 + self.mm_h * 2 + cfg.gap)
 
         self._inited = False
         self._font = None
         self._font_small = None
 
+        # tiles never change type, so each map's visible tiles + grid are drawn once per camera position
+        self._static_layers: Dict[Team, pygame.Surface] = {}
+        self._minimaps: Dict[Team, pygame.Surface] = {}
+        self._mm_dragging = False
+        # (text, small, color) -> rendered surface, least recently used first
+        self._glyphs: "OrderedDict[Tuple[str, bool, Tuple[int, int, int]], pygame.Surface]" = OrderedDict()
+        # static layers + titles + HUD panel composed into one window-sized surface
+        self._bg: Optional[pygame.Surface] = None
+
+        # elements of the previous frame, diffed against the next one to find dirty rects
+        self._prev_elements: List[Element] = []
+        self._prev_keys: Optional[set] = None
+
     def init(self):
         pygame.init()
         pygame.display.set_caption("Competitive Cooking Game")
@@ -105,139 +123,430 @@ class Renderer:
         self.clock = pygame.time.Clock()
         self._inited = True
 
+    # ----------------------------
+    # Camera
+    # ----------------------------
+
+    def _visible_cols(self) -> int:
+        return min(self.w, self.view_w // self.ts)
+
+    def _visible_rows(self) -> int:
+        return min(self.h, self.view_h // self.ts)
+
+    def _is_visible(self, x: int, y: int) -> bool:
+        row = self.h - 1 - y
+        return (self.cam_col <= x < self.cam_col + self._visible_cols()
+                and self.cam_row <= row < self.cam_row + self._visible_rows())
+
+    def _camera_changed(self) -> None:
+        self.cam_col = min(max(self.cam_col, 0), self.w - self._visible_cols())
+        self.cam_row = min(max(self.cam_row, 0), self.h - self._visible_rows())
+        self._static_layers.clear()
+        self._bg = None
+        self.invalidate()
+
+    def pan(self, dcols: int, drows: int) -> None:
+        '''move the camera by whole tiles (drows > 0 moves down the screen)'''
+        self.cam_col += dcols
+        self.cam_row += drows
+        self._camera_changed()
+
+    def center_on(self, x: int, y: int) -> None:
+        '''center the camera on map tile (x, y)'''
+        self.cam_col = x - self._visible_cols() // 2
+        self.cam_row = (self.h - 1 - y) - self._visible_rows() // 2
+        self._camera_changed()
+
+    def zoom(self, factor: float) -> None:
+        '''scale the tile size, keeping the center of the view in place'''
+        center_col = self.cam_col + self._visible_cols() / 2
+        center_row = self.cam_row + self._visible_rows() / 2
+
+        ts = round(self.ts * factor)
+        if ts == self.ts:
+            ts += 1 if factor > 1 else -1
+        self.ts = min(max(ts, self.cfg.min_tile_size), self.cfg.tile_size * 4)
+
+        self.cam_col = int(center_col - self._visible_cols() / 2)
+        self.cam_row = int(center_row - self._visible_rows() / 2)
+        self._camera_changed()
+
+    def handle_camera_event(self, event) -> bool:
+        '''WASD pans, [ ] or the mouse wheel zoom, click/drag on the minimap recenters; returns True if consumed'''
+        if event.type == pygame.KEYDOWN:
+            step = max(1, self._visible_cols() // 4)
+            moves = {
+                pygame.K_a: (-step, 0), pygame.K_d: (step, 0),
+                pygame.K_w: (0, -step), pygame.K_s: (0, step),
+            }
+            if event.key in moves:
+                self.pan(*moves[event.key])
+                return True
+            if event.key == pygame.K_RIGHTBRACKET:
+                self.zoom(1.25)
+                return True
+            if event.key == pygame.K_LEFTBRACKET:
+                self.zoom(0.8)
+                return True
+            return False
+
+        if event.type == pygame.MOUSEWHEEL:
+            self.zoom(1.25 if event.y > 0 else 0.8)
+            return True
+
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            tile = self._minimap_tile_at(event.pos)
+            if tile is not None:
+                self._mm_dragging = True
+                self.center_on(*tile)
+                return True
+        elif event.type == pygame.MOUSEMOTION and self._mm_dragging:
+            tile = self._minimap_tile_at(event.pos)
+            if tile is not None:
+                self.center_on(*tile)
+            return True
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 1 and self._mm_dragging:
+            self._mm_dragging = False
+            return True
+        return False
+
     def _tile_rect(self, map_left: int, x: int, y: int) -> pygame.Rect:
         # y=0 is bottom in your Map, but pygame y=0 is top => invert
-        ts = self.cfg.tile_size
-        px = map_left + x * ts
-        py = self.cfg.margin + (self.h - 1 - y) * ts
+        ts = self.ts
+        px = map_left + (x - self.cam_col) * ts
+        py = self.cfg.margin + (self.h - 1 - y - self.cam_row) * ts
         return pygame.Rect(px, py, ts, ts)
 
-    def _draw_text(self, text: str, x: int, y: int, *, small: bool = False, color=TEXT_COLOR):
+    # ----------------------------
+    # Minimap
+    # ----------------------------
+
+    def _minimap_rect(self, team: Team) -> pygame.Rect:
+        cfg = self.cfg
+        left = cfg.margin + self.view_w * 2 + cfg.gap * 2
+        top = cfg.margin if team == Team.RED else cfg.margin + self.mm_h + cfg.gap
+        return pygame.Rect(left, top, self.mm_w, self.mm_h)
+
+    def _minimap_tile_at(self, pos: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+        if not self.show_minimap:
+            return None
+        for team in (Team.RED, Team.BLUE):
+            r = self._minimap_rect(team)
+            if r.collidepoint(pos):
+                x = min(int((pos[0] - r.x) / self.mm_scale), self.w - 1)
+                row = min(int((pos[1] - r.y) / self.mm_scale), self.h - 1)
+                return (x, self.h - 1 - row)
+        return None
+
+    def _minimap(self, team: Team) -> pygame.Surface:
+        '''one pixel per tile, scaled to the minimap size; built once'''
+        mm = self._minimaps.get(team)
+        if mm is not None:
+            return mm
+
+        names = self.layout.tile_names[team]
+        small = pygame.Surface((max(1, self.w), max(1, self.h)))
+        for x in range(self.w):
+            # fill runs of the same tile in a column at once
+            col = names[x]
+            y = 0
+            while y < self.h:
+                run = y
+                while run + 1 < self.h and col[run + 1] == col[y]:
+                    run += 1
+                color = TILE_COLORS.get(col[y], (220, 220, 220))
+                small.fill(color, pygame.Rect(x, self.h - 1 - run, 1, run - y + 1))
+                y = run + 1
+
+        mm = pygame.transform.scale(small, (self.mm_w, self.mm_h)).convert()
+        self._minimaps[team] = mm
+        return mm
+
+    def _minimap_view_rect(self, team: Team) -> pygame.Rect:
+        r = self._minimap_rect(team)
+        s = self.mm_scale
+        return pygame.Rect(
+            r.x + int(self.cam_col * s),
+            r.y + int(self.cam_row * s),
+            max(2, round(self._visible_cols() * s)),
+            max(2, round(self._visible_rows() * s)),
+        )
+
+    def _glyph(self, text: str, small: bool, color) -> pygame.Surface:
+        key = (text, small, tuple(color))
+        surf = self._glyphs.get(key)
+        if surf is not None:
+            self._glyphs.move_to_end(key)
+            return surf
+
         font = self._font_small if small else self._font
         surf = font.render(text, True, color)
-        self.screen.blit(surf, (x, y))
+        self._glyphs[key] = surf
+        if len(self._glyphs) > self.cfg.glyph_cache_size:
+            self._glyphs.popitem(last=False)
+        return surf
 
-    def _draw_map(self, team: Team, map_left: int):
-        m = self.gs.get_map(team)
-
-        # tiles
-        for x in range(m.width):
-            for y in range(m.height):
-                t = m.tiles[x][y]
-                rect = self._tile_rect(map_left, x, y)
-                col = TILE_COLORS.get(getattr(t, "tile_name", "FLOOR"), (220, 220, 220))
-                pygame.draw.rect(self.screen, col, rect)
+    def _static_layer(self, team: Team) -> pygame.Surface:
+        """
+        Visible tiles + grid for one map, drawn once per camera position into an offscreen surface.
+        The surface origin is the viewport's top-left corner (no margins).
+        """
+        layer = self._static_layers.get(team)
+        if layer is not None:
+            return layer
+
+        names = self.layout.tile_names[team]
+        ts = self.ts
+        gl = self.cfg.grid_line
+        cols, rows = self._visible_cols(), self._visible_rows()
+        layer = pygame.Surface((cols * ts + gl, rows * ts + gl))
+        layer.fill((245, 245, 245))
+
+        # visible tiles only
+        for x in range(self.cam_col, self.cam_col + cols):
+            for row in range(self.cam_row, self.cam_row + rows):
+                rect = pygame.Rect((x - self.cam_col) * ts, (row - self.cam_row) * ts, ts, ts)
+                col = TILE_COLORS.get(names[x][self.h - 1 - row], (220, 220, 220))
+                pygame.draw.rect(layer, col, rect)
 
         # grid
-        if self.cfg.grid_line > 0:
-            for x in range(m.width + 1):
-                px = map_left + x * self.cfg.tile_size
-                pygame.draw.line(
-                    self.screen, GRID_COLOR,
-                    (px, self.cfg.margin),
-                    (px, self.cfg.margin + self.map_px_h),
-                    self.cfg.grid_line
-                )
-            for y in range(m.height + 1):
-                py = self.cfg.margin + y * self.cfg.tile_size
-                pygame.draw.line(
-                    self.screen, GRID_COLOR,
-                    (map_left, py),
-                    (map_left + self.map_px_w, py),
-                    self.cfg.grid_line
-                )
-
-        #items (and box counts)
-        for x in range(m.width):
-            for y in range(m.height):
-                t = m.tiles[x][y]
-
-                if isinstance(t, Box) and getattr(t, "count", 0) > 0:
-                    label = _item_label(getattr(t, "item", None))
-                    label = f"{label}x{t.count}" if label else f"x{t.count}"
-                    rect = self._tile_rect(map_left, x, y)
-                    self._draw_text(label, rect.x + 3, rect.y + 3, small=True, color=ITEM_TEXT_COLOR)
-                    continue
+        if gl > 0:
+            for c in range(cols + 1):
+                px = c * ts
+                pygame.draw.line(layer, GRID_COLOR, (px, 0), (px, rows * ts), gl)
+            for r in range(rows + 1):
+                py = r * ts
+                pygame.draw.line(layer, GRID_COLOR, (0, py), (cols * ts, py), gl)
+
+        layer = layer.convert()
+        self._static_layers[team] = layer
+        return layer
+
+    def _background(self) -> pygame.Surface:
+        """
+        Everything that only changes with the camera: fill, titles, both static map layers, HUD panel, minimaps.
+        Dirty regions are restored from this before their elements are redrawn.
+        """
+        if self._bg is not None:
+            return self._bg
 
-                it = getattr(t, "item", None)
-                if it is None:
-                    continue
-                label = _item_label(it)
-                if not label:
+        cfg = self.cfg
+        bg = pygame.Surface((self.win_w, self.win_h)).convert()
+        bg.fill((245, 245, 245))
+
+        # titles
+        left_red, left_blue = self._map_left(Team.RED), self._map_left(Team.BLUE)
+        bg.blit(self._glyph("RED MAP", False, TEAM_COLOR[Team.RED]), (left_red, 2))
+        bg.blit(self._glyph("BLUE MAP", False, TEAM_COLOR[Team.BLUE]), (left_blue, 2))
+
+        # tiles + grid
+        bg.blit(self._static_layer(Team.RED), (left_red, cfg.margin))
+        bg.blit(self._static_layer(Team.BLUE), (left_blue, cfg.margin))
+
+        # hud panel
+        pygame.draw.rect(bg, HUD_BG, self._hud_rect())
+
+        # overview with the current view outlined
+        if self.show_minimap:
+            for team in (Team.RED, Team.BLUE):
+                bg.blit(self._minimap(team), self._minimap_rect(team))
+                pygame.draw.rect(bg, MINIMAP_VIEW_COLOR, self._minimap_view_rect(team), 1)
+
+        self._bg = bg
+        return bg
+
+    def _map_left(self, team: Team) -> int:
+        if team == Team.RED:
+            return self.cfg.margin
+        return self.cfg.margin + self.view_w + self.cfg.gap
+
+    def _hud_rect(self) -> pygame.Rect:
+        cfg = self.cfg
+        hud_top = cfg.margin + self.view_h + cfg.margin
+        right = cfg.margin + self.view_w * 2 + cfg.gap
+        return pygame.Rect(cfg.margin, hud_top, right - cfg.margin, cfg.hud_height)
+
+    def _text_element(self, text: str, x: int, y: int, lane: pygame.Rect, *, small: bool = False, color=TEXT_COLOR) -> Element:
+        surf = self._glyph(text, small, color)
+        return (pygame.Rect(x, y, surf.get_width(), surf.get_height()), lane, "text", (text, small, tuple(color)))
+
+    def _map_elements(self, frame: RenderFrame, team: Team) -> List[Element]:
+        map_left = self._map_left(team)
+
+        if self.show_minimap:
+            # a camera is active: nothing may spill out of the viewport
+            lane = pygame.Rect(map_left, self.cfg.margin, self.view_w, self.view_h)
+        elif team == Team.RED:
+            # later maps are drawn over earlier ones, so red overflow stops where the blue map starts
+            lane = pygame.Rect(0, 0, self._map_left(Team.BLUE), self.win_h)
+        else:
+            lane = pygame.Rect(0, 0, self.win_w, self.win_h)
+
+        labels = self.ts >= self.cfg.label_min_tile
+        res: List[Element] = []
+
+        #items (and box counts), only on visible tiles and only when they are big enough to read
+        if labels:
+            for (x, y), label in frame.cells.get(team, {}).items():
+                if not self._is_visible(x, y):
                     continue
                 rect = self._tile_rect(map_left, x, y)
-                self._draw_text(label, rect.x + 3, rect.y + 3, small=True, color=ITEM_TEXT_COLOR)
-
+                res.append(self._text_element(label, rect.x + 3, rect.y + 3, lane, small=True, color=ITEM_TEXT_COLOR))
 
         # bots on this team map
-        for bot_id, b in self.gs.bots.items():
-            if getattr(b, "map_team", b.team) != team:
+        for b in frame.bots:
+            if b.map_team != team or not self._is_visible(b.x, b.y):
                 continue
             rect = self._tile_rect(map_left, b.x, b.y)
-            cx = rect.x + rect.w // 2
-            cy = rect.y + rect.h // 2
-            pygame.draw.circle(self.screen, TEAM_COLOR[b.team], (cx, cy), rect.w // 3)
-            self._draw_text(str(bot_id), rect.x + 2, rect.y + rect.h - 16, small=True, color=(255, 255, 255))
-
-
-    def _draw_hud(self):
+            bbox = rect
+            if labels:
+                label = self._glyph(str(b.bot_id), True, (255, 255, 255))
+                bbox = rect.union(pygame.Rect(rect.x + 2, rect.y + rect.h - 16, label.get_width(), label.get_height()))
+            res.append((bbox, lane, "bot", (b.bot_id, b.team, rect.x, rect.y)))
+
+        return res
+
+    def _minimap_elements(self, frame: RenderFrame) -> List[Element]:
+        '''every bot as a dot on its map's minimap'''
+        if not self.show_minimap:
+            return []
+        res: List[Element] = []
+        for b in frame.bots:
+            lane = self._minimap_rect(b.map_team)
+            cx = lane.x + int((b.x + 0.5) * self.mm_scale)
+            cy = lane.y + int((self.h - 1 - b.y + 0.5) * self.mm_scale)
+            res.append((pygame.Rect(cx - 2, cy - 2, 5, 5), lane, "dot", (b.team, cx, cy)))
+        return res
+
+    def _hud_elements(self, frame: RenderFrame) -> List[Element]:
         cfg = self.cfg
-        hud_top = cfg.margin + self.map_px_h + cfg.margin
-        hud_rect = pygame.Rect(cfg.margin, hud_top, self.win_w - 2 * cfg.margin, cfg.hud_height)
-        pygame.draw.rect(self.screen, HUD_BG, hud_rect)
+        hud_top = self._hud_rect().y
+        lane = pygame.Rect(0, 0, self.win_w, self.win_h)
+        res: List[Element] = []
 
         # header
-        self._draw_text(f"Turn: {self.gs.turn}", cfg.margin + 8, hud_top + 8)
-        self._draw_text(f"Red money: {self.gs.get_team_money(Team.RED)}", cfg.margin + 140, hud_top + 8, color=TEAM_COLOR[Team.RED])
-        self._draw_text(f"Blue money: {self.gs.get_team_money(Team.BLUE)}", cfg.margin + 300, hud_top + 8, color=TEAM_COLOR[Team.BLUE])
+        res.append(self._text_element(f"Turn: {frame.turn}", cfg.margin + 8, hud_top + 8, lane))
+        res.append(self._text_element(f"Red money: {frame.money[Team.RED]}", cfg.margin + 140, hud_top + 8, lane, color=TEAM_COLOR[Team.RED]))
+        res.append(self._text_element(f"Blue money: {frame.money[Team.BLUE]}", cfg.margin + 300, hud_top + 8, lane, color=TEAM_COLOR[Team.BLUE]))
 
         # orders
         left_x = cfg.margin + 8
-        right_x = self.win_w // 2 + 8
+        hud = self._hud_rect()
+        right_x = hud.x + hud.w // 2 + 8
         y0 = hud_top + 36
 
-        self._draw_text("RED orders (active):", left_x, y0, color=TEAM_COLOR[Team.RED])
-        self._draw_text("BLUE orders (active):", right_x, y0, color=TEAM_COLOR[Team.BLUE])
-
-        def active_orders(team: Team) -> List[Order]:
-            res = []
-            for o in self.gs.orders.get(team, []):
-                if o.is_active(self.gs.turn):
-                    res.append(o)
-            return res
-
-        ro = active_orders(Team.RED)
-        bo = active_orders(Team.BLUE)
+        res.append(self._text_element("RED orders (active):", left_x, y0, lane, color=TEAM_COLOR[Team.RED]))
+        res.append(self._text_element("BLUE orders (active):", right_x, y0, lane, color=TEAM_COLOR[Team.BLUE]))
 
         yy = y0 + 20
-        for o in ro[:6]:
-            self._draw_text(_order_label(o, self.gs.turn), left_x, yy, small=True)
+        for label in frame.orders.get(Team.RED, [])[:6]:
+            res.append(self._text_element(label, left_x, yy, lane, small=True))
             yy += 18
 
         yy = y0 + 20
-        for o in bo[:6]:
-            self._draw_text(_order_label(o, self.gs.turn), right_x, yy, small=True)
+        for label in frame.orders.get(Team.BLUE, [])[:6]:
+            res.append(self._text_element(label, right_x, yy, lane, small=True))
             yy += 18
 
         # bots + holding
         bot_y = hud_top + 140
-        self._draw_text("Bots:", cfg.margin + 8, bot_y)
+        res.append(self._text_element("Bots:", cfg.margin + 8, bot_y, lane))
         bot_y += 18
-        for bot_id, b in sorted(self.gs.bots.items(), key=lambda kv: kv[0]):
-            holding = _item_label(b.holding)
-            map_team = getattr(b, "map_team", b.team).name
-            self._draw_text(
-                f"bot {bot_id} [{b.team.name}] on={map_team} pos=({b.x},{b.y}) holding={holding or 'None'}",
+        for b in frame.bots:
+            res.append(self._text_element(
+                f"bot {b.bot_id} [{b.team.name}] on={b.map_team.name} pos=({b.x},{b.y}) holding={b.holding or 'None'}",
                 cfg.margin + 8,
                 bot_y,
+                lane,
                 small=True,
                 color=TEAM_COLOR[b.team],
-            )
+            ))
             bot_y += 16
 
+        return res
+
+    def _draw_element(self, el: Element) -> None:
+        bbox, _, kind, args = el
+        if kind == "text":
+            text, small, color = args
+            self.screen.blit(self._glyph(text, small, color), bbox.topleft)
+            return
+
+        if kind == "dot":
+            team, cx, cy = args
+            pygame.draw.circle(self.screen, TEAM_COLOR[team], (cx, cy), 2)
+            return
+
+        # bot: team circle with its id in the bottom-left corner of the tile
+        bot_id, team, x, y = args
+        ts = self.ts
+        pygame.draw.circle(self.screen, TEAM_COLOR[team], (x + ts // 2, y + ts // 2), max(1, ts // 3))
+        if ts >= self.cfg.label_min_tile:
+            self.screen.blit(self._glyph(str(bot_id), True, (255, 255, 255)), (x + 2, y + ts - 16))
+
+    def _elements(self, frame: RenderFrame) -> List[Element]:
+        '''all dynamic elements in draw order: red map, blue map, HUD, then minimap dots'''
+        return (self._map_elements(frame, Team.RED) + self._map_elements(frame, Team.BLUE)
+                + self._hud_elements(frame) + self._minimap_elements(frame))
+
+    @staticmethod
+    def _element_key(el: Element) -> tuple:
+        bbox, _, kind, args = el
+        return (kind, bbox.x, bbox.y, bbox.w, bbox.h, args)
+
+    def draw_frame(self, frame: RenderFrame) -> Optional[List[pygame.Rect]]:
+        """
+        Draw a frame into self.screen.
+        Returns None if the whole screen was redrawn, otherwise the list of rects that changed.
+        """
+        elements = self._elements(frame)
+        keys = {self._element_key(el) for el in elements}
+
+        # first frame: everything
+        if self._prev_keys is None:
+            self.screen.blit(self._background(), (0, 0))
+            for el in elements:
+                self.screen.set_clip(el[1])
+                self._draw_element(el)
+            self.screen.set_clip(None)
+            self._prev_elements, self._prev_keys = elements, keys
+            return None
+
+        # anything added or removed since the previous frame is dirty, both where it was and where it is
+        dirty: List[pygame.Rect] = []
+        for el in self._prev_elements:
+            if self._element_key(el) not in keys:
+                dirty.append(el[0].clip(el[1]))
+        for el in elements:
+            if self._element_key(el) not in self._prev_keys:
+                dirty.append(el[0].clip(el[1]))
+        self._prev_elements, self._prev_keys = elements, keys
+
+        bg = self._background()
+        for d in dirty:
+            # restore the background, then redraw every element that overlaps the region
+            self.screen.set_clip(d)
+            self.screen.blit(bg, d, d)
+            for el in elements:
+                if el[0].colliderect(d):
+                    self.screen.set_clip(d.clip(el[1]))
+                    self._draw_element(el)
+        self.screen.set_clip(None)
+        return dirty
+
+    def invalidate(self) -> None:
+        '''forget the previous frame so the next one is drawn in full'''
+        self._prev_elements, self._prev_keys = [], None
+
     def render_once(self, *, fps_cap: int = 30) -> bool:
         """
-        Draw one frame. Returns False if user closed window.
+        Draw one frame of the live game state. Returns False if user closed window.
+        """
+        return self.render_frame(frame_from_state(self.gs), fps_cap=fps_cap)
+
+    def render_frame(self, frame: RenderFrame, *, fps_cap: int = 30) -> bool:
+        """
+        Draw one frame, pushing only the changed rects to the display. Returns False if user closed window.
         """
         if not self._inited:
             self.init()
@@ -245,23 +554,252 @@ class Renderer:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 return False
+            self.handle_camera_event(event)
 
-        self.screen.fill((245, 245, 245))
+        self.present(self.draw_frame(frame))
+        self.clock.tick(fps_cap)
+        return True
 
-        left_red = self.cfg.margin
-        left_blue = self.cfg.margin + self.map_px_w + self.cfg.gap
+    def present(self, dirty: Optional[List[pygame.Rect]]) -> None:
+        '''push what draw_frame() changed to the display'''
+        if dirty is None:
+            pygame.display.flip()
+        elif dirty:
+            pygame.display.update(dirty)
 
-        # titles
-        self._draw_text("RED MAP", left_red, 2, color=TEAM_COLOR[Team.RED])
-        self._draw_text("BLUE MAP", left_blue, 2, color=TEAM_COLOR[Team.BLUE])
+    def close(self):
+        self._static_layers.clear()
+        self._minimaps.clear()
+        self._glyphs.clear()
+        self._bg = None
+        self.invalidate()
+        pygame.quit()
+
+
+# ----------------------------
+# Tournament grid
+# ----------------------------
+
+@dataclass
+class GridConfig:
+    cols: int = 4
+    rows: int = 4
+    thumb_w: int = 300            # one match: both maps side by side plus a header
+    thumb_h: int = 190
+    gap: int = 8                  # between thumbnails, and between the two maps of one
+    header_h: int = 34            # title + score lines above the maps
+    glyph_cache_size: int = 512
+
+
+THUMB_BG = (250, 250, 250)
+WINDOW_BG = (225, 225, 225)
+FINISHED_COLOR = (110, 110, 110)
+
+
+class _Thumb:
+    '''one match in the grid: its reduced-resolution tiles and what was last drawn'''
+    def __init__(self, layout: MapLayout, title: str, cfg: GridConfig):
+        self.layout = layout
+        self.title = title
+        self.frame: Optional[RenderFrame] = None
+        self.result: Optional[str] = None
+        self.finished_seq = 0  # order of finishing, oldest finished slots are reused first
+
+        w, h = layout.width, layout.height
+        self.ts = max(1, min((cfg.thumb_w - cfg.gap) // max(1, 2 * w), (cfg.thumb_h - cfg.header_h) // max(1, h)))
+        self.map_lefts = {Team.RED: 0, Team.BLUE: w * self.ts + cfg.gap}
+
+        # tiles never change, drawn once at thumbnail size
+        self.static = pygame.Surface((cfg.thumb_w, cfg.thumb_h))
+        self.static.fill(THUMB_BG)
+        for team, left in self.map_lefts.items():
+            names = layout.tile_names[team]
+            for x in range(w):
+                for y in range(h):
+                    rect = pygame.Rect(left + x * self.ts, cfg.header_h + (h - 1 - y) * self.ts, self.ts, self.ts)
+                    self.static.fill(TILE_COLORS.get(names[x][y], (220, 220, 220)), rect)
+        self.static = self.static.convert()
+
+    def tile_center(self, team: Team, x: int, y: int, header_h: int) -> Tuple[int, int]:
+        ts = self.ts
+        return (self.map_lefts[team] + x * ts + ts // 2, header_h + (self.layout.height - 1 - y) * ts + ts // 2)
+
+
+class GridRenderer:
+    '''
+    Live thumbnails of many matches in one window, for tournaments.
+
+    Matches get a slot with add_match(), then update() with their latest RenderFrame.
+    Only thumbnails whose match advanced since the last draw are redrawn and pushed to
+    the display, so the cost per draw is bounded by how many matches moved, not how
+    many are shown. When the grid is full, the slot of the longest finished match is reused.
+    '''
+    def __init__(self, cfg: GridConfig = GridConfig()):
+        self.cfg = cfg
+        self.win_w = cfg.gap + cfg.cols * (cfg.thumb_w + cfg.gap)
+        self.win_h = cfg.gap + cfg.rows * (cfg.thumb_h + cfg.gap)
+
+        self._slots: List[Optional[object]] = [None] * (cfg.cols * cfg.rows)  # slot -> match key
+        self._thumbs: Dict[object, _Thumb] = {}
+        self._slot_of: Dict[object, int] = {}
+        self._dirty: set = set()  # slots to redraw
+        self._drawn_turn: Dict[int, Optional[int]] = {}
+        self._finished = 0
+
+        self._glyphs: "OrderedDict[tuple, pygame.Surface]" = OrderedDict()
+        self._inited = False
+        self._full = True
+
+    def init(self):
+        pygame.init()
+        pygame.display.set_caption("Tournament")
+        self.screen = pygame.display.set_mode((self.win_w, self.win_h))
+        self._font = pygame.font.SysFont("Arial", 12)
+        self.clock = pygame.time.Clock()
+        self._inited = True
+        self._full = True
+
+    def _glyph(self, text: str, color) -> pygame.Surface:
+        key = (text, tuple(color))
+        surf = self._glyphs.get(key)
+        if surf is not None:
+            self._glyphs.move_to_end(key)
+            return surf
+        surf = self._font.render(text, True, color)
+        self._glyphs[key] = surf
+        if len(self._glyphs) > self.cfg.glyph_cache_size:
+            self._glyphs.popitem(last=False)
+        return surf
+
+    def _slot_rect(self, slot: int) -> pygame.Rect:
+        cfg = self.cfg
+        col, row = slot % cfg.cols, slot // cfg.cols
+        return pygame.Rect(cfg.gap + col * (cfg.thumb_w + cfg.gap), cfg.gap + row * (cfg.thumb_h + cfg.gap), cfg.thumb_w, cfg.thumb_h)
+
+    # ----------------------------
+    # Feeding matches
+    # ----------------------------
+
+    def add_match(self, key, layout: MapLayout, title: str) -> bool:
+        '''give a match a slot; returns False if every slot holds a running match'''
+        if not self._inited:
+            self.init()
+        if key in self._slot_of:
+            return True
+
+        slot = next((i for i, k in enumerate(self._slots) if k is None), None)
+        if slot is None:
+            finished = [(self._thumbs[k].finished_seq, i) for i, k in enumerate(self._slots) if self._thumbs[k].result is not None]
+            if not finished:
+                return False
+            slot = min(finished)[1]
+            old = self._slots[slot]
+            del self._thumbs[old]
+            del self._slot_of[old]
+
+        self._slots[slot] = key
+        self._slot_of[key] = slot
+        self._thumbs[key] = _Thumb(layout, title, self.cfg)
+        self._drawn_turn[slot] = None
+        self._dirty.add(slot)
+        return True
 
-        self._draw_map(Team.RED, left_red)
-        self._draw_map(Team.BLUE, left_blue)
-        self._draw_hud()
+    def update(self, key, frame: RenderFrame) -> None:
+        '''newest frame of a match; matches without a slot are ignored'''
+        slot = self._slot_of.get(key)
+        if slot is None:
+            return
+        self._thumbs[key].frame = frame
+        if frame.turn != self._drawn_turn[slot]:
+            self._dirty.add(slot)
+
+    def finish(self, key, result: str) -> None:
+        slot = self._slot_of.get(key)
+        if slot is None:
+            return
+        self._finished += 1
+        th = self._thumbs[key]
+        th.result = result
+        th.finished_seq = self._finished
+        self._dirty.add(slot)
+
+    # ----------------------------
+    # Drawing
+    # ----------------------------
+
+    def _draw_thumb(self, slot: int) -> pygame.Rect:
+        cfg = self.cfg
+        rect = self._slot_rect(slot)
+        key = self._slots[slot]
+        if key is None:
+            self.screen.fill(WINDOW_BG, rect)
+            return rect
+
+        th = self._thumbs[key]
+        self.screen.blit(th.static, rect)
+        self.screen.blit(self._glyph(th.title, TEXT_COLOR), (rect.x + 4, rect.y + 2))
+
+        frame = th.frame
+        if frame is not None:
+            x = rect.x + 4
+            for text, color in (
+                (f"t={frame.turn}", TEXT_COLOR),
+                (f"${frame.money[Team.RED]}", TEAM_COLOR[Team.RED]),
+                (f"${frame.money[Team.BLUE]}", TEAM_COLOR[Team.BLUE]),
+                (th.result or "", FINISHED_COLOR),
+            ):
+                if text:
+                    surf = self._glyph(text, color)
+                    self.screen.blit(surf, (x, rect.y + 17))
+                    x += surf.get_width() + 10
+
+            ts = th.ts
+            if ts >= 3:
+                # items as a dark dot, no labels at this size
+                d = max(1, ts // 3)
+                for team in (Team.RED, Team.BLUE):
+                    for (tx, ty) in frame.cells.get(team, {}):
+                        cx, cy = th.tile_center(team, tx, ty, cfg.header_h)
+                        self.screen.fill(ITEM_TEXT_COLOR, pygame.Rect(rect.x + cx - d // 2, rect.y + cy - d // 2, d, d))
+            for b in frame.bots:
+                cx, cy = th.tile_center(b.map_team, b.x, b.y, cfg.header_h)
+                pygame.draw.circle(self.screen, TEAM_COLOR[b.team], (rect.x + cx, rect.y + cy), max(1, ts // 2))
+
+        self._drawn_turn[slot] = None if frame is None else frame.turn
+        return rect
+
+    def draw(self) -> Optional[List[pygame.Rect]]:
+        '''redraw thumbnails that changed; returns their rects, or None after a full redraw'''
+        if self._full:
+            self.screen.fill(WINDOW_BG)
+            for slot in range(len(self._slots)):
+                self._draw_thumb(slot)
+            self._full = False
+            self._dirty.clear()
+            return None
+
+        dirty = [self._draw_thumb(slot) for slot in sorted(self._dirty)]
+        self._dirty.clear()
+        return dirty
+
+    def render(self, *, fps_cap: int = 30) -> bool:
+        '''draw and present once. Returns False if user closed window.'''
+        if not self._inited:
+            self.init()
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
 
-        pygame.display.flip()
+        dirty = self.draw()
+        if dirty is None:
+            pygame.display.flip()
+        elif dirty:
+            pygame.display.update(dirty)
         self.clock.tick(fps_cap)
         return True
 
     def close(self):
+        self._thumbs.clear()
+        self._glyphs.clear()
         pygame.quit()
@@ -0,0 +1,144 @@
+# render_process.py
+'''
+Pygame renderer running in its own process.
+
+The simulation snapshots each turn into a RenderFrame and pushes it onto a queue;
+the viewer process draws at its own fps and skips ahead when it falls behind, so
+drawing never throttles the turn loop. pygame is only imported in the child.
+'''
+
+import multiprocessing as mp
+import queue
+import time
+from collections import deque
+from typing import Deque, Optional
+
+from game_state import GameState
+from frames import MapLayout, RenderFrame, frame_from_state, layout_from_state
+
+
+def _viewer_main(layout: MapLayout, fps_cap: int, max_lag: int, frames, closed) -> None:
+    '''child process: draw frames from the queue until the simulation ends or the window closes'''
+    from render import Renderer
+
+    renderer = Renderer(None, layout=layout)
+    pending: Deque[RenderFrame] = deque()
+    last: Optional[RenderFrame] = None
+    done = False
+
+    try:
+        while True:
+            #drain whatever the simulation produced since the last draw
+            while True:
+                try:
+                    item = frames.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    done = True
+                else:
+                    pending.append(item)
+
+            #too far behind live, drop the oldest frames
+            while len(pending) > max_lag:
+                pending.popleft()
+
+            if pending:
+                last = pending.popleft()
+            elif done:
+                break
+            elif last is None:
+                #nothing to show yet, wait for the first frame
+                try:
+                    item = frames.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is None:
+                    break
+                pending.append(item)
+                continue
+
+            #redrawing an unchanged frame only pumps events and ticks the clock
+            if not renderer.render_frame(last, fps_cap=fps_cap):
+                closed.set()
+                break
+    finally:
+        renderer.close()
+
+
+class RenderProcess:
+    '''
+    Drop-in for Renderer in Game: render_once() snapshots the live state and hands it
+    to the viewer process instead of drawing inline.
+
+    max_lag is how many frames the viewer may fall behind before it starts dropping them.
+    '''
+    def __init__(self, game_state: GameState, fps_cap: int = 30, max_lag: Optional[int] = None):
+        self.gs = game_state
+
+        #spawn, not fork: pygame/SDL state does not survive a fork reliably
+        ctx = mp.get_context("spawn")
+        self._frames = ctx.Queue()
+        self._closed = ctx.Event()
+        lag = max_lag if max_lag is not None else max(1, 2 * fps_cap)
+
+        self._proc = ctx.Process(
+            target=_viewer_main,
+            args=(layout_from_state(game_state), fps_cap, lag, self._frames, self._closed),
+            daemon=True,
+        )
+        self._proc.start()
+
+    def render_once(self, *, fps_cap: int = 30) -> bool:
+        '''
+        Queue one frame of the live game state. Returns False if user closed window.
+        fps_cap is fixed when the viewer starts and only accepted for Renderer compatibility.
+        '''
+        if self._closed.is_set() or not self._proc.is_alive():
+            return False
+        self._frames.put(frame_from_state(self.gs))
+        return True
+
+    def close(self, timeout: Optional[float] = None):
+        '''let the viewer play out what it has queued, then stop it'''
+        if self._proc.is_alive():
+            self._frames.put(None)
+            self._proc.join(timeout)
+        if self._proc.is_alive():
+            self._proc.terminate()
+            self._proc.join()
+        #don't block interpreter exit on frames the viewer never read
+        self._frames.cancel_join_thread()
+        self._frames.close()
+
+
+class FrameSender:
+    '''
+    Drop-in for Renderer in Game that only puts (key, frame) onto a queue read by a viewer
+    somewhere else, e.g. the tournament grid. At most fps_cap frames per second are sent;
+    the last turn is always sent on close().
+    '''
+    def __init__(self, frames, key, fps_cap: int = 10):
+        self.gs: Optional[GameState] = None  # set by Game
+        self._frames = frames
+        self.key = key
+        self._interval = 1.0 / fps_cap if fps_cap > 0 else 0.0
+        self._last_sent = 0.0
+        self._stale = False
+
+    def _send(self) -> None:
+        self._frames.put((self.key, frame_from_state(self.gs)))
+        self._last_sent = time.perf_counter()
+        self._stale = False
+
+    def render_once(self, *, fps_cap: int = 30) -> bool:
+        '''never blocks the turn loop; turns between sends are skipped'''
+        if time.perf_counter() - self._last_sent < self._interval:
+            self._stale = True
+            return True
+        self._send()
+        return True
+
+    def close(self):
+        if self._stale and self.gs is not None:
+            self._send()
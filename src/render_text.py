@@ -0,0 +1,220 @@
+# render_text.py
+'''
+Terminal renderer: both maps, bots and the HUD drawn with ANSI escape codes.
+
+Tiles use the same characters as the map format, items are shown in yellow
+(food as its lowercase letter, p = plate, d = dirty plate, o = empty pan) and
+bots as their id in their team's colour. The screen is kept as a grid of cells
+and only cells that changed since the last draw are rewritten, using cursor
+addressing, so watching a match over ssh costs almost nothing per turn.
+'''
+
+import sys
+import time
+from typing import Dict, List, Optional, TextIO, Tuple
+
+from game_constants import Team
+from game_state import GameState
+from frames import MapLayout, RenderFrame, frame_from_state, layout_from_state
+from map_processor import CHAR_TO_TILE
+
+
+# inverse of the map legend: tile name -> map character
+TILE_TO_CHAR: Dict[str, str] = {cls().tile_name: ch for ch, cls in CHAR_TO_TILE.items()}
+
+RESET = "\x1b[0m"
+TEAM_STYLE = {
+    Team.RED: "\x1b[31m",
+    Team.BLUE: "\x1b[34m",
+}
+BOT_STYLE = {
+    Team.RED: "\x1b[1;7;31m",
+    Team.BLUE: "\x1b[1;7;34m",
+}
+ITEM_STYLE = "\x1b[33m"
+WALL_STYLE = "\x1b[2m"
+
+MAP_GAP = 3
+MIN_WIDTH = 80
+MAX_ORDERS = 6
+
+# one screen cell: (character, SGR style), "" = default style
+Cell = Tuple[str, str]
+
+
+def item_char(label: str, tile_char: str) -> Optional[str]:
+    '''single character for an item label, None to keep showing the tile'''
+    if not label or tile_char == "B":
+        return None
+    if label == "Pan":
+        #every cooker holds an empty pan, only call it out elsewhere
+        return None if tile_char == "K" else "o"
+    if label.startswith("Pan("):
+        return label[4].lower()
+    if label == "Pd":
+        return "d"
+    if label.startswith("P"):
+        return "p"
+    return label[0].lower()
+
+
+class TextRenderer:
+    '''
+    Drop-in for Renderer in Game that draws into a terminal.
+
+    Turns that arrive faster than fps_cap are not drawn (but never waited for);
+    the next draw catches up with everything that changed in between. The cursor
+    is parked below the screen so stray prints from bots land there, and every
+    repaint_every draws the whole screen is repainted to clean up after them.
+    '''
+    def __init__(self, game_state: Optional[GameState], stream: TextIO = sys.stdout, layout: Optional[MapLayout] = None,
+                 repaint_every: int = 300):
+        self.gs = game_state
+        self.stream = stream
+        self.repaint_every = repaint_every
+        self.layout = layout if layout is not None else layout_from_state(game_state)
+        self.w = self.layout.width
+        self.h = self.layout.height
+
+        self.width = max(self.w * 2 + MAP_GAP, MIN_WIDTH)
+        self._tile_chars = {
+            team: [[TILE_TO_CHAR.get(name, "?") for name in col] for col in self.layout.tile_names[team]]
+            for team in (Team.RED, Team.BLUE)
+        }
+
+        self._prev: Optional[List[List[Cell]]] = None
+        self._draws = 0
+        self._last_draw = 0.0
+        self._stale = False  # a turn was skipped since the last draw
+
+    # ----------------------------
+    # Screen
+    # ----------------------------
+
+    def _map_left(self, team: Team) -> int:
+        return 0 if team == Team.RED else self.w + MAP_GAP
+
+    def _text_row(self, text: str, style: str = "") -> List[Cell]:
+        text = text[:self.width].ljust(self.width)
+        return [(ch, style) for ch in text]
+
+    def _screen(self, frame: RenderFrame) -> List[List[Cell]]:
+        '''the whole screen as rows of cells'''
+        rows: List[List[Cell]] = []
+
+        title = self._text_row("")
+        for team in (Team.RED, Team.BLUE):
+            left = self._map_left(team)
+            for i, ch in enumerate(f"{team.name} MAP"[:self.w]):
+                title[left + i] = (ch, TEAM_STYLE[team])
+        rows.append(title)
+
+        #maps, y=0 is the bottom row
+        grid = [self._text_row("") for _ in range(self.h)]
+        for team in (Team.RED, Team.BLUE):
+            left = self._map_left(team)
+            chars = self._tile_chars[team]
+            for x in range(self.w):
+                for y in range(self.h):
+                    ch = chars[x][y]
+                    grid[self.h - 1 - y][left + x] = (ch, WALL_STYLE if ch == "#" else "")
+
+            for (x, y), label in frame.cells.get(team, {}).items():
+                ch = item_char(label, chars[x][y])
+                if ch is not None:
+                    grid[self.h - 1 - y][left + x] = (ch, ITEM_STYLE)
+
+        for b in frame.bots:
+            grid[self.h - 1 - b.y][self._map_left(b.map_team) + b.x] = (str(b.bot_id % 10), BOT_STYLE[b.team])
+        rows.extend(grid)
+
+        #hud, fixed number of rows so nothing below it moves
+        rows.append(self._text_row(""))
+        rows.append(self._text_row(
+            f"Turn: {frame.turn}   RED money: {frame.money[Team.RED]}   BLUE money: {frame.money[Team.BLUE]}"
+        ))
+        for team in (Team.RED, Team.BLUE):
+            orders = frame.orders.get(team, [])
+            rows.append(self._text_row(f"{team.name} orders (active): {len(orders)}", TEAM_STYLE[team]))
+            for i in range(MAX_ORDERS):
+                rows.append(self._text_row("  " + orders[i] if i < len(orders) else ""))
+        rows.append(self._text_row("Bots:"))
+        for b in frame.bots:
+            rows.append(self._text_row(
+                f"  bot {b.bot_id} [{b.team.name}] on={b.map_team.name} pos=({b.x},{b.y}) holding={b.holding or 'None'}",
+                TEAM_STYLE[b.team],
+            ))
+        return rows
+
+    def _runs(self, rows: List[List[Cell]]) -> str:
+        '''escape codes rewriting every cell that differs from the previous screen'''
+        out: List[str] = []
+        prev = self._prev
+        style = None
+        for r, row in enumerate(rows):
+            old = prev[r] if prev is not None and r < len(prev) else None
+            c = 0
+            n = len(row)
+            while c < n:
+                if old is not None and c < len(old) and old[c] == row[c]:
+                    c += 1
+                    continue
+                #start of a changed run: one cursor move, then characters until the run ends
+                out.append(f"\x1b[{r + 1};{c + 1}H")
+                while c < n and (old is None or c >= len(old) or old[c] != row[c]):
+                    ch, st = row[c]
+                    if st != style:
+                        out.append(RESET + st)
+                        style = st
+                    out.append(ch)
+                    c += 1
+        if style:
+            out.append(RESET)
+        return "".join(out)
+
+    def draw_frame(self, frame: RenderFrame) -> int:
+        '''write the changes since the previous frame; returns how many bytes were written'''
+        if self.repaint_every > 0 and self._draws % self.repaint_every == 0:
+            self._prev = None
+        self._draws += 1
+
+        rows = self._screen(frame)
+        out = self._runs(rows)
+        if self._prev is None:
+            #hide the cursor and start from a clear screen
+            out = "\x1b[?25l\x1b[2J" + out
+        self._prev = rows
+        if out:
+            self.stream.write(out + f"\x1b[{len(rows) + 1};1H")
+            self.stream.flush()
+        return len(out)
+
+    def invalidate(self) -> None:
+        '''forget the previous frame so the next one is drawn in full'''
+        self._prev = None
+
+    # ----------------------------
+    # Game hooks
+    # ----------------------------
+
+    def render_once(self, *, fps_cap: int = 30) -> bool:
+        '''Draw the live game state unless the last draw was less than 1/fps_cap ago. Never blocks.'''
+        now = time.perf_counter()
+        if fps_cap > 0 and self._prev is not None and now - self._last_draw < 1.0 / fps_cap:
+            #not even a snapshot, close() catches up if this was the last turn
+            self._stale = True
+            return True
+        self._stale = False
+        self._last_draw = now
+        self.draw_frame(frame_from_state(self.gs))
+        return True
+
+    def close(self):
+        '''show the last turn, then give the terminal back with the cursor below the screen'''
+        if self._stale and self.gs is not None:
+            self.draw_frame(frame_from_state(self.gs))
+            self._stale = False
+        if self._prev is not None:
+            self.stream.write(f"{RESET}\x1b[{len(self._prev) + 1};1H\x1b[?25h\n")
+            self.stream.flush()
+        self._prev = None
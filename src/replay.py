@@ -0,0 +1,147 @@
+# replay.py
+'''
+Replay files (written by Game.export_replay) indexed for random access.
+
+Every turn is turned into a RenderFrame once at load time, but only every
+keyframe_interval-th frame is kept whole; the turns in between are stored as
+deltas against the previous turn. Seeking finds the nearest keyframe at or
+before the target by bisection and replays at most keyframe_interval deltas.
+'''
+
+import bisect
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from game_constants import Team
+from frames import BotView, MapLayout, RenderFrame, frame_from_dict, layout_from_dict
+
+
+def load_replay(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    if payload.get("format") == "actions":
+        #event sourced (game.py --replay-format actions): rebuild the states
+        from action_replay import ActionReplay
+        payload = ActionReplay(payload).to_payload()
+    if not payload.get("replay"):
+        raise ValueError(f"{path}: replay has no turns")
+    return payload
+
+
+@dataclass
+class FrameDelta:
+    '''what changed from one turn's frame to the next; None means unchanged'''
+    turn: int
+    money: Optional[Dict[Team, int]]
+    cells: Dict[Team, Dict[Tuple[int, int], Optional[str]]]  # None label = cell emptied
+    bots: Optional[List[BotView]]
+    orders: Optional[Dict[Team, List[str]]]
+
+
+def diff_frames(prev: RenderFrame, cur: RenderFrame) -> FrameDelta:
+    cells: Dict[Team, Dict[Tuple[int, int], Optional[str]]] = {}
+    for team, labels in cur.cells.items():
+        old = prev.cells.get(team, {})
+        changed: Dict[Tuple[int, int], Optional[str]] = {pos: label for pos, label in labels.items() if old.get(pos) != label}
+        for pos in old:
+            if pos not in labels:
+                changed[pos] = None
+        cells[team] = changed
+
+    return FrameDelta(
+        turn=cur.turn,
+        money=None if cur.money == prev.money else dict(cur.money),
+        cells=cells,
+        bots=None if cur.bots == prev.bots else list(cur.bots),
+        orders=None if cur.orders == prev.orders else cur.orders,
+    )
+
+
+def apply_delta(frame: RenderFrame, delta: FrameDelta) -> RenderFrame:
+    '''returns a new frame; the input frame is left untouched'''
+    cells = {team: dict(labels) for team, labels in frame.cells.items()}
+    for team, changed in delta.cells.items():
+        labels = cells.setdefault(team, {})
+        for pos, label in changed.items():
+            if label is None:
+                labels.pop(pos, None)
+            else:
+                labels[pos] = label
+
+    return RenderFrame(
+        turn=delta.turn,
+        money=frame.money if delta.money is None else delta.money,
+        cells=cells,
+        bots=frame.bots if delta.bots is None else delta.bots,
+        orders=frame.orders if delta.orders is None else delta.orders,
+    )
+
+
+class ReplayIndex:
+    '''random access to the frames of a replay by index (0 = first recorded turn)'''
+
+    def __init__(self, payload: Dict[str, Any], keyframe_interval: int = 32):
+        states = payload["replay"]
+        self.layout: MapLayout = layout_from_dict(states[0])
+        self.winner: Optional[str] = payload.get("winner")
+        self.keyframe_interval = max(1, keyframe_interval)
+
+        self._turns: List[int] = []
+        self._key_idx: List[int] = []  # sorted frame indices that have a keyframe
+        self._keyframes: List[RenderFrame] = []
+        self._deltas: List[Optional[FrameDelta]] = []  # None at keyframe indices
+
+        prev: Optional[RenderFrame] = None
+        for i, state in enumerate(states):
+            frame = frame_from_dict(state)
+            self._turns.append(frame.turn)
+            if prev is None or i % self.keyframe_interval == 0:
+                self._key_idx.append(i)
+                self._keyframes.append(frame)
+                self._deltas.append(None)
+            else:
+                self._deltas.append(diff_frames(prev, frame))
+            prev = frame
+
+        #last frame handed out, so stepping forward is a single delta
+        self._cur_idx = -1
+        self._cur: Optional[RenderFrame] = None
+
+    @classmethod
+    def from_file(cls, path: str, keyframe_interval: int = 32) -> "ReplayIndex":
+        return cls(load_replay(path), keyframe_interval=keyframe_interval)
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def turn_of(self, idx: int) -> int:
+        return self._turns[idx]
+
+    def index_of_turn(self, turn: int) -> int:
+        '''index of the last frame recorded at or before turn'''
+        return max(0, bisect.bisect_right(self._turns, turn) - 1)
+
+    def frame(self, idx: int) -> RenderFrame:
+        '''frame at index idx: O(log n) keyframe lookup plus at most keyframe_interval deltas'''
+        idx = min(max(idx, 0), len(self._turns) - 1)
+
+        if self._cur is not None and self._cur_idx <= idx and idx - self._cur_idx <= self.keyframe_interval:
+            #close ahead of where we are, just roll forward
+            frame, start = self._cur, self._cur_idx
+        else:
+            k = bisect.bisect_right(self._key_idx, idx) - 1
+            frame, start = self._keyframes[k], self._key_idx[k]
+
+        for i in range(start + 1, idx + 1):
+            delta = self._deltas[i]
+            if delta is None:
+                frame = self._keyframes[bisect.bisect_left(self._key_idx, i)]
+            else:
+                frame = apply_delta(frame, delta)
+
+        self._cur_idx, self._cur = idx, frame
+        return frame
+
+    def frame_at_turn(self, turn: int) -> RenderFrame:
+        return self.frame(self.index_of_turn(turn))
@@ -0,0 +1,148 @@
+# replay_viewer.py
+
+'''python src/replay_viewer.py replay_path.json'''
+
+import argparse
+import os
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "hide"
+
+import pygame
+
+from render import Renderer, RenderConfig
+from replay import ReplayIndex
+
+
+HELP = "space: play/pause  left/right: step  up/down: +/-10  pgup/pgdn: +/-keyframe  home/end  +/-: speed  drag: scrub  wasd/[ ]/wheel/minimap: camera"
+
+
+class ReplayViewer:
+    '''plays a replay file through Renderer, with stepping, seeking and mouse scrubbing'''
+
+    def __init__(self, index: ReplayIndex, cfg: RenderConfig = RenderConfig(), turns_per_second: float = 10.0, fps_cap: int = 60):
+        self.index = index
+        self.renderer = Renderer(None, cfg, layout=index.layout)
+        self.turns_per_second = turns_per_second
+        self.fps_cap = fps_cap
+
+        self.pos = 0
+        self.playing = False
+        self._scrubbing = False
+        self._accum = 0.0
+
+    def seek(self, idx: int) -> None:
+        self.pos = min(max(idx, 0), len(self.index) - 1)
+
+    def _scrub_to(self, mouse_x: int) -> None:
+        '''window width maps linearly onto the whole replay'''
+        frac = mouse_x / max(1, self.renderer.win_w - 1)
+        self.seek(round(frac * (len(self.index) - 1)))
+
+    def _handle_event(self, event) -> bool:
+        '''returns False to quit'''
+        if event.type == pygame.QUIT:
+            return False
+
+        #pan/zoom and minimap clicks take precedence over scrubbing
+        if self.renderer.handle_camera_event(event):
+            return True
+
+        if event.type == pygame.KEYDOWN:
+            k = event.key
+            if k in (pygame.K_ESCAPE, pygame.K_q):
+                return False
+            if k == pygame.K_SPACE:
+                self.playing = not self.playing
+            elif k == pygame.K_RIGHT:
+                self.playing = False
+                self.seek(self.pos + 1)
+            elif k == pygame.K_LEFT:
+                self.playing = False
+                self.seek(self.pos - 1)
+            elif k == pygame.K_UP:
+                self.seek(self.pos + 10)
+            elif k == pygame.K_DOWN:
+                self.seek(self.pos - 10)
+            elif k == pygame.K_PAGEUP:
+                self.seek(self.pos + self.index.keyframe_interval)
+            elif k == pygame.K_PAGEDOWN:
+                self.seek(self.pos - self.index.keyframe_interval)
+            elif k == pygame.K_HOME:
+                self.seek(0)
+            elif k == pygame.K_END:
+                self.seek(len(self.index) - 1)
+            elif k in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+                self.turns_per_second = min(self.turns_per_second * 2, 1000.0)
+            elif k in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                self.turns_per_second = max(self.turns_per_second / 2, 0.25)
+
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            self._scrubbing = True
+            self.playing = False
+            self._scrub_to(event.pos[0])
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+            self._scrubbing = False
+        elif event.type == pygame.MOUSEMOTION and self._scrubbing:
+            self._scrub_to(event.pos[0])
+
+        return True
+
+    def _advance(self, dt_s: float) -> None:
+        '''move forward in play mode at turns_per_second, independent of the fps'''
+        if not self.playing:
+            self._accum = 0.0
+            return
+        self._accum += dt_s * self.turns_per_second
+        steps = int(self._accum)
+        if steps:
+            self._accum -= steps
+            self.seek(self.pos + steps)
+        if self.pos >= len(self.index) - 1:
+            self.playing = False
+
+    def run(self) -> None:
+        r = self.renderer
+        r.init()
+        print(f"[REPLAY] {len(self.index)} turns, winner={self.index.winner}. {HELP}")
+
+        caption = None
+        dt_ms = 0
+        try:
+            while True:
+                for event in pygame.event.get():
+                    if not self._handle_event(event):
+                        return
+
+                self._advance(dt_ms / 1000.0)
+
+                frame = self.index.frame(self.pos)
+                r.present(r.draw_frame(frame))
+
+                state = "playing" if self.playing else "paused"
+                new_caption = f"Replay turn {frame.turn} ({self.pos + 1}/{len(self.index)}) [{state}] {self.turns_per_second:g} turns/s"
+                if new_caption != caption:
+                    pygame.display.set_caption(new_caption)
+                    caption = new_caption
+
+                dt_ms = r.clock.tick(self.fps_cap)
+        finally:
+            r.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="replay viewer")
+    ap.add_argument("replay", help="replay json written by game.py --replay")
+    ap.add_argument("--turn", type=int, default=None, help="start at this turn")
+    ap.add_argument("--tps", type=float, default=10.0, help="playback speed in turns per second")
+    ap.add_argument("--fps", type=int, default=60, help="fps cap")
+    ap.add_argument("--keyframe-interval", type=int, default=32, help="turns between stored full frames")
+    args = ap.parse_args()
+
+    index = ReplayIndex.from_file(args.replay, keyframe_interval=args.keyframe_interval)
+    viewer = ReplayViewer(index, turns_per_second=args.tps, fps_cap=args.fps)
+    if args.turn is not None:
+        viewer.seek(index.index_of_turn(args.turn))
+    viewer.run()
+
+
+if __name__ == "__main__":
+    main()
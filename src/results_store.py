@@ -0,0 +1,406 @@
+# results_store.py
+
+'''
+python src/results_store.py --db results.db h2h --map maps/map1.txt
+python src/results_store.py --db results.db maps --bot duo_noodle_bot
+python src/results_store.py --db results.db regressions --bot duo_noodle_bot
+python src/results_store.py --db results.db recent -n 20
+
+Match history in a local SQLite file. Bots and maps are stored once per content
+hash, so editing a bot file shows up as a new version of the same bot name. Every
+query runs on indexed columns of the matches table (or the bot_results view that
+lists each match once per side), so aggregating 100k matches takes well under a second.
+'''
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from game_constants import Team
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bots (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    path TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    UNIQUE (name, hash)
+);
+
+CREATE TABLE IF NOT EXISTS maps (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    path TEXT NOT NULL,
+    UNIQUE (name, hash)
+);
+
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    red_bot INTEGER NOT NULL REFERENCES bots(id),
+    blue_bot INTEGER NOT NULL REFERENCES bots(id),
+    map INTEGER NOT NULL REFERENCES maps(id),
+    seed INTEGER,
+    winner TEXT,                  -- 'RED', 'BLUE' or NULL for a draw / no result
+    red_money INTEGER NOT NULL,
+    blue_money INTEGER NOT NULL,
+    turns INTEGER NOT NULL,
+    turn_limit INTEGER NOT NULL,
+    red_time_s REAL NOT NULL,
+    blue_time_s REAL NOT NULL,
+    red_max_turn_s REAL NOT NULL,
+    blue_max_turn_s REAL NOT NULL,
+    red_timeouts INTEGER NOT NULL,
+    blue_timeouts INTEGER NOT NULL,
+    replay_path TEXT,
+    engine TEXT,                  -- game.engine_version() the match was played with
+    settings TEXT                 -- settings_key() of the match
+);
+
+CREATE INDEX IF NOT EXISTS matches_pair ON matches (red_bot, blue_bot, map);
+CREATE INDEX IF NOT EXISTS matches_blue ON matches (blue_bot, map);
+CREATE INDEX IF NOT EXISTS matches_map ON matches (map);
+CREATE INDEX IF NOT EXISTS matches_created ON matches (created_at);
+
+-- every match once per side, from that side's point of view; recreated on open so older
+-- databases get the current definition. Early-stopped matches keep their (unchanged)
+-- score but have no margin: their money is that of the turn they were cut short
+DROP VIEW IF EXISTS bot_results;
+CREATE VIEW bot_results AS
+    SELECT id AS match_id, created_at, map, red_bot AS bot, blue_bot AS opp, 'RED' AS side,
+           CASE WHEN winner = 'RED' THEN 1.0 WHEN winner IS NULL THEN 0.5 ELSE 0.0 END AS score,
+           CASE WHEN json_extract(settings, '$.early_stop') THEN NULL ELSE red_money - blue_money END AS margin,
+           red_time_s AS time_s, red_timeouts AS timeouts
+    FROM matches
+    UNION ALL
+    SELECT id, created_at, map, blue_bot, red_bot, 'BLUE',
+           CASE WHEN winner = 'BLUE' THEN 1.0 WHEN winner IS NULL THEN 0.5 ELSE 0.0 END,
+           CASE WHEN json_extract(settings, '$.early_stop') THEN NULL ELSE blue_money - red_money END,
+           blue_time_s, blue_timeouts
+    FROM matches;
+"""
+
+
+def file_hash(path: str) -> str:
+    '''content hash of a bot or map file (first 16 hex digits of sha256)'''
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+#columns added after the first release, for databases created before them
+MIGRATIONS = (
+    ("engine", "ALTER TABLE matches ADD COLUMN engine TEXT"),
+    ("settings", "ALTER TABLE matches ADD COLUMN settings TEXT"),
+)
+
+
+def settings_key(turn_limit: int, per_turn_timeout_s: float, early_stop: bool = False) -> str:
+    '''the match settings that can change a result, as stored and looked up'''
+    settings = {"turns": turn_limit, "timeout": per_turn_timeout_s}
+    if early_stop:
+        #same winner, but the money and turns of a match cut short
+        settings["early_stop"] = True
+    return json.dumps(settings, sort_keys=True)
+
+
+def file_name(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+@dataclass
+class MatchRecord:
+    '''one finished match, as stored'''
+    red_path: str
+    blue_path: str
+    map_path: str
+    winner: Optional[str]
+    red_money: int
+    blue_money: int
+    turns: int
+    turn_limit: int
+    red_time_s: float = 0.0
+    blue_time_s: float = 0.0
+    red_max_turn_s: float = 0.0
+    blue_max_turn_s: float = 0.0
+    red_timeouts: int = 0
+    blue_timeouts: int = 0
+    seed: Optional[int] = None
+    replay_path: Optional[str] = None
+    engine: Optional[str] = None
+    settings: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+
+
+def record_from_game(game, winner: Optional[Team], seed: Optional[int] = None) -> MatchRecord:
+    '''describe a Game after run_game(); seed defaults to the game's own'''
+    from game import engine_version
+
+    gs = game.game_state
+    tpl = game.template
+    return MatchRecord(
+        red_path=tpl.red_bot_path,
+        blue_path=tpl.blue_bot_path,
+        map_path=tpl.map_path,
+        winner=None if winner is None else winner.name,
+        red_money=gs.get_team_money(Team.RED),
+        blue_money=gs.get_team_money(Team.BLUE),
+        turns=gs.turn,
+        turn_limit=game.turn_limit,
+        red_time_s=game.bot_time_s[Team.RED],
+        blue_time_s=game.bot_time_s[Team.BLUE],
+        red_max_turn_s=game.bot_max_turn_s[Team.RED],
+        blue_max_turn_s=game.bot_max_turn_s[Team.BLUE],
+        red_timeouts=game.bot_timeouts[Team.RED],
+        blue_timeouts=game.bot_timeouts[Team.BLUE],
+        seed=game.seed if seed is None else seed,
+        replay_path=game.replay_path,
+        engine=engine_version(),
+        settings=settings_key(game.turn_limit, game.per_turn_timeout_s, game.early_stop),
+    )
+
+
+class ResultsStore:
+    '''SQLite match history; one writer at a time, any number of readers (WAL)'''
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(matches)")}
+        for column, sql in MIGRATIONS:
+            if column not in columns:
+                self.conn.execute(sql)
+
+        #path -> (mtime_ns, size, row id), so files are only re-hashed after they change
+        self._bot_ids: Dict[str, Tuple[int, int, int]] = {}
+        self._map_ids: Dict[str, Tuple[int, int, int]] = {}
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "ResultsStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ----------------------------
+    # Writing
+    # ----------------------------
+
+    def _file_id(self, table: str, cache: Dict[str, Tuple[int, int, int]], path: str) -> int:
+        st = os.stat(path)
+        hit = cache.get(path)
+        if hit is not None and hit[:2] == (st.st_mtime_ns, st.st_size):
+            return hit[2]
+
+        name, digest = file_name(path), file_hash(path)
+        if table == "bots":
+            self.conn.execute(
+                "INSERT OR IGNORE INTO bots (name, hash, path, first_seen) VALUES (?, ?, ?, ?)",
+                (name, digest, os.path.abspath(path), time.time()),
+            )
+        else:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO maps (name, hash, path) VALUES (?, ?, ?)",
+                (name, digest, os.path.abspath(path)),
+            )
+        row_id = self.conn.execute(f"SELECT id FROM {table} WHERE name = ? AND hash = ?", (name, digest)).fetchone()[0]
+        cache[path] = (st.st_mtime_ns, st.st_size, row_id)
+        return row_id
+
+    def add_many(self, records: Iterable[MatchRecord]) -> int:
+        '''insert records in one transaction; returns how many'''
+        rows = []
+        for r in records:
+            rows.append((
+                r.created_at,
+                self._file_id("bots", self._bot_ids, r.red_path),
+                self._file_id("bots", self._bot_ids, r.blue_path),
+                self._file_id("maps", self._map_ids, r.map_path),
+                r.seed, r.winner, r.red_money, r.blue_money, r.turns, r.turn_limit,
+                r.red_time_s, r.blue_time_s, r.red_max_turn_s, r.blue_max_turn_s,
+                r.red_timeouts, r.blue_timeouts, r.replay_path, r.engine, r.settings,
+            ))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO matches (created_at, red_bot, blue_bot, map, seed, winner, red_money, blue_money, turns, turn_limit,"
+                " red_time_s, blue_time_s, red_max_turn_s, blue_max_turn_s, red_timeouts, blue_timeouts, replay_path, engine, settings)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def add(self, record: MatchRecord) -> None:
+        self.add_many([record])
+
+    def lookup(self, red_path: str, blue_path: str, map_path: str, seed: int, engine: str, settings: str) -> Optional[MatchRecord]:
+        '''
+        The stored result of this exact match, if it was played before: same bot and map
+        contents, seed, engine version and settings. A seeded match is deterministic, so
+        the stored result can stand in for playing it again (tournament.py and
+        match_server.py import the bots afresh for seeded matches, so module globals from
+        earlier matches cannot leak in), unless a bot timed out: a timeout forfeits the
+        match and depends on the machine, so those are never reused.
+        '''
+        red = self._file_id("bots", self._bot_ids, red_path)
+        blue = self._file_id("bots", self._bot_ids, blue_path)
+        map_id = self._file_id("maps", self._map_ids, map_path)
+        row = self.conn.execute(
+            "SELECT winner, red_money, blue_money, turns, turn_limit, red_time_s, blue_time_s, red_max_turn_s, blue_max_turn_s,"
+            " red_timeouts, blue_timeouts, replay_path, created_at"
+            " FROM matches WHERE red_bot = ? AND blue_bot = ? AND map = ? AND seed = ? AND engine = ? AND settings = ?"
+            " AND red_timeouts = 0 AND blue_timeouts = 0"
+            " ORDER BY id DESC LIMIT 1",
+            (red, blue, map_id, seed, engine, settings),
+        ).fetchone()
+        if row is None:
+            return None
+        (winner, red_money, blue_money, turns, turn_limit, red_time_s, blue_time_s, red_max, blue_max,
+         red_timeouts, blue_timeouts, replay_path, created_at) = row
+        return MatchRecord(
+            red_path, blue_path, map_path, winner, red_money, blue_money, turns, turn_limit,
+            red_time_s, blue_time_s, red_max, blue_max, red_timeouts, blue_timeouts,
+            seed=seed, replay_path=replay_path, engine=engine, settings=settings, created_at=created_at,
+        )
+
+    # ----------------------------
+    # Queries
+    # ----------------------------
+
+    def _map_filter(self, map_name: Optional[str], column: str = "r.map") -> Tuple[str, list]:
+        if map_name is None:
+            return "", []
+        return f" AND {column} IN (SELECT id FROM maps WHERE name = ?)", [file_name(map_name)]
+
+    def head_to_head(self, map_name: Optional[str] = None) -> List[Tuple[str, str, int, float, float]]:
+        '''(bot, opponent, games, score rate, mean margin) by bot name, all versions pooled; the margin leaves out early-stopped matches'''
+        where, args = self._map_filter(map_name)
+        return self.conn.execute(
+            "SELECT b.name, o.name, COUNT(*), AVG(r.score), AVG(r.margin)"
+            " FROM bot_results r JOIN bots b ON b.id = r.bot JOIN bots o ON o.id = r.opp"
+            f" WHERE b.name != o.name{where}"
+            " GROUP BY b.name, o.name ORDER BY b.name, o.name",
+            args,
+        ).fetchall()
+
+    def map_win_rates(self, bot_name: Optional[str] = None) -> List[Tuple[str, str, int, float, float]]:
+        '''(bot, map, games, score rate, timeouts per game) by bot name and map'''
+        where, args = "", []
+        if bot_name is not None:
+            where, args = " AND b.name = ?", [file_name(bot_name)]
+        return self.conn.execute(
+            "SELECT b.name, m.name, COUNT(*), AVG(r.score), AVG(r.timeouts)"
+            " FROM bot_results r JOIN bots b ON b.id = r.bot JOIN maps m ON m.id = r.map"
+            f" WHERE 1 = 1{where}"
+            " GROUP BY b.name, m.name ORDER BY b.name, m.name",
+            args,
+        ).fetchall()
+
+    def regressions(self, bot_name: Optional[str] = None, min_games: int = 20) -> List[Tuple[str, str, str, int, float, float]]:
+        '''
+        Each version of a bot against the previous one, on the opponents and maps both played:
+        (bot, previous hash, hash, games, previous score rate, score rate), oldest version first.
+        A drop in score rate is a regression.
+        '''
+        where, args = "", []
+        if bot_name is not None:
+            where, args = " WHERE name = ?", [file_name(bot_name)]
+        versions: Dict[str, List[Tuple[int, str]]] = {}
+        for bot_id, name, digest in self.conn.execute(f"SELECT id, name, hash FROM bots{where} ORDER BY first_seen, id", args):
+            versions.setdefault(name, []).append((bot_id, digest))
+
+        out = []
+        for name, vs in versions.items():
+            for (prev_id, prev_hash), (cur_id, cur_hash) in zip(vs, vs[1:]):
+                #only (opponent, map) pairs both versions played, so a changed pool of opponents is not a regression
+                row = self.conn.execute(
+                    "WITH p AS (SELECT opp, map, AVG(score) AS s, COUNT(*) AS n FROM bot_results WHERE bot = ? GROUP BY opp, map),"
+                    " c AS (SELECT opp, map, AVG(score) AS s, COUNT(*) AS n FROM bot_results WHERE bot = ? GROUP BY opp, map)"
+                    " SELECT SUM(c.n), SUM(p.s * c.n) / SUM(c.n), SUM(c.s * c.n) / SUM(c.n)"
+                    " FROM p JOIN c ON p.opp = c.opp AND p.map = c.map",
+                    (prev_id, cur_id),
+                ).fetchone()
+                games = row[0] or 0
+                if games >= min_games:
+                    out.append((name, prev_hash, cur_hash, games, row[1], row[2]))
+        return out
+
+    def recent(self, n: int = 20) -> List[tuple]:
+        return self.conn.execute(
+            "SELECT m.id, datetime(m.created_at, 'unixepoch'), rb.name, bb.name, mp.name, m.winner, m.red_money, m.blue_money,"
+            " m.turns, m.red_timeouts + m.blue_timeouts"
+            " FROM matches m JOIN bots rb ON rb.id = m.red_bot JOIN bots bb ON bb.id = m.blue_bot JOIN maps mp ON mp.id = m.map"
+            " ORDER BY m.created_at DESC LIMIT ?",
+            (n,),
+        ).fetchall()
+
+
+# ----------------------------
+# CLI
+# ----------------------------
+
+def _print_table(header: List[str], rows: List[tuple]) -> None:
+    def fmt(v) -> str:
+        if isinstance(v, float):
+            return f"{v:.3f}"
+        return "-" if v is None else str(v)
+
+    cells = [header] + [[fmt(v) for v in row] for row in rows]
+    widths = [max(len(r[i]) for r in cells) for i in range(len(header))]
+    for r in cells:
+        print("  ".join(c.ljust(w) for c, w in zip(r, widths)))
+
+
+def main():
+    import argparse
+
+    ap = argparse.ArgumentParser(description="query the match results database")
+    ap.add_argument("--db", default="results.db", help="sqlite file")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    sp = sub.add_parser("h2h", help="head-to-head score rates between bots")
+    sp.add_argument("--map", default=None, help="only this map (name or path)")
+
+    sp = sub.add_parser("maps", help="per-map score rates")
+    sp.add_argument("--bot", default=None, help="only this bot (name or path)")
+
+    sp = sub.add_parser("regressions", help="each bot version against the previous one")
+    sp.add_argument("--bot", default=None, help="only this bot (name or path)")
+    sp.add_argument("--min-games", type=int, default=20, help="skip version pairs with fewer shared games")
+
+    sp = sub.add_parser("recent", help="latest matches")
+    sp.add_argument("-n", type=int, default=20)
+
+    args = ap.parse_args()
+
+    if not os.path.exists(args.db):
+        ap.error(f"{args.db} does not exist")
+
+    with ResultsStore(args.db) as store:
+        if args.cmd == "h2h":
+            _print_table(["bot", "opponent", "games", "score", "margin"], store.head_to_head(args.map))
+        elif args.cmd == "maps":
+            _print_table(["bot", "map", "games", "score", "timeouts/game"], store.map_win_rates(args.bot))
+        elif args.cmd == "regressions":
+            rows = [(*r, r[5] - r[4]) for r in store.regressions(args.bot, args.min_games)]
+            _print_table(["bot", "from", "to", "games", "score before", "score after", "change"], rows)
+        else:
+            _print_table(["id", "time", "red", "blue", "map", "winner", "red $", "blue $", "turns", "timeouts"], store.recent(args.n))
+
+
+if __name__ == "__main__":
+    main()
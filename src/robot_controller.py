@@ -12,34 +12,117 @@ Rules enforced here:
 from __future__ import annotations
 
 import copy
+import itertools
+import numbers
 from collections import deque
-from typing import Any, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 from game_constants import Team, FoodType, ShopCosts, GameConstants
 from map import Map
 from tiles import Tile, Counter, Sink, SinkTable, Cooker, Trash, Submit, Shop, Box
 from item import Item, Food, Plate, Pan
 
-from game_state import GameState
+from game_state import EventType, GameState, plate_matches_order
 
 from typing import Union
 
 Buyable = Union[FoodType, ShopCosts]
 
+#action vocabulary of legal_actions() / legal_action_mask(): a method name, or ("buy", item)
+Action = Union[str, Tuple[str, Buyable]]
+
+ACTIONS: List[Action] = [
+    "noop", "pickup", "place", "trash", "chop", "start_cook", "take_from_pan",
+    "take_clean_plate", "put_dirty_plate_in_sink", "wash_sink", "add_food_to_plate", "submit",
+] + [("buy", item) for item in list(FoodType) + list(ShopCosts)]
+
+#offsets (dx, dy) of the tiles an action can target; also the moves, (0, 0) staying put
+TARGETS: List[Tuple[int, int]] = [(0, 0), (-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+ACTION_INDEX: Dict[Action, int] = {a: i for i, a in enumerate(ACTIONS)}
+
+
+def _is_int(v: Any) -> bool:
+    '''coordinates, steps and turn counts: ints (numpy ones too), not bools'''
+    return isinstance(v, numbers.Integral) and not isinstance(v, bool)
+
+
+class ActionStatus(Enum):
+    '''outcome of one entry of apply_actions()'''
+    OK = 0
+    INVALID_BOT = 1     #unknown bot id or an enemy bot
+    UNKNOWN_ACTION = 2
+    BAD_ARGS = 3        #wrong number of arguments for the action
+    NO_MOVE_LEFT = 4    #bot already moved this turn
+    NO_ACTION_LEFT = 5  #bot already acted this turn
+    BAD_TARGET = 6      #target too far or out of bounds
+    FAILED = 7          #the rules did not allow it; the reason says why
+
+
+#plan steps besides the tile actions, with their argument counts
+PLAN_STEPS: Dict[str, int] = {"move_to": 2, "move_next_to": 2, "wait": 1, "wait_cooked": 2}
+
+#what a plan can ask to be woken up for (set_plan(..., wake_on=...)): event types on the team's map
+PLAN_EVENTS: Tuple[str, ...] = tuple(t.value for t in EventType)
+
+
+#entries of a controller's action_log, one per accepted call (plan steps included), in call order:
+#    [bot_id, "move", dx, dy]
+#    [bot_id, action, x, y]            #the resolved target tile
+#    [bot_id, "buy", item_name, x, y]  #FoodType / ShopCosts member name
+#    [team_name, "switch_maps"]
+ACTION_LOG_FORMAT = "v1"
+
+
+@dataclass
+class Plan:
+    '''a bot's multi-turn plan, run by the engine between calls to the bot (RobotController.set_plan)'''
+    steps: List[Tuple]
+    wake_on: Set[str]
+    map_team: Team #plans are in this map's coordinates
+    next: int = 0 #step in progress
+    waited: int = 0 #turns spent in a wait step
+    status: str = "running" #running, done or failed
+    reason: Optional[str] = None #why it failed
+    woken_by: Set[str] = field(default_factory=set) #wake_on events of this turn
+
 
 
 class RobotController:
     '''Class where robots can call the specified PUBLIC actions to alter game state'''
 
-    def __init__(self, team: Team, game_state: GameState):
+    def __init__(self, team: Team, game_state: GameState, quiet: bool = False, action_log: Optional[List[List[Any]]] = None):
         self.__team = team
         self.__game_state = game_state
+        self.__quiet = quiet #no printed warnings, e.g. for training environments
+
+        #accepted calls are appended here, json ready (see ACTION_LOG_FORMAT); both teams can share one list
+        self.__action_log = action_log
 
         self.__last_seen_turn: int = game_state.turn #curr turn
         self.__moves_left: Dict[int, int] = {}
         self.__actions_left: Dict[int, int] = {}
         self.__refresh_turn_budgets()
 
+        #multi-turn plans per bot, and BFS distances for their walking steps
+        self.__plans: Dict[int, Plan] = {}
+        self.__plan_dist: Dict[Tuple[Team, int, int, bool], List[List[Optional[int]]]] = {}
+
+        #last event seq handed out by get_events_since(), and looked at by run_plans()
+        self.__events_seen = game_state.event_seq
+        self.__plan_events_seen = game_state.event_seq
+
+        #tile actions by name, for apply_actions() and plans
+        self.__rules = {
+            "pickup": self.__pickup_at, "place": self.__place_at, "trash": self.__trash_at,
+            "buy": self.__buy_at, "chop": self.__chop_at, "start_cook": self.__start_cook_at,
+            "take_from_pan": self.__take_from_pan_at, "take_clean_plate": self.__take_clean_plate_at,
+            "put_dirty_plate_in_sink": self.__put_dirty_plate_in_sink_at, "wash_sink": self.__wash_sink_at,
+            "add_food_to_plate": self.__add_food_to_plate_at, "submit": self.__submit_at,
+        }
+
     # ----------------------------
     # Turn helpers
     # ----------------------------
@@ -142,6 +225,27 @@ class RobotController:
             "map_team": getattr(b, "map_team", b.team).name,
         }
 
+    def get_events_since(self, turn: Optional[int] = None) -> List[Dict[str, Any]]:
+        '''
+        events (GameEvent.to_dict(), oldest first) of turn `turn` and later, or with no
+        turn, every event since this controller's previous call, each exactly once.
+        Only the last EVENT_BUFFER_SIZE events are kept
+        '''
+        events = self.__game_state.events
+        if turn is not None:
+            return [e.to_dict() for e in events if e.turn >= turn]
+
+        seen = self.__events_seen
+        self.__events_seen = self.__game_state.event_seq
+        if events and events[0].seq > seen + 1:
+            self.__warn(f"get_events_since(): {events[0].seq - seen - 1} events dropped from the buffer")
+        new = list(itertools.takewhile(lambda e: e.seq > seen, reversed(events)))
+        return [e.to_dict() for e in reversed(new)]
+
+    def get_state_hash(self) -> int:
+        '''64-bit hash of the whole game state (GameState.state_hash()), e.g. for transposition tables'''
+        return self.__game_state.state_hash()
+
     def get_tile(self, team: Team, x: int, y: int) -> Optional[Tile]:
         '''Get the tile at a specific x, y'''
         try:
@@ -160,6 +264,20 @@ class RobotController:
         '''chess king distance'''
         return max(abs(x0 - x1), abs(y0 - y1))
 
+    def __find_target(self, b, label: str, target_x: Optional[int], target_y: Optional[int]) -> Tuple[Optional[Tuple[int, int, Tile]], Optional[str]]:
+        '''(target, None) if the target is good, else (None, why not); no target is the bot's own tile'''
+        target_x = b.x if target_x is None else target_x
+        target_y = b.y if target_y is None else target_y
+
+        if self.__chebyshev_dist(b.x, b.y, target_x, target_y) > 1:
+            return None, f"{label} failed: target ({target_x},{target_y}) too far from bot {b.bot_id} at ({b.x},{b.y})"
+
+        m = self.__game_state.get_map(b.map_team)
+        if not m.in_bounds(target_x, target_y):
+            return None, f"{label} failed : target ({target_x},{target_y}) is out of bounds"
+
+        return (target_x, target_y, m.tiles[target_x][target_y]), None
+
     def __resolve_target_tile(self, bot_id: int, label: str, target_x: Optional[int], target_y: Optional[int]) -> Optional[Tuple[int, int, Tile]]:
         '''checks if target is good'''
 
@@ -167,20 +285,44 @@ class RobotController:
         if b is None:
             return None
 
-        target_x = b.x if target_x is None else target_x
-        target_y = b.y if target_y is None else target_y
+        tgt, err = self.__find_target(b, label, target_x, target_y)
+        if err is not None:
+            self.__warn(err)
+        return tgt
 
-        if self.__chebyshev_dist(b.x, b.y, target_x, target_y) > 1:
-            self.__warn(f"{label} failed: target ({target_x},{target_y}) too far from bot {bot_id} at ({b.x},{b.y})")
-            return None
+    def __act(self, bot_id: int, name: str, target_x: Optional[int], target_y: Optional[int], *args) -> bool:
+        '''
+        shared path of the single actions: bot, action budget, target, then the rule,
+        which changes the state and returns None, or returns why it could not
+        '''
+        b = self.__safe_get_bot(bot_id)
+        if b is None:
+            return False
+        if not self.__consume_action(bot_id):
+            return False
 
-        m = self.__game_state.get_map(b.map_team)
-        if not m.in_bounds(target_x, target_y):
-            self.__warn(f"{label} failed : target ({target_x},{target_y}) is out of bounds")
-            return None
+        tgt, err = self.__find_target(b, f"{name}()", target_x, target_y)
+        if err is None:
+            err = self.__apply_rule(name, b, tgt, args)
+        if err is not None:
+            self.__warn(err)
+            return False
+        return True
 
-        tile = self.__game_state.get_tile(b.map_team, target_x, target_y)
-        return (target_x, target_y, tile)
+    def __apply_rule(self, name: str, b, tgt: Tuple[int, int, Tile], args) -> Optional[str]:
+        '''run a tile action's rule; its bot and target tile count as changed for the state hash'''
+        err = self.__rules[name](b, *tgt, *args)
+        self.__game_state.touch_bot(b.bot_id)
+        self.__game_state.touch_tile(b.map_team, tgt[0], tgt[1])
+        if err is None:
+            #buy's item by name, then the target
+            self.__record(b.bot_id, name, *(item.name for item in args), tgt[0], tgt[1])
+        return err
+
+    def __record(self, *entry) -> None:
+        '''log an accepted call, if this controller has an action log'''
+        if self.__action_log is not None:
+            self.__action_log.append(list(entry))
 
     # ----------------------------
     # Movement helpers
@@ -198,6 +340,20 @@ class RobotController:
         #returns the private internal checker after main checks for modularity
         return self.__can_move_internal(b.map_team, b.x, b.y, dx, dy)
 
+    def __move_by(self, b, dx: int, dy: int) -> Optional[str]:
+        '''the move itself, after the bot and its move budget are checked'''
+        if max(abs(dx), abs(dy)) > 1 or (dx == 0 and dy == 0):
+            return f"move() failed: bot {b.bot_id} illegal step ({dx},{dy}); must be chebyshev distance 1"
+        
+        if not self.__can_move_internal(b.map_team, b.x, b.y, dx, dy):
+            return f"move() failed: illegal move bot {b.bot_id} from ({b.x},{b.y}) by ({dx},{dy})"
+        
+        #move the bot through game state
+        if not self.__game_state.move_bot(b.bot_id, dx, dy):
+            return f"move() failed: occupied/blocked with movement of bot {b.bot_id} to ({b.x+dx},{b.y+dy})"
+
+        self.__record(b.bot_id, "move", dx, dy)
+        return None
 
     def move(self, bot_id: int, dx: int, dy: int) -> bool:
         '''actually moves, True if move succeeds; False otherwise'''
@@ -208,19 +364,11 @@ class RobotController:
         
         if not self.__consume_move(bot_id):
             return False
-        
-        if max(abs(dx), abs(dy)) > 1 or (dx == 0 and dy == 0):
-            self.__warn(f"move() failed: bot {bot_id} illegal step ({dx},{dy}); must be chebyshev distance 1")
-            return False
-        
-        if not self.__can_move_internal(b.map_team, b.x, b.y, dx, dy):
-            self.__warn(f"move() failed: illegal move bot {bot_id} from ({b.x},{b.y}) by ({dx},{dy})")
-            return False
-        
-        #move the bot through game state
-        if not self.__game_state.move_bot(bot_id, dx, dy):
-            self.__warn(f"move() failed: occupied/blocked with movement of bot {bot_id} to ({b.x+dx},{b.y+dy})")
 
+        err = self.__move_by(b, dx, dy)
+        if err is not None:
+            self.__warn(err)
+            return False
         return True
 
 
@@ -228,24 +376,9 @@ class RobotController:
     # botwise inventory interactions
     # ----------------------------
 
-    def pickup(self, bot_id: int, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
-        '''bot picks up from target x, target y location; box pickup special'''
-
-        b = self.__safe_get_bot(bot_id)
-
-        if b is None:
-            return False
-        if not self.__consume_action(bot_id):
-            return False
+    def __pickup_at(self, b, target_x: int, target_y: int, tile: Tile) -> Optional[str]:
         if b.holding is not None:
-            self.__warn(f"pickup() failed: bot {bot_id} already holding something")
-            return False
-
-        #check validity
-        tgt = self.__resolve_target_tile(bot_id, "pickup()", target_x, target_y)
-        if tgt is None:
-            return False
-        target_x, target_y, tile = tgt
+            return f"pickup() failed: bot {b.bot_id} already holding something"
 
         #CONSIDER BOX
         if isinstance(tile, Box):
@@ -253,8 +386,7 @@ class RobotController:
                 # enforce invariant
                 tile.count = 0
                 tile.item = None
-                self.__warn(f"pickup() failed: BOX at ({target_x},{target_y}) is empty for bot {bot_id}")
-                return False
+                return f"pickup() failed: BOX at ({target_x},{target_y}) is empty for bot {b.bot_id}"
 
             #give bot a new deepcopy of the stored prototype
             b.holding = copy.deepcopy(tile.item)
@@ -262,35 +394,24 @@ class RobotController:
             if tile.count <= 0:
                 tile.count = 0
                 tile.item = None
-            return True
+            return None
 
         item = getattr(tile, "item", None)
         if item is None:
-            self.__warn(f"pickup() failed: nothing to pick up at ({target_x},{target_y}) for bot {bot_id}")
-            return False
+            return f"pickup() failed: nothing to pick up at ({target_x},{target_y}) for bot {b.bot_id}"
 
         b.holding = item
         tile.item = None
 
-        return True
+        return None
 
-    def place(self, bot_id: int, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
-        '''bot places to target x, target y location; box place and food on pan in cooker is special'''
-        b = self.__safe_get_bot(bot_id)
+    def pickup(self, bot_id: int, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
+        '''bot picks up from target x, target y location; box pickup special'''
+        return self.__act(bot_id, "pickup", target_x, target_y)
 
-        if b is None:
-            return False
-        if not self.__consume_action(bot_id):
-            return False
+    def __place_at(self, b, target_x: int, target_y: int, tile: Tile) -> Optional[str]:
         if b.holding is None:
-            self.__warn(f"place() failed: bot {bot_id} holding nothing")
-            return False
-
-        tgt = self.__resolve_target_tile(bot_id, "place()", target_x, target_y)
-        if tgt is None:
-            return False
-        target_x, target_y, tile = tgt
-        
+            return f"place() failed: bot {b.bot_id} holding nothing"
 
         #COOKER SPECIAL CASE for pan with food on cooker
         #swap current cooker pan into bot's holding space
@@ -304,8 +425,7 @@ class RobotController:
 
                 # DON'T ALLOW SWAP if it is currently cooking right now
                 if isinstance(old_pan, Pan) and old_pan.food is not None:
-                    self.__warn(f"place() failed: cooker at ({target_x},{target_y}) is busy; old pan has food")
-                    return False
+                    return f"place() failed: cooker at ({target_x},{target_y}) is busy; old pan has food"
 
                 #else, just swap
                 tile.item = held_pan
@@ -317,25 +437,22 @@ class RobotController:
                 else:
                     tile.cook_progress = 0
 
-                return True
+                return None
 
             #bot holds food and places the food into the pan
             if isinstance(b.holding, Food):
                 pan = tile.item
                 #is there pan?
                 if not isinstance(pan, Pan):
-                    self.__warn(f"place() failed: cooker at ({target_x},{target_y}) missing pan for food")
-                    return False
+                    return f"place() failed: cooker at ({target_x},{target_y}) missing pan for food"
                 
                 #is pan empty
                 if pan.food is not None:
-                    self.__warn(f"place() failed: pan at ({target_x},{target_y}) is already occupied")
-                    return False
+                    return f"place() failed: pan at ({target_x},{target_y}) is already occupied"
                 
                 #is food valid for cooking?
                 if not b.holding.can_cook:
-                    self.__warn(f"place() failed: food {b.holding.food_name} cannot be cooked")
-                    return False
+                    return f"place() failed: food {b.holding.food_name} cannot be cooked"
 
                 #move food from hand to pan
                 pan.food = b.holding
@@ -343,11 +460,10 @@ class RobotController:
 
                 #init cook progress based on teh food
                 self.__set_cook_progress_for_food(tile, pan.food)
-                return True
+                return None
 
             #not the cases above, so fail
-            self.__warn(f"place() failed: must hold Pan or cookable Food for cooker at ({target_x},{target_y})")
-            return False
+            return f"place() failed: must hold Pan or cookable Food for cooker at ({target_x},{target_y})"
 
         #BOX SPECIAL CASE HERE WHERE WE PLACE THE BOX
         if isinstance(tile, Box):
@@ -359,53 +475,41 @@ class RobotController:
                 tile.item = b.holding
                 tile.count = 1
                 b.holding = None
-                return True
+                return None
 
             #non-empty means only accept same kind
             if tile.item is None:
                 tile.item = b.holding
                 tile.count = 1
                 b.holding = None
-                return True
+                return None
 
             if self.__item_signature(tile.item) != self.__item_signature(b.holding):
-                self.__warn(f"place() failed: box tile at ({target_x},{target_y}) stores a different item type")
-                return False
+                return f"place() failed: box tile at ({target_x},{target_y}) stores a different item type"
 
             tile.count += 1
             b.holding = None
-            return True
+            return None
 
         if not hasattr(tile, "item"):
-            self.__warn(f"place() failed: tile at ({target_x},{target_y}) cannot hold items for bot {bot_id}")
-            return False
+            return f"place() failed: tile at ({target_x},{target_y}) cannot hold items for bot {b.bot_id}"
         if getattr(tile, "item") is not None:
-            self.__warn(f"place() failed: tile at ({target_x},{target_y}) already has an item for bot {bot_id}")
-            return False
+            return f"place() failed: tile at ({target_x},{target_y}) already has an item for bot {b.bot_id}"
 
         tile.item = b.holding
         b.holding = None
-        return True
+        return None
 
-    def trash(self, bot_id: int, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
-        b = self.__safe_get_bot(bot_id)
+    def place(self, bot_id: int, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
+        '''bot places to target x, target y location; box place and food on pan in cooker is special'''
+        return self.__act(bot_id, "place", target_x, target_y)
 
-        if b is None:
-            return False
-        if not self.__consume_action(bot_id):
-            return False
+    def __trash_at(self, b, target_x: int, target_y: int, tile: Tile) -> Optional[str]:
         if b.holding is None:
-            self.__warn(f"trash() failed: bot {bot_id} holding onto nothing")
-            return False
-
-        tgt = self.__resolve_target_tile(bot_id, "trash()", target_x, target_y)
-        if tgt is None:
-            return False
-        target_x, target_y, tile = tgt
+            return f"trash() failed: bot {b.bot_id} holding onto nothing"
 
         if not isinstance(tile, Trash):
-            self.__warn(f"trash() failed: target ({target_x},{target_y}) is not trash tile for bot {bot_id}")
-            return False
+            return f"trash() failed: target ({target_x},{target_y}) is not trash tile for bot {b.bot_id}"
 
         if isinstance(b.holding, Plate):
             b.holding = Plate([], False) #clean plate
@@ -413,7 +517,10 @@ class RobotController:
             b.holding = Pan(None) #empty pan
         else:
             b.holding = None
-        return True
+        return None
+
+    def trash(self, bot_id: int, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
+        return self.__act(bot_id, "trash", target_x, target_y)
 
     # ----------------------------
     # Shop / economy (TEAM money)
@@ -430,32 +537,25 @@ class RobotController:
         # both FoodType and ShopCosts enums have .buy_cost so we can get that attr
         return int(getattr(item, "buy_cost"))
 
-    def __grant_buyable_to_bot(self, bot_id: int, item: Buyable) -> bool:
-        '''assign the purchased item to bot.holding. Returns False if unsupported'''
-        b = self.__safe_get_bot(bot_id)
-        if b is None:
-            return False
-        
+    def __grant_buyable_to_bot(self, b, item: Buyable) -> Optional[str]:
+        '''assign the purchased item to bot.holding. Returns why not if unsupported'''
         if b.holding is not None:
-            self.__warn(f'buy() failed: bot {bot_id} needs to be holding nothing to buy')
-            return False
+            return f'buy() failed: bot {b.bot_id} needs to be holding nothing to buy'
 
         if isinstance(item, FoodType):
             b.holding = Food(item)
-            return True
+            return None
 
         if isinstance(item, ShopCosts):
             if item == ShopCosts.PLATE:
                 b.holding = Plate(food=[], dirty=False)
-                return True
+                return None
             if item == ShopCosts.PAN:
                 b.holding = Pan(None)
-                return True
-            self.__warn(f"buy() failed: no shop item {item}")
-            return False
+                return None
+            return f"buy() failed: no shop item {item}"
 
-        self.__warn(f"buy() failed: no item type {type(item).__name__}")
-        return False
+        return f"buy() failed: no item type {type(item).__name__}"
 
 
     def can_buy(self, bot_id: int, item: Buyable, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
@@ -483,88 +583,60 @@ class RobotController:
         return self.__game_state.get_team_money(self.__team) >= cost
 
 
-
-    def buy(self, bot_id: int, item: Buyable, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
-        '''buys the item; bot needs to not be holding anything'''
-
-        b = self.__safe_get_bot(bot_id)
-        if b is None:
-            return False
-        if not self.__consume_action(bot_id):
-            return False
-
-        tgt = self.__resolve_target_tile(bot_id, "buy()", target_x, target_y)
-        if tgt is None:
-            return False
-        target_x, target_y, tile = tgt
-
+    def __buy_at(self, b, target_x: int, target_y: int, tile: Tile, item: Buyable) -> Optional[str]:
         if not isinstance(tile, Shop):
-            self.__warn(f"buy() failed: target ({target_x},{target_y}) is not a shop tile for bot {bot_id}")
-            return False
+            return f"buy() failed: target ({target_x},{target_y}) is not a shop tile for bot {b.bot_id}"
         if b.holding is not None:
-            self.__warn(f"buy() failed: bot {bot_id} must not carry anything when buying")
-            return False
+            return f"buy() failed: bot {b.bot_id} must not carry anything when buying"
 
         # enforce shop menu if present
         if not self.__shop_has_item(tile, item):
             name = getattr(item, "food_name", getattr(item, "item_name", str(item)))
-            self.__warn(f"buy() failed: {name} not in shop menu")
-            return False
+            return f"buy() failed: {name} not in shop menu"
 
         cost = self.__buyable_cost(item)
         if self.__game_state.get_team_money(self.__team) < cost:
             name = getattr(item, "food_name", getattr(item, "item_name", str(item)))
-            self.__warn(f"buy() failed: team {self.__team.name} insufficient funds for {name}")
-            return False
+            return f"buy() failed: team {self.__team.name} insufficient funds for {name}"
 
         # spend money
         self.__game_state.add_team_money(self.__team, -cost)
 
         # give the item to the bot
-        if not self.__grant_buyable_to_bot(bot_id, item):
+        err = self.__grant_buyable_to_bot(b, item)
+        if err is not None:
             # if grant fails, refund the money
             self.__game_state.add_team_money(self.__team, cost)
-            return False
+        return err
 
-        return True
+    def buy(self, bot_id: int, item: Buyable, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
+        '''buys the item; bot needs to not be holding anything'''
+        return self.__act(bot_id, "buy", target_x, target_y, item)
 
 
     # ----------------------------
     # Food processing
     # ----------------------------
 
-    def chop(self, bot_id: int, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
-        '''chop on a counter'''
-
-        b = self.__safe_get_bot(bot_id)
-        if b is None:
-            return False
-        if not self.__consume_action(bot_id):
-            return False
-
-        tgt = self.__resolve_target_tile(bot_id, "chop()", target_x, target_y)
-        if tgt is None:
-            return False
-        target_x, target_y, tile = tgt
-
+    def __chop_at(self, b, target_x: int, target_y: int, tile: Tile) -> Optional[str]:
         if not isinstance(tile, Counter):
-            self.__warn(f"chop() failed: target ({target_x},{target_y}) must be COUNTER for bot {bot_id}")
-            return False
+            return f"chop() failed: target ({target_x},{target_y}) must be COUNTER for bot {b.bot_id}"
         
         if b.holding is not None:
-            self.__warn(f"chop() failed: bot {bot_id} must be holding nothing")
-            return False
+            return f"chop() failed: bot {b.bot_id} must be holding nothing"
 
         item = getattr(tile, "item", None)
         if isinstance(item, Food):
             if not item.can_chop:
-                self.__warn(f"chop() failed: tile food not choppable bot {bot_id}")
-                return False
+                return f"chop() failed: tile food not choppable bot {b.bot_id}"
             item.chopped = True
-            return True
+            return None
 
-        self.__warn(f"chop() failed: nothing choppable at ({target_x},{target_y}) for bot {bot_id}")
-        return False
+        return f"chop() failed: nothing choppable at ({target_x},{target_y}) for bot {b.bot_id}"
+
+    def chop(self, bot_id: int, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
+        '''chop on a counter'''
+        return self.__act(bot_id, "chop", target_x, target_y)
 
     def can_start_cook(self, bot_id: int, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
         '''could bot start the cook'''
@@ -590,35 +662,18 @@ class RobotController:
         
         return isinstance(b.holding, Food) and b.holding.can_cook
 
-    def start_cook(self, bot_id: int, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
-        '''start cooking (ticks are environmental)'''
-
-        b = self.__safe_get_bot(bot_id)
-        if b is None:
-            return False
-        if not self.__consume_action(bot_id):
-            return False
-
-        tgt = self.__resolve_target_tile(bot_id, "start_cook()", target_x, target_y)
-        if tgt is None:
-            return False
-        target_x, target_y, tile = tgt
-
+    def __start_cook_at(self, b, target_x: int, target_y: int, tile: Tile) -> Optional[str]:
         if not isinstance(tile, Cooker):
-            self.__warn(f"start_cook() failed: target ({target_x},{target_y}) must be cooker tile for bot {bot_id}")
-            return False
+            return f"start_cook() failed: target ({target_x},{target_y}) must be cooker tile for bot {b.bot_id}"
         
         pan = tile.item
         if not isinstance(pan, Pan):
-            self.__warn(f"start_cook() failed: cooker at ({target_x},{target_y}) is missing pan for bot {bot_id}")
-            return False
+            return f"start_cook() failed: cooker at ({target_x},{target_y}) is missing pan for bot {b.bot_id}"
         
         if pan.food is not None:
-            self.__warn(f"start_cook() failed: pan already occupied at ({target_x},{target_y}) bot {bot_id}")
-            return False
+            return f"start_cook() failed: pan already occupied at ({target_x},{target_y}) bot {b.bot_id}"
         if not (isinstance(b.holding, Food) and b.holding.can_cook):
-            self.__warn(f"start_cook() failed: bot={bot_id} must hold cookable food")
-            return False
+            return f"start_cook() failed: bot={b.bot_id} must hold cookable food"
 
         pan.food = b.holding
         b.holding = None
@@ -631,161 +686,111 @@ class RobotController:
         else: 
             tile.cook_progress = GameConstants.BURN_PROGRESS
 
-        return True
+        return None
 
-    def take_from_pan(self, bot_id: int, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
-        '''take food from the pan'''
+    def start_cook(self, bot_id: int, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
+        '''start cooking (ticks are environmental)'''
+        return self.__act(bot_id, "start_cook", target_x, target_y)
 
-        b = self.__safe_get_bot(bot_id)
-        if b is None:
-            return False
-        if not self.__consume_action(bot_id):
-            return False
+    def __take_from_pan_at(self, b, target_x: int, target_y: int, tile: Tile) -> Optional[str]:
         if b.holding is not None:
-            self.__warn(f"take_from_pan(): bot={bot_id} already holding something")
-            return False
-
-        tgt = self.__resolve_target_tile(bot_id, "take_from_pan()", target_x, target_y)
-        if tgt is None:
-            return False
-        target_x, target_y, tile = tgt
+            return f"take_from_pan(): bot={b.bot_id} already holding something"
 
         if not isinstance(tile, Cooker):
-            self.__warn(f"take_from_pan(): target ({target_x},{target_y}) must be COOKER bot={bot_id}")
-            return False
+            return f"take_from_pan(): target ({target_x},{target_y}) must be COOKER bot={b.bot_id}"
         pan = tile.item
         if not isinstance(pan, Pan) or pan.food is None:
-            self.__warn(f"take_from_pan(): nothing in pan at ({target_x},{target_y}) bot={bot_id}")
-            return False
+            return f"take_from_pan(): nothing in pan at ({target_x},{target_y}) bot={b.bot_id}"
 
         #take the food and resest the pan
         b.holding = pan.food
         pan.food = None
         tile.cook_progress = 0
 
-        return True
+        return None
+
+    def take_from_pan(self, bot_id: int, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
+        '''take food from the pan'''
+        return self.__act(bot_id, "take_from_pan", target_x, target_y)
 
     # ----------------------------
     # Plates and sink helpers
     # ----------------------------
 
-    def take_clean_plate(self, bot_id: int, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
-        '''take a clean plate from the sink table'''
-
-        b = self.__safe_get_bot(bot_id)
-        if b is None:
-            return False
-        if not self.__consume_action(bot_id):
-            return False
+    def __take_clean_plate_at(self, b, target_x: int, target_y: int, tile: Tile) -> Optional[str]:
         if b.holding is not None:
-            self.__warn(f"take_clean_plate() failed: bot {bot_id} must not carry anything")
-            return False
-
-        tgt = self.__resolve_target_tile(bot_id, "take_clean_plate()", target_x, target_y)
-        if tgt is None:
-            return False
-        target_x, target_y, tile = tgt
+            return f"take_clean_plate() failed: bot {b.bot_id} must not carry anything"
 
         if not isinstance(tile, SinkTable):
-            self.__warn(f"take_clean_plate() failed: target ({target_x},{target_y}) must be a sinktable for bot {bot_id}")
-            return False
+            return f"take_clean_plate() failed: target ({target_x},{target_y}) must be a sinktable for bot {b.bot_id}"
         if tile.num_clean_plates <= 0:
-            self.__warn(f"take_clean_plate() failed: no clean plates available for bot={bot_id}")
-            return False
+            return f"take_clean_plate() failed: no clean plates available for bot={b.bot_id}"
 
         tile.num_clean_plates -= 1
         b.holding = Plate(food=[], dirty=False)
-        return True
+        return None
 
-    def put_dirty_plate_in_sink(self, bot_id: int, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
-        '''user carry a dirty plate, put it in the sink for washing'''
+    def take_clean_plate(self, bot_id: int, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
+        '''take a clean plate from the sink table'''
+        return self.__act(bot_id, "take_clean_plate", target_x, target_y)
 
-        b = self.__safe_get_bot(bot_id)
-        if b is None:
-            return False
-        if not self.__consume_action(bot_id):
-            return False
+    def __put_dirty_plate_in_sink_at(self, b, target_x: int, target_y: int, tile: Tile) -> Optional[str]:
         if not isinstance(b.holding, Plate) or not b.holding.dirty:
-            self.__warn(f"put_dirty_plate_in_sink() failed: bot {bot_id} isn't holding dirty plate")
-            return False
-
-        tgt = self.__resolve_target_tile(bot_id, "put_dirty_plate_in_sink()", target_x, target_y)
-        if tgt is None:
-            return False
-        target_x, target_y, tile = tgt
+            return f"put_dirty_plate_in_sink() failed: bot {b.bot_id} isn't holding dirty plate"
 
         if not isinstance(tile, Sink):
-            self.__warn(f"put_dirty_plate_in_sink() failed: target ({target_x},{target_y}) must be a sink tile for bot {bot_id}")
-            return False
+            return f"put_dirty_plate_in_sink() failed: target ({target_x},{target_y}) must be a sink tile for bot {b.bot_id}"
 
         #add dirty plate to sink
         tile.num_dirty_plates += 1
         b.holding = None
-        return True
+        return None
 
-    def wash_sink(self, bot_id: int, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
-        '''perform washing action, action is handled at the start of next turn's environmental tick'''
-        b = self.__safe_get_bot(bot_id)
-        if b is None:
-            return False
-        if not self.__consume_action(bot_id):
-            return False
-
-        tgt = self.__resolve_target_tile(bot_id, "wash_sink()", target_x, target_y)
-        if tgt is None:
-            return False
-        target_x, target_y, tile = tgt
+    def put_dirty_plate_in_sink(self, bot_id: int, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
+        '''user carry a dirty plate, put it in the sink for washing'''
+        return self.__act(bot_id, "put_dirty_plate_in_sink", target_x, target_y)
 
+    def __wash_sink_at(self, b, target_x: int, target_y: int, tile: Tile) -> Optional[str]:
         if not isinstance(tile, Sink):
-            self.__warn(f"wash_sink(): target ({target_x},{target_y}) must be sink tile bot {bot_id}")
-            return False
+            return f"wash_sink(): target ({target_x},{target_y}) must be sink tile bot {b.bot_id}"
         if tile.num_dirty_plates <= 0:
-            self.__warn(f"wash_sink(): no dirty plates to wash at ({target_x},{target_y}) bot {bot_id}")
-            return False
+            return f"wash_sink(): no dirty plates to wash at ({target_x},{target_y}) bot {b.bot_id}"
 
         tile.using = True
-        return True
-
-    def add_food_to_plate(self, bot_id: int, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
-        '''plate a food'''
-        b = self.__safe_get_bot(bot_id)
-        if b is None:
-            return False
-        if not self.__consume_action(bot_id):
-            return False
+        return None
 
-        tgt = self.__resolve_target_tile(bot_id, "add_food_to_plate()", target_x, target_y)
-        if tgt is None:
-            return False
-        target_x, target_y, tile = tgt
+    def wash_sink(self, bot_id: int, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
+        '''perform washing action, action is handled at the start of next turn's environmental tick'''
+        return self.__act(bot_id, "wash_sink", target_x, target_y)
 
+    def __add_food_to_plate_at(self, b, target_x: int, target_y: int, tile: Tile) -> Optional[str]:
         #plate if user is holidng a plate and is targetting food
         if isinstance(b.holding, Plate):
             if b.holding.dirty:
-                self.__warn(f"add_food_to_plate() failed: plate is dirty for bot {bot_id}")
-                return False
+                return f"add_food_to_plate() failed: plate is dirty for bot {b.bot_id}"
             if isinstance(getattr(tile, "item", None), Food):
                 food = tile.item
                 b.holding.food.append(food)
                 tile.item = None
-                return True
-            self.__warn(f"add_food_to_plate() failed: no food from target ({target_x},{target_y}) for bot {bot_id}")
-            return False
+                return None
+            return f"add_food_to_plate() failed: no food from target ({target_x},{target_y}) for bot {b.bot_id}"
 
         #plate if user is holding food and is targetting plate
         if isinstance(b.holding, Food) and isinstance(getattr(tile, "item", None), Plate):
             plate = tile.item
             if plate.dirty:
-                self.__warn(f"add_food_to_plate() failed: target plate is dirty at ({target_x},{target_y}) bot {bot_id}")
-                return False
+                return f"add_food_to_plate() failed: target plate is dirty at ({target_x},{target_y}) bot {b.bot_id}"
             
 
             plate.food.append(b.holding)
             b.holding = None
-            return True
+            return None
 
-        self.__warn(f"add_food_to_plate() failed: need a plate and food for bot {bot_id} targeting ({target_x},{target_y})")
-        return False
+        return f"add_food_to_plate() failed: need a plate and food for bot {b.bot_id} targeting ({target_x},{target_y})"
+
+    def add_food_to_plate(self, bot_id: int, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
+        '''plate a food'''
+        return self.__act(bot_id, "add_food_to_plate", target_x, target_y)
 
     # --------------
     # Submit logic
@@ -804,32 +809,447 @@ class RobotController:
         _, _, tile = tgt
         return isinstance(tile, Submit)
 
+    def __submit_at(self, b, target_x: int, target_y: int, tile: Tile) -> Optional[str]:
+        if not isinstance(tile, Submit):
+            return f"submit() failed: target ({target_x},{target_y}) must be submit station bot {b.bot_id}"
+        if not isinstance(b.holding, Plate) or b.holding.dirty:
+            return f"submit() failed: bot {b.bot_id} must have a clean Plate"
+
+        #let game state handle the submission logic
+        if not self.__game_state.submit_plate(b.bot_id, target_x, target_y):
+            return f"submit() failed: no matching order for bot {b.bot_id}"
+        return None
+
     def submit(self, bot_id: int, target_x: Optional[int] = None, target_y: Optional[int] = None) -> bool:
         '''perform the submission action'''
-        if not self.__consume_action(bot_id):
-            return False
+        return self.__act(bot_id, "submit", target_x, target_y)
+
+    # ----------------------------
+    # Legal action enumeration
+    # ----------------------------
 
+    def __legal_pairs(self, b) -> List[Tuple[int, int]]:
+        '''
+        (ACTIONS index, TARGETS index) of every action that would succeed now, noop left
+        out; one pass over the 3x3 neighbourhood with the same checks as the actions
+        '''
+        self.__ensure_turn()
+        if self.__actions_left.get(b.bot_id, 0) <= 0:
+            return []
+
+        gs = self.__game_state
+        m = gs.get_map(b.map_team)
+        h = b.holding
+        money = gs.get_team_money(self.__team)
+        clean_plate = isinstance(h, Plate) and not h.dirty
+
+        #only a clean plate in hand can be submitted, so only then look at the orders
+        orders = [o for o in gs.orders.get(b.map_team, []) if o.is_active(gs.turn)] if clean_plate else []
+        can_submit = any(plate_matches_order(h, o) for o in orders)
+
+        pairs = []
+        for j, (dx, dy) in enumerate(TARGETS):
+            x, y = b.x + dx, b.y + dy
+            if not (0 <= x < m.width and 0 <= y < m.height):
+                continue
+            tile = m.tiles[x][y]
+            item = getattr(tile, "item", None)
+
+            if h is None:
+                #empty hands and an empty tile: only shops and sinks offer anything
+                if item is None and not isinstance(tile, (Shop, SinkTable, Sink)):
+                    continue
+                if isinstance(tile, Box):
+                    if tile.count > 0 and item is not None:
+                        pairs.append((ACTION_INDEX["pickup"], j))
+                elif item is not None:
+                    pairs.append((ACTION_INDEX["pickup"], j))
+
+                if isinstance(tile, Counter) and isinstance(item, Food) and item.can_chop:
+                    pairs.append((ACTION_INDEX["chop"], j))
+                elif isinstance(tile, Cooker) and isinstance(item, Pan) and item.food is not None:
+                    pairs.append((ACTION_INDEX["take_from_pan"], j))
+                elif isinstance(tile, SinkTable) and tile.num_clean_plates > 0:
+                    pairs.append((ACTION_INDEX["take_clean_plate"], j))
+                elif isinstance(tile, Shop):
+                    for buyable in tile.shop_items:
+                        if money >= self.__buyable_cost(buyable):
+                            pairs.append((ACTION_INDEX[("buy", buyable)], j))
+            else:
+                #place, with the cooker and box special cases of place()
+                if isinstance(tile, Cooker):
+                    if isinstance(h, Pan):
+                        ok = not (isinstance(item, Pan) and item.food is not None)
+                    else:
+                        ok = isinstance(h, Food) and isinstance(item, Pan) and item.food is None and h.can_cook
+                elif isinstance(tile, Box):
+                    ok = tile.count <= 0 or item is None or self.__item_signature(item) == self.__item_signature(h)
+                else:
+                    ok = hasattr(tile, "item") and item is None
+                if ok:
+                    pairs.append((ACTION_INDEX["place"], j))
+
+                if isinstance(tile, Trash):
+                    pairs.append((ACTION_INDEX["trash"], j))
+                elif isinstance(tile, Cooker):
+                    if isinstance(h, Food) and h.can_cook and isinstance(item, Pan) and item.food is None:
+                        pairs.append((ACTION_INDEX["start_cook"], j))
+                elif isinstance(tile, Sink):
+                    if isinstance(h, Plate) and h.dirty:
+                        pairs.append((ACTION_INDEX["put_dirty_plate_in_sink"], j))
+                elif isinstance(tile, Submit):
+                    if can_submit:
+                        pairs.append((ACTION_INDEX["submit"], j))
+
+                if clean_plate:
+                    if isinstance(item, Food):
+                        pairs.append((ACTION_INDEX["add_food_to_plate"], j))
+                elif isinstance(h, Food) and isinstance(item, Plate) and not item.dirty:
+                    pairs.append((ACTION_INDEX["add_food_to_plate"], j))
+
+            if isinstance(tile, Sink) and tile.num_dirty_plates > 0:
+                pairs.append((ACTION_INDEX["wash_sink"], j))
+
+        pairs.sort()
+        return pairs
+
+    def legal_actions(self, bot_id: int) -> List[Tuple[Action, int, int]]:
+        '''
+        every (action, target_x, target_y) that would succeed for the bot right now;
+        action is a method name, called as controller.<name>(bot_id, x, y), or
+        ("buy", item) for buy(bot_id, item, x, y). Empty once the bot has acted.
+        '''
         b = self.__safe_get_bot(bot_id)
         if b is None:
-            return False
+            return []
+        return [(ACTIONS[i], b.x + TARGETS[j][0], b.y + TARGETS[j][1]) for i, j in self.__legal_pairs(b)]
 
-        tgt = self.__resolve_target_tile(bot_id, "submit()", target_x, target_y)
-        if tgt is None:
-            return False
-        target_x, target_y, tile = tgt
+    def legal_action_mask(self, bot_id: int) -> List[List[bool]]:
+        '''
+        fixed-size form of legal_actions(): mask[i][j] is whether ACTIONS[i] on the tile
+        at offset TARGETS[j] would succeed; the noop row is always True
+        '''
+        mask = [[False] * len(TARGETS) for _ in ACTIONS]
+        mask[0] = [True] * len(TARGETS)
+        b = self.__safe_get_bot(bot_id)
+        if b is not None:
+            for i, j in self.__legal_pairs(b):
+                mask[i][j] = True
+        return mask
+
+    def legal_move_mask(self, bot_id: int) -> List[bool]:
+        '''mask[j]: can the bot step by TARGETS[j] now; staying put always can'''
+        mask = [True] + [False] * (len(TARGETS) - 1)
+        b = self.__safe_get_bot(bot_id)
+        if b is None:
+            return mask
 
-        if not isinstance(tile, Submit):
-            self.__warn(f"submit() failed: target ({target_x},{target_y}) must be submit station bot {bot_id}")
+        self.__ensure_turn()
+        if self.__moves_left.get(bot_id, 0) <= 0:
+            return mask
+        m = self.__game_state.get_map(b.map_team)
+        occupancy = self.__game_state.occupancy[b.map_team]
+        for j, (dx, dy) in enumerate(TARGETS[1:], 1):
+            x, y = b.x + dx, b.y + dy
+            mask[j] = 0 <= x < m.width and 0 <= y < m.height and m.tiles[x][y].is_walkable and occupancy[x][y] is None
+        return mask
+
+    # ----------------------------
+    # Batched actions
+    # ----------------------------
+
+    def apply_actions(self, actions: List[Tuple[int, str, Tuple]]) -> List[Tuple[ActionStatus, Optional[str]]]:
+        '''
+        apply a list of (bot_id, action, args) in order, e.g. for several bots at once:
+
+            (1, "move", (dx, dy))
+            (1, "pickup", (x, y))            #args () targets the bot's own tile
+            (2, "buy", (FoodType.EGG, x, y))
+
+        action is the name of a single-action method. Each bot is looked up once and
+        nothing is printed; every entry gets back (status, reason), reason being the
+        warning the single call would have printed (None when it worked). Budgets are
+        the same as for the single calls, and malformed entries do not use them up.
+        '''
+        self.__ensure_turn()
+        gs = self.__game_state
+        bots: Dict[int, Any] = {}
+        results: List[Tuple[ActionStatus, Optional[str]]] = []
+
+        for bot_id, name, args in actions:
+            if not isinstance(args, (tuple, list)):
+                results.append((ActionStatus.BAD_ARGS, f"{name}() args must be a tuple or list"))
+                continue
+            args = tuple(args)
+            if bot_id not in bots:
+                b = gs.bots.get(bot_id)
+                bots[bot_id] = b if b is not None and b.team == self.__team else None
+            b = bots[bot_id]
+            if b is None:
+                results.append((ActionStatus.INVALID_BOT, f"Cannot control bot_id {bot_id}"))
+                continue
+
+            if name == "move":
+                err = self.__args_error(name, args)
+                if err is not None:
+                    results.append((ActionStatus.BAD_ARGS, err))
+                    continue
+                if self.__moves_left.get(bot_id, 0) <= 0:
+                    results.append((ActionStatus.NO_MOVE_LEFT, f"bot {bot_id} has already moved this turn"))
+                    continue
+                self.__moves_left[bot_id] -= 1
+                err = self.__move_by(b, *args)
+                results.append((ActionStatus.OK, None) if err is None else (ActionStatus.FAILED, err))
+                continue
+
+            rule = self.__rules.get(name)
+            if rule is None:
+                results.append((ActionStatus.UNKNOWN_ACTION, f"no action {name!r}"))
+                continue
+
+            #checked before any budget is used; buy takes the item before the target
+            err = self.__args_error(name, args)
+            if err is not None:
+                results.append((ActionStatus.BAD_ARGS, err))
+                continue
+            extra = ()
+            if name == "buy":
+                extra, args = args[:1], args[1:]
+
+            if self.__actions_left.get(bot_id, 0) <= 0:
+                results.append((ActionStatus.NO_ACTION_LEFT, f"bot {bot_id} has already acted this turn"))
+                continue
+            self.__actions_left[bot_id] -= 1
+
+            tgt, err = self.__find_target(b, f"{name}()", *(args or (None, None)))
+            if err is not None:
+                results.append((ActionStatus.BAD_TARGET, err))
+                continue
+            err = self.__apply_rule(name, b, tgt, extra)
+            results.append((ActionStatus.OK, None) if err is None else (ActionStatus.FAILED, err))
+
+        return results
+
+    # ----------------------------
+    # Plans (multi-turn, run by the engine)
+    # ----------------------------
+
+    def set_plan(self, bot_id: int, steps: List[Tuple], wake_on: Iterable[str] = ()) -> bool:
+        '''
+        give the bot a plan that the engine carries out turn by turn, e.g.
+
+            [("move_next_to", x, y), ("pickup", x, y)]
+            [("wait_cooked", x, y), ("take_from_pan", x, y)]
+
+        steps: ("move_to", x, y) / ("move_next_to", x, y) walk a shortest path onto or
+        next to a tile, waiting while other bots block it; ("wait", turns);
+        ("wait_cooked", x, y) waits until the food in that cooker's pan is cooked; and
+        any tile action as in apply_actions, e.g. ("buy", FoodType.EGG, x, y).
+
+        While every bot of the team has a running plan, play_turn is not called. It is
+        called again on the turn a plan finishes or fails (see get_plan()), or one of
+        the wake_on events (PLAN_EVENTS, e.g. "order_created") happens on the team's
+        map. A new plan replaces the old one.
+        '''
+        b = self.__safe_get_bot(bot_id)
+        if b is None:
             return False
-        if not isinstance(b.holding, Plate) or b.holding.dirty:
-            self.__warn(f"submit() failed: bot {bot_id} must have a clean Plate")
+
+        steps = [tuple(step) for step in steps]
+        for step in steps:
+            err = self.__plan_step_error(step)
+            if err is not None:
+                self.__warn(f"set_plan() failed: {err} for bot {bot_id}")
+                return False
+        wake_on = set(wake_on)
+        if not wake_on <= set(PLAN_EVENTS):
+            self.__warn(f"set_plan() failed: unknown events {sorted(wake_on - set(PLAN_EVENTS))} for bot {bot_id}")
             return False
 
-        #let game state handle the submission logic
-        succ = self.__game_state.submit_plate(bot_id, target_x, target_y)
-        if not succ:
-            self.__warn(f"submit() failed: no matching order for bot {bot_id}")
-        return succ
+        self.__plans[bot_id] = Plan(steps=steps, wake_on=wake_on, map_team=b.map_team)
+        return True
+
+    def get_plan(self, bot_id: int) -> Optional[Dict[str, Any]]:
+        '''the bot's plan and how far it got, or None'''
+        plan = self.__plans.get(bot_id)
+        if plan is None or self.__safe_get_bot(bot_id) is None:
+            return None
+        return {
+            "steps": list(plan.steps),
+            "next": plan.next,
+            "status": plan.status,
+            "reason": plan.reason,
+            "woken_by": sorted(plan.woken_by),
+        }
+
+    def clear_plan(self, bot_id: int) -> None:
+        '''drop the bot's plan; it is called every turn again'''
+        if self.__safe_get_bot(bot_id) is not None:
+            self.__plans.pop(bot_id, None)
+
+    def run_plans(self) -> bool:
+        '''
+        engine side of plans, called each turn before play_turn: one turn of every
+        running plan of the team. Returns whether play_turn has to be called: some bot
+        has no running plan (none, done or failed) or a wake_on event happened
+        '''
+        self.__ensure_turn()
+        events = self.__plan_events()
+
+        call = False
+        for bot_id in self.get_team_bot_ids(self.__team):
+            plan = self.__plans.get(bot_id)
+            if plan is None or plan.status != "running":
+                call = True
+                continue
+
+            self.__run_plan(self.__game_state.get_bot(bot_id), plan)
+            plan.woken_by = events & plan.wake_on
+            if plan.status != "running" or plan.woken_by:
+                call = True
+        return call
+
+    def __plan_step_error(self, step: Tuple) -> Optional[str]:
+        '''why a plan step is malformed, or None'''
+        if not step:
+            return "empty step"
+        kind, args = step[0], step[1:]
+        if kind in PLAN_STEPS:
+            if len(args) != PLAN_STEPS[kind] or not all(map(_is_int, args)):
+                return f"{kind} takes {PLAN_STEPS[kind]} integer arguments"
+            return None
+        if kind not in self.__rules:
+            return f"unknown step {kind!r}"
+        return self.__args_error(kind, args)
+
+    def __args_error(self, name: str, args: Tuple) -> Optional[str]:
+        '''why args do not fit a move or tile action (apply_actions, plan steps), or None'''
+        if name == "move":
+            if len(args) != 2 or not all(map(_is_int, args)):
+                return "move() takes integer (dx, dy)"
+            return None
+        if name == "buy":
+            if not args or not isinstance(args[0], (FoodType, ShopCosts)) \
+                    or len(args) not in (1, 3) or not all(map(_is_int, args[1:])):
+                return "buy() takes (item,) or (item, x, y), item a FoodType or ShopCosts and integer x, y"
+            return None
+        if len(args) not in (0, 2) or not all(map(_is_int, args)):
+            return f"{name}() takes () or integer (x, y)"
+        return None
+
+    def __plan_events(self) -> Set[str]:
+        '''types of the events on the team's map since the last run_plans()'''
+        gs = self.__game_state
+        seen = self.__plan_events_seen
+        self.__plan_events_seen = gs.event_seq
+        new = itertools.takewhile(lambda e: e.seq > seen, reversed(gs.events))
+        return {e.type.value for e in new if e.team == self.__team}
+
+    def __plan_distances(self, map_team: Team, x: int, y: int, near: bool) -> List[List[Optional[int]]]:
+        '''
+        steps from every walkable tile to (x, y), or to any walkable tile next to it if
+        near; other bots are ignored. Tiles never change walkability, so it is cached
+        '''
+        key = (map_team, x, y, near)
+        dist = self.__plan_dist.get(key)
+        if dist is not None:
+            return dist
+
+        m = self.__game_state.get_map(map_team)
+        dist = [[None] * m.height for _ in range(m.width)]
+        queue = deque()
+        goals = TARGETS if near else TARGETS[:1]
+        for dx, dy in goals:
+            gx, gy = x + dx, y + dy
+            if m.in_bounds(gx, gy) and m.tiles[gx][gy].is_walkable:
+                dist[gx][gy] = 0
+                queue.append((gx, gy))
+
+        while queue:
+            cx, cy = queue.popleft()
+            for dx, dy in TARGETS[1:]:
+                nx, ny = cx + dx, cy + dy
+                if m.in_bounds(nx, ny) and dist[nx][ny] is None and m.tiles[nx][ny].is_walkable:
+                    dist[nx][ny] = dist[cx][cy] + 1
+                    queue.append((nx, ny))
+
+        self.__plan_dist[key] = dist
+        return dist
+
+    def __run_plan(self, b, plan: Plan) -> None:
+        '''advance the plan as far as this turn's move and action allow'''
+        if b.map_team != plan.map_team:
+            plan.status, plan.reason = "failed", "bot changed maps"
+            return
+        m = self.__game_state.get_map(b.map_team)
+
+        while plan.next < len(plan.steps):
+            kind, *args = plan.steps[plan.next]
+
+            if kind in ("move_to", "move_next_to"):
+                dist = self.__plan_distances(b.map_team, args[0], args[1], kind == "move_next_to")
+                here = dist[b.x][b.y]
+                if here is None:
+                    plan.status, plan.reason = "failed", f"{kind}: no path to ({args[0]},{args[1]})"
+                    return
+                if here > 0:
+                    if self.__moves_left.get(b.bot_id, 0) <= 0:
+                        return
+
+                    #closest free neighbour that gets nearer; none means bots are in the way
+                    best = None
+                    for dx, dy in TARGETS[1:]:
+                        nx, ny = b.x + dx, b.y + dy
+                        if not m.in_bounds(nx, ny):
+                            continue
+                        d = dist[nx][ny]
+                        if d is not None and d < here and (best is None or d < best[0]) \
+                                and self.__can_move_internal(b.map_team, b.x, b.y, dx, dy):
+                            best = (d, dx, dy)
+                    if best is None:
+                        return
+
+                    self.__moves_left[b.bot_id] -= 1
+                    err = self.__move_by(b, best[1], best[2])
+                    if err is not None:
+                        plan.status, plan.reason = "failed", err
+                        return
+                    if best[0] > 0:
+                        return
+
+            elif kind == "wait":
+                if plan.waited < args[0]:
+                    plan.waited += 1
+                    return
+
+            elif kind == "wait_cooked":
+                tile = m.tiles[args[0]][args[1]] if m.in_bounds(args[0], args[1]) else None
+                pan = getattr(tile, "item", None) if isinstance(tile, Cooker) else None
+                if not isinstance(pan, Pan) or pan.food is None:
+                    plan.status, plan.reason = "failed", f"wait_cooked: nothing cooking at ({args[0]},{args[1]})"
+                    return
+                if pan.food.cooked_stage < 1:
+                    return
+
+            else:
+                if self.__actions_left.get(b.bot_id, 0) <= 0:
+                    return
+                self.__actions_left[b.bot_id] -= 1
+
+                extra = ()
+                if kind == "buy":
+                    extra, args = args[:1], args[1:]
+                tgt, err = self.__find_target(b, f"{kind}()", *(args or (None, None)))
+                if err is None:
+                    err = self.__apply_rule(kind, b, tgt, extra)
+                if err is not None:
+                    plan.status, plan.reason = "failed", err
+                    return
+
+            plan.next += 1
+            plan.waited = 0
+
+        plan.status = "done"
 
     # ----------------------------
     # Mid-game switch mechanics (for all bots on team)
@@ -872,6 +1292,8 @@ class RobotController:
 
         if not success:
             self.__warn("switch_maps() failed: request rejected by GameState")
+        else:
+            self.__record(self.__team.name, "switch_maps")
 
         return success
 
@@ -922,6 +1344,8 @@ class RobotController:
 
     def __warn(self, msg: str) -> None:
         '''warn string'''
+        if self.__quiet:
+            return
         print(f"[RC for {self.__team.name} WARN]: {msg}")
 
     def __can_move_internal(self, map_team: Team, x: int, y: int, dx: int, dy: int) -> bool:
@@ -932,7 +1356,8 @@ class RobotController:
         if not m.in_bounds(new_x, new_y):
             return False
         
-        if not self.__game_state.is_walkable(map_team, new_x, new_y):
+        #same as GameState.is_walkable, without looking the map up again
+        if not getattr(m.tiles[new_x][new_y], "is_walkable", False):
             return False
         
         occ = self.__game_state.occupancy[map_team][new_x][new_y]
@@ -19,11 +19,15 @@ class Tile:
 
   def to_dict(self):
       '''basic JSON'''
-      return {
+      d = {
           "tile_name": self.tile_name,
           "is_walkable": self.is_walkable,
           #no using
       }
+      #items can be put down on any tile, only serialize them when present to keep replays small
+      if self.item is not None:
+          d["item"] = self.item.to_dict()
+      return d
 
 class Placeable(Tile):
   '''
@@ -0,0 +1,356 @@
+# tournament.py
+
+'''
+python src/tournament.py --bots bots/a.py bots/b.py bots/c.py --maps maps/map1.txt maps/v1.txt --workers 8 --grid
+'''
+
+import contextlib
+import io
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import sys
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from frames import MapLayout
+from results_store import MatchRecord, ResultsStore, record_from_game, settings_key
+from game_constants import GameConstants, Team
+
+
+@dataclass
+class MatchSpec:
+    key: int
+    red: str
+    blue: str
+    map_path: str
+    seed: Optional[int] = None
+
+
+@dataclass
+class MatchResult:
+    key: int
+    red: str
+    blue: str
+    map_path: str
+    winner: Optional[str]  # "RED", "BLUE" or None for a draw
+    red_money: int
+    blue_money: int
+    error: Optional[str] = None
+    record: Optional[MatchRecord] = None  # for the results store, None if the match failed
+    failed_init: Optional[str] = None  # "RED", "BLUE" or "BOTH" if a bot could not be constructed (it forfeits)
+
+
+def bot_name(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def round_robin(bots: List[str], maps: List[str], rounds: int = 1, seed: Optional[int] = None) -> List[MatchSpec]:
+    '''
+    every pair of bots on every map, each side playing red once per round; with a seed,
+    round k is played with seed + k (both colours alike), so reruns can be cached
+    '''
+    specs: List[MatchSpec] = []
+    for k in range(rounds):
+        for map_path in maps:
+            for a, b in itertools.combinations(bots, 2):
+                for red, blue in ((a, b), (b, a)):
+                    specs.append(MatchSpec(len(specs), red, blue, map_path, None if seed is None else seed + k))
+    return specs
+
+
+# ----------------------------
+# Worker side
+# ----------------------------
+
+#set once per worker process by _init_worker
+_frames = None
+_fps_cap = 10
+_quiet = True
+_templates: Dict[Tuple[str, str, str], object] = {}
+
+
+def _init_worker(frames, fps_cap: int, quiet: bool) -> None:
+    global _frames, _fps_cap, _quiet
+    _frames, _fps_cap, _quiet = frames, fps_cap, quiet
+
+
+def _template(red: str, blue: str, map_path: str, fresh: bool = False):
+    '''
+    bots are imported and maps parsed once per worker, not once per match; fresh=True
+    imports them again, so the match cannot see bot module globals left by earlier ones
+    '''
+    from game import MatchTemplate
+
+    if fresh:
+        return MatchTemplate(red, blue, map_path)
+    key = (red, blue, map_path)
+    tpl = _templates.get(key)
+    if tpl is None:
+        tpl = _templates[key] = MatchTemplate(red, blue, map_path)
+    return tpl
+
+
+def play_match(spec: MatchSpec, turns: int, timeout: float, early_stop: bool = False) -> MatchResult:
+    '''worker: play one match, streaming frames to the grid if there is one'''
+    out = io.StringIO() if _quiet else sys.stdout
+    try:
+        with contextlib.redirect_stdout(out):
+            renderer = None
+            if _frames is not None:
+                from render_process import FrameSender
+                renderer = FrameSender(_frames, spec.key, fps_cap=_fps_cap)
+
+            #a seeded result is cached as the result of that seed, so it must not depend on
+            #which matches this worker happened to play before
+            g = _template(spec.red, spec.blue, spec.map_path, fresh=spec.seed is not None).new_game(
+                turn_limit=turns, per_turn_timeout_s=timeout, renderer=renderer, seed=spec.seed,
+                early_stop=early_stop,
+            )
+            try:
+                winner = g.run_game()
+            finally:
+                g.close()
+    except Exception as e:
+        return MatchResult(spec.key, spec.red, spec.blue, spec.map_path, None, 0, 0, error=f"{type(e).__name__}: {e}")
+
+    gs = g.game_state
+    failed = [name for name, f in (("RED", g.red_failed_init), ("BLUE", g.blue_failed_init)) if f]
+    return MatchResult(
+        spec.key, spec.red, spec.blue, spec.map_path,
+        None if winner is None else winner.name,
+        gs.get_team_money(Team.RED), gs.get_team_money(Team.BLUE),
+        record=record_from_game(g, winner),
+        failed_init=None if not failed else failed[0] if len(failed) == 1 else "BOTH",
+    )
+
+
+def _cached(store: ResultsStore, spec: MatchSpec, turns: int, timeout: float, early_stop: bool) -> Optional[MatchResult]:
+    '''the stored result of a seeded match already played with the same bots, map, engine and settings, and no timeouts'''
+    from game import engine_version
+
+    if spec.seed is None:
+        return None
+    rec = store.lookup(spec.red, spec.blue, spec.map_path, spec.seed, engine_version(), settings_key(turns, timeout, early_stop))
+    if rec is None:
+        return None
+    return MatchResult(spec.key, spec.red, spec.blue, spec.map_path, rec.winner, rec.red_money, rec.blue_money)
+
+
+# ----------------------------
+# Runner
+# ----------------------------
+
+def _layout_of(map_path: str) -> MapLayout:
+    from frames import layout_from_maps
+    from map_processor import load_two_team_maps_and_orders
+
+    red_map, blue_map, *_ = load_two_team_maps_and_orders(map_path)
+    return layout_from_maps(red_map, blue_map)
+
+
+class Schedule:
+    '''
+    Decides what to play. run_schedule() asks next_match() whenever a worker is free and
+    hands every finished match to report(); None from next_match() means nothing to start
+    right now, and the run ends once nothing is in flight and nothing new is offered.
+    '''
+    def next_match(self) -> Optional[MatchSpec]:
+        raise NotImplementedError
+
+    def report(self, result: MatchResult) -> None:
+        pass
+
+
+class FixedSchedule(Schedule):
+    '''a fixed list of matches, e.g. a round robin'''
+    def __init__(self, specs: List[MatchSpec]):
+        self._todo = list(reversed(specs))
+
+    def next_match(self) -> Optional[MatchSpec]:
+        return self._todo.pop() if self._todo else None
+
+
+def run_schedule(schedule: Schedule, *, turns: int = GameConstants.TOTAL_TURNS, timeout: float = 0.5,
+                 workers: Optional[int] = None, grid=None, fps_cap: int = 10, quiet: bool = True,
+                 store: Optional[ResultsStore] = None, early_stop: bool = False) -> List[MatchResult]:
+    '''
+    Play the schedule's matches on a process pool, at most `workers` at a time. With a
+    GridRenderer, workers stream their frames back over a queue and the grid shows the
+    running matches; closing the window only stops the drawing, the run carries on.
+    With a store, every finished match is recorded, and seeded matches that the store
+    already holds a result for are reported from there instead of being played again.
+    With early_stop, matches end as soon as no play can change their winner, with the
+    money of a match cut short; the winner can still differ from the full match's when
+    a bot would have crashed or timed out in the turns that were skipped.
+    '''
+    workers = max(1, workers or os.cpu_count() or 1)
+    ctx = mp.get_context("spawn")
+
+    results: List[MatchResult] = []
+    layouts: Dict[str, MapLayout] = {}
+    by_key: Dict[int, MatchSpec] = {}
+    with contextlib.ExitStack() as stack:
+        #a manager queue: unlike mp.Queue, frames left unread never block a worker from exiting
+        frames = stack.enter_context(ctx.Manager()).Queue() if grid is not None else None
+        pool = stack.enter_context(ProcessPoolExecutor(
+            max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(frames, fps_cap, quiet),
+        ))
+
+        pending = {}
+        cached = 0
+        while True:
+            #keep every worker busy while the schedule has something to play
+            while len(pending) < workers:
+                spec = schedule.next_match()
+                if spec is None:
+                    break
+                hit = _cached(store, spec, turns, timeout, early_stop) if store is not None else None
+                if hit is not None:
+                    cached += 1
+                    results.append(hit)
+                    schedule.report(hit)
+                    continue
+                by_key[spec.key] = spec
+                pending[pool.submit(play_match, spec, turns, timeout, early_stop)] = spec
+            if not pending:
+                break
+
+            done, _ = wait(pending, timeout=0.05 if frames is not None else None, return_when=FIRST_COMPLETED)
+
+            if frames is not None:
+                #newest frame per match, older ones in the queue are never drawn
+                latest = {}
+                while True:
+                    try:
+                        key, frame = frames.get_nowait()
+                    except queue.Empty:
+                        break
+                    latest[key] = frame
+
+                #after the window is closed the queue is still drained, just not drawn
+                for key, frame in latest.items() if grid is not None else ():
+                    spec = by_key[key]
+                    if spec.map_path not in layouts:
+                        layouts[spec.map_path] = _layout_of(spec.map_path)
+                    title = f"{bot_name(spec.red)} vs {bot_name(spec.blue)} @ {bot_name(spec.map_path)}"
+                    if grid.add_match(key, layouts[spec.map_path], title):
+                        grid.update(key, frame)
+
+            for fut in done:
+                spec = pending.pop(fut)
+                res = fut.result()
+                results.append(res)
+                if store is not None and res.record is not None:
+                    store.add(res.record)
+                if res.error:
+                    print(f"[TOURNAMENT] {bot_name(spec.red)} vs {bot_name(spec.blue)} failed: {res.error}")
+                if grid is not None:
+                    grid.finish(spec.key, "draw" if res.winner is None else f"{res.winner} wins")
+                schedule.report(res)
+
+            if grid is not None and not grid.render(fps_cap=60):
+                grid.close()
+                grid = None
+
+    if grid is not None:
+        grid.close()
+    if cached:
+        print(f"[TOURNAMENT] {cached} of {len(results)} matches taken from the results store")
+    results.sort(key=lambda r: r.key)
+    return results
+
+
+def run_tournament(specs: List[MatchSpec], *, workers: Optional[int] = None, **kwargs) -> List[MatchResult]:
+    '''play a fixed list of matches; kwargs as for run_schedule'''
+    workers = max(1, min(workers or os.cpu_count() or 1, len(specs)))
+    return run_schedule(FixedSchedule(specs), workers=workers, **kwargs)
+
+
+def standings(results: List[MatchResult]) -> List[Tuple[str, int, int, int, float]]:
+    '''(bot, wins, draws, losses, points) sorted by points; a win is 1 point, a draw half'''
+    table: Dict[str, List[int]] = defaultdict(lambda: [0, 0, 0])
+    for r in results:
+        if r.error:
+            continue
+        for path, team in ((r.red, "RED"), (r.blue, "BLUE")):
+            if r.winner is None:
+                table[path][1] += 1
+            elif r.winner == team:
+                table[path][0] += 1
+            else:
+                table[path][2] += 1
+
+    rows = [(bot_name(p), w, d, l, w + d / 2) for p, (w, d, l) in table.items()]
+    rows.sort(key=lambda row: (-row[4], row[0]))
+    return rows
+
+
+def main():
+    import argparse
+
+    ap = argparse.ArgumentParser(description="round-robin tournament (or adaptive rating ladder) between bots")
+    ap.add_argument("--bots", nargs="+", required=True, help="bot files, at least two")
+    ap.add_argument("--maps", nargs="+", required=True, help="map files")
+    ap.add_argument("--rounds", type=int, default=1, help="times each pairing is played per map and side")
+    ap.add_argument("--turns", type=int, default=GameConstants.TOTAL_TURNS, help="turn limit")
+    ap.add_argument("--timeout", type=float, default=0.5, help="per-turn timeout seconds per bot")
+    ap.add_argument("--workers", type=int, default=None, help="concurrent matches (default: cpu count)")
+    ap.add_argument("--grid", action="store_true", help="watch the running matches as a grid of thumbnails")
+    ap.add_argument("--cols", type=int, default=4, help="grid columns")
+    ap.add_argument("--rows", type=int, default=4, help="grid rows")
+    ap.add_argument("--fps", type=int, default=10, help="frames per second each match sends to the grid")
+    ap.add_argument("--verbose", action="store_true", help="show the output of every match")
+    ap.add_argument("--db", default=None, help="record every match in this sqlite results database")
+    ap.add_argument("--seed", type=int, default=None, help="seed of the first round; seeded matches already in --db are not replayed")
+    ap.add_argument("--early-stop", action="store_true", help="end each match once no play can change its winner; a bot that would crash or time out later could still have, so winners are not guaranteed to match full matches")
+    ap.add_argument("--ladder", action="store_true", help="pick matches adaptively until ratings are known, instead of a round robin")
+    ap.add_argument("--target-ci", type=float, default=100.0, help="ladder: stop when every 95%% rating interval is within +-this")
+    ap.add_argument("--max-games", type=int, default=None, help="ladder: stop after this many games")
+    args = ap.parse_args()
+
+    if len(args.bots) < 2:
+        ap.error("need at least two bots")
+
+    grid = None
+    if args.grid:
+        from render import GridConfig, GridRenderer
+        grid = GridRenderer(GridConfig(cols=args.cols, rows=args.rows))
+
+    if args.ladder:
+        from ladder import Ladder
+        schedule = Ladder(args.bots, args.maps, target_ci=args.target_ci, max_games=args.max_games)
+        print(f"[TOURNAMENT] ladder until ratings are within +-{args.target_ci:g}")
+    else:
+        specs = round_robin(args.bots, args.maps, args.rounds, seed=args.seed)
+        schedule = FixedSchedule(specs)
+        print(f"[TOURNAMENT] {len(specs)} matches")
+
+    store = ResultsStore(args.db) if args.db else None
+    try:
+        results = run_schedule(
+            schedule, turns=args.turns, timeout=args.timeout, workers=args.workers,
+            grid=grid, fps_cap=args.fps, quiet=not args.verbose, store=store,
+            early_stop=args.early_stop,
+        )
+    finally:
+        if store is not None:
+            store.close()
+
+    if args.ladder:
+        print(f"[TOURNAMENT] {len(results)} games")
+        print(f"{'bot':<24} {'rating':>7} {'95%':>6} {'games':>6}")
+        for name, rating, ci, games in schedule.table():
+            print(f"{name:<24} {rating:>7.0f} {ci:>6.0f} {games:>6}")
+        return
+
+    print(f"{'bot':<24} {'W':>4} {'D':>4} {'L':>4} {'pts':>6}")
+    for name, w, d, l, pts in standings(results):
+        print(f"{name:<24} {w:>4} {d:>4} {l:>4} {pts:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()